@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+"""
+Aggregation of `edx.drag_and_drop_v2.item.dropped` events from tracking logs.
+
+Reads tracking log files (plain or gzipped, one JSON event per line) and computes, for every
+block found in them:
+
+- "drops": the number of times each item was dropped on each zone,
+  as {item_id: {zone: count}};
+- "first_attempts": how often learners placed each item correctly on their first attempt,
+  as {item_id: {"correct": count, "total": count}};
+- "attempts_to_correct": a histogram of the number of drops learners needed to place each
+  item correctly, as {item_id: {attempts: count}}.
+
+The results are keyed by the usage key of the block. All keys are strings, so that the
+results can be written as JSON and merged again.
+
+Memory use is bounded: only the learners that are still working on an item are tracked, and
+the least recently active of them are forgotten once more than `max_pending` are tracked. The
+number of forgotten learners is reported as "evicted"; if they drop the item again, that drop
+is counted as a first attempt.
+
+Log files can be aggregated in parallel and the partial results merged. The drop matrices are
+exact however the logs are split, but the other statistics are only exact if all events of a
+learner are in the same file, as is the case when logs are split by learner.
+
+Usage:
+
+    python -m drag_and_drop_v2.analytics tracking.log-*.gz > drop_stats.json
+"""
+
+# Imports ###########################################################
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import sys
+from collections import OrderedDict
+
+
+# Globals ###########################################################
+
+DROPPED_EVENT_TYPE = 'edx.drag_and_drop_v2.item.dropped'
+
+# Default maximum number of (block, learner, item) attempts tracked at once.
+MAX_PENDING = 100000
+
+# Marks learners that already placed an item correctly, and whose later drops are not counted.
+_DONE = 0
+
+
+# Functions #########################################################
+
+def aggregate_files(paths, processes=None, max_pending=MAX_PENDING):
+    """
+    Aggregates the drop events in the tracking log files at `paths`, one file per worker
+    process at a time, and returns the merged results.
+    """
+    if processes == 1:
+        results = [_aggregate_file((path, max_pending)) for path in paths]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_aggregate_file, [(path, max_pending) for path in paths])
+        finally:
+            pool.close()
+            pool.join()
+    return merge_results(results)
+
+
+def merge_results(results):
+    """
+    Merges the results of several DropAggregators into one.
+    """
+    merged = {'blocks': {}, 'evicted': 0}
+    for result in results:
+        merged['evicted'] += result['evicted']
+        for block_id, stats in result['blocks'].iteritems():
+            merged_stats = merged['blocks'].setdefault(block_id, _new_block_stats())
+            for key in ('drops', 'first_attempts', 'attempts_to_correct'):
+                for item_id, counts in stats[key].iteritems():
+                    merged_counts = merged_stats[key].setdefault(item_id, {})
+                    for name, count in counts.iteritems():
+                        merged_counts[name] = merged_counts.get(name, 0) + count
+    return merged
+
+
+def open_log(path):
+    """
+    Opens a tracking log file, which may be gzipped.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Aggregate drag and drop events from tracking logs.")
+    parser.add_argument('paths', nargs='+', help="Tracking log files, optionally gzipped")
+    parser.add_argument('--processes', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help="Maximum number of learners tracked at once, per process")
+    args = parser.parse_args(argv)
+
+    result = aggregate_files(args.paths, args.processes, args.max_pending)
+    json.dump(result, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+
+def _aggregate_file(args):
+    """
+    Aggregates a single log file in a worker process.
+    """
+    path, max_pending = args
+    aggregator = DropAggregator(max_pending)
+    with open_log(path) as lines:
+        aggregator.add_lines(lines)
+    return aggregator.result()
+
+
+def _new_block_stats():
+    return {'drops': {}, 'first_attempts': {}, 'attempts_to_correct': {}}
+
+
+# Classes ###########################################################
+
+class DropAggregator(object):
+    """
+    Streaming aggregator of drop events.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self.blocks = {}
+        self.evicted = 0
+        # Number of drops so far of (block, learner, item), in least recently used order.
+        self._pending = OrderedDict()
+
+    def add_lines(self, lines):
+        """
+        Adds the drop events among the tracking log `lines`.
+        """
+        for line in lines:
+            # Most events are of other types; avoid parsing them.
+            if DROPPED_EVENT_TYPE in line:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict) and event.get('event_type') == DROPPED_EVENT_TYPE:
+                    self.add_event(event)
+
+    def add_event(self, event):
+        """
+        Adds a parsed `edx.drag_and_drop_v2.item.dropped` tracking event.
+        Events without the expected data are skipped.
+        """
+        data = event.get('event')
+        if isinstance(data, basestring):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                return
+        block_id, user_id = self._get_block_and_user(event)
+        if not isinstance(data, dict) or not block_id or user_id is None or 'item_id' not in data:
+            return
+
+        item_id = unicode(data['item_id'])
+        # Events published by old versions of this block only have the zone title.
+        zone = unicode(data.get('location_id') or data.get('location'))
+        is_correct = bool(data.get('is_correct'))
+
+        stats = self.blocks.get(block_id)
+        if stats is None:
+            stats = self.blocks[block_id] = _new_block_stats()
+        drops = stats['drops'].setdefault(item_id, {})
+        drops[zone] = drops.get(zone, 0) + 1
+
+        key = (block_id, user_id, item_id)
+        attempts = self._pending.pop(key, None)
+        if attempts is None:
+            first_attempts = stats['first_attempts'].setdefault(item_id, {'correct': 0, 'total': 0})
+            first_attempts['total'] += 1
+            if is_correct:
+                first_attempts['correct'] += 1
+            attempts = 0
+        elif attempts == _DONE:
+            self._pending[key] = _DONE
+            return
+
+        attempts += 1
+        if is_correct:
+            histogram = stats['attempts_to_correct'].setdefault(item_id, {})
+            histogram[unicode(attempts)] = histogram.get(unicode(attempts), 0) + 1
+            attempts = _DONE
+        self._pending[key] = attempts
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+            self.evicted += 1
+
+    @staticmethod
+    def _get_block_and_user(event):
+        """
+        Returns the usage key of the block and the ID of the learner of a tracking event, each of
+        which is None if the event doesn't have it.
+        """
+        context = event.get('context') or {}
+        module = context.get('module') or {} if isinstance(context, dict) else None
+        if not isinstance(module, dict):
+            return None, None
+        return module.get('usage_key'), context.get('user_id') or event.get('username')
+
+    def result(self):
+        """
+        Returns the aggregated results so far.
+        """
+        return {'blocks': self.blocks, 'evicted': self.evicted}
+
+
+if __name__ == '__main__':
+    main()
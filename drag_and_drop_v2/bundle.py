@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+"""
+Bundles of the static assets of the student view.
+
+The student view needs a stylesheet and two scripts. To serve them in two requests, with URLs
+that can be cached forever, `python -m drag_and_drop_v2.bundle` concatenates them into one
+CSS and one JS file under public/bundle, named after a hash of their content, and writes a
+manifest listing the bundles and the hashes of the source files they were built from. The
+bundles are minified when the optional rcssmin and rjsmin packages (the "minify" extra of the
+package) are installed, with a warning otherwise. Building the package with setup.py builds the
+bundles too.
+
+Bundles are only used while they are up to date with their source files. Otherwise, or when the
+`debug_assets` XBlock setting is enabled, the source files are served separately. The source
+files are only hashed again when their modification times change.
+"""
+
+# Imports ###########################################################
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+# Globals ###########################################################
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STUDENT_VIEW_CSS = (
+    'public/css/drag_and_drop.css',
+)
+STUDENT_VIEW_JS = (
+    'public/js/vendor/virtual-dom-1.3.0.min.js',
+    'public/js/drag_and_drop.js',
+)
+
+BUNDLE_DIR = 'public/bundle'
+MANIFEST_PATH = BUNDLE_DIR + '/manifest.json'
+
+# Modification times of the manifest and source files, and the manifest if the bundles were found
+# to be up to date with them or None otherwise, by package directory.
+_bundles = {}
+
+
+# Functions #########################################################
+
+def student_view_urls(debug=False, package_dir=PACKAGE_DIR):
+    """
+    Returns the paths of the CSS and JS resources of the student view, relative to the package:
+    the bundles if they are up to date and `debug` is off, or the source files otherwise.
+    """
+    if not debug:
+        mtimes = _mtimes(package_dir)
+        if package_dir not in _bundles or _bundles[package_dir][0] != mtimes:
+            _bundles[package_dir] = (mtimes, _load_manifest(package_dir) if mtimes else None)
+        manifest = _bundles[package_dir][1]
+        if manifest is not None:
+            return (manifest['css'],), (manifest['js'],)
+    return STUDENT_VIEW_CSS, STUDENT_VIEW_JS
+
+
+def missing_minifiers():
+    """
+    Returns the names of the minifiers that are not installed, with which the bundles are not minified.
+    """
+    return [name for name, module in (('rcssmin', rcssmin), ('rjsmin', rjsmin)) if module is None]
+
+
+def build(package_dir=PACKAGE_DIR):
+    """
+    Builds the bundles of the student view assets, replacing any previous ones, and returns the manifest.
+    """
+    css = '\n'.join(_read(package_dir, path) for path in STUDENT_VIEW_CSS)
+    # Scripts that don't end with a semicolon would otherwise run into the next one.
+    js = ';\n'.join(_read(package_dir, path) for path in STUDENT_VIEW_JS) + ';\n'
+    if rcssmin is not None:
+        css = rcssmin.cssmin(css)
+    if rjsmin is not None:
+        js = rjsmin.jsmin(js)
+
+    bundle_dir = os.path.join(package_dir, BUNDLE_DIR)
+    if not os.path.isdir(bundle_dir):
+        os.makedirs(bundle_dir)
+    for old_bundle in glob.glob(os.path.join(bundle_dir, 'student_view.*')):
+        os.remove(old_bundle)
+
+    manifest = {'sources': {}}
+    for extension, content in (('css', css), ('js', js)):
+        path = '{}/student_view.{}.{}'.format(BUNDLE_DIR, _hash(content)[:12], extension)
+        with open(os.path.join(package_dir, path), 'wb') as bundle:
+            bundle.write(content)
+        manifest[extension] = path
+    for path in STUDENT_VIEW_CSS + STUDENT_VIEW_JS:
+        manifest['sources'][path] = _hash(_read(package_dir, path))
+    with open(os.path.join(package_dir, MANIFEST_PATH), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    _bundles.pop(package_dir, None)
+    return manifest
+
+
+def _mtimes(package_dir):
+    """
+    Returns the modification times of the manifest and the source files, or None if one is missing.
+    """
+    try:
+        return tuple(
+            os.path.getmtime(os.path.join(package_dir, path))
+            for path in (MANIFEST_PATH,) + STUDENT_VIEW_CSS + STUDENT_VIEW_JS
+        )
+    except OSError:
+        return None
+
+
+def _load_manifest(package_dir):
+    """
+    Returns the manifest of the bundles, or None if they are missing or out of date.
+    """
+    try:
+        with open(os.path.join(package_dir, MANIFEST_PATH)) as manifest_file:
+            manifest = json.load(manifest_file)
+        sources = {path: _hash(_read(package_dir, path)) for path in STUDENT_VIEW_CSS + STUDENT_VIEW_JS}
+        bundles_exist = all(os.path.isfile(os.path.join(package_dir, manifest[key])) for key in ('css', 'js'))
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+    if manifest.get('sources') != sources or not bundles_exist:
+        return None
+    return manifest
+
+
+def _read(package_dir, path):
+    with open(os.path.join(package_dir, path), 'rb') as source:
+        return source.read()
+
+
+def _hash(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def main(argv=None):
+    """ Builds the bundles of the student view assets. """
+    parser = argparse.ArgumentParser(description="Build the asset bundles of the Drag and Drop XBlock student view.")
+    parser.parse_args(argv)
+    missing = missing_minifiers()
+    if missing:
+        print >> sys.stderr, "Warning: {} not installed, the bundles will not be minified.".format(', '.join(missing))
+    manifest = build()
+    print "Built {css} and {js}".format(**manifest)
+    return 0
+
+
+if __name__ == '__main__':
+    main()
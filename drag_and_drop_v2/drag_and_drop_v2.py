@@ -3,11 +3,13 @@
 
 # Imports ###########################################################
 
-import json
-import webob
 import copy
+import hashlib
+import json
+import time
 import urllib
 
+import webob
 from xblock.core import XBlock
 from xblock.exceptions import JsonHandlerError
 from xblock.fields import Scope, String, Dict, Float, Boolean, Integer
@@ -15,14 +17,50 @@ from xblock.fragment import Fragment
 from xblockutils.resources import ResourceLoader
 from xblockutils.settings import XBlockWithSettingsMixin, ThemableXBlockMixin
 
-from .utils import _  # pylint: disable=unused-import
+from . import bundle, images, metrics
+from .utils import _, is_coordinate, parse_percentage, LRUCache  # pylint: disable=unused-import
 from .default_data import DEFAULT_DATA
+from .problem_index import data_version, get_problem_index
+from .schema import normalize_data, validate_data
+from .state_encoding import decode_item_state, encode_item_state, item_count
 
 
 # Globals ###########################################################
 
 loader = ResourceLoader(__name__)
 
+# Background image shown when the author hasn't set one, relative to the package.
+DEFAULT_BACKGROUND_IMAGE = 'public/img/triangle.png'
+
+# How far the position of a dropped item may be from the point it was dropped at, in percent of the background image.
+DROP_POSITION_TOLERANCE = 0.5
+
+# Student view configurations, keyed by everything they are computed from.
+_CONFIGURATION_CACHE = LRUCache(maxsize=128)
+
+# Expanded static URLs, keyed by (runtime type, course_id, url).
+_STATIC_URL_CACHE = LRUCache(maxsize=4096)
+
+_NOT_IMPORTED = object()
+_replace_static_urls = _NOT_IMPORTED
+
+
+# Functions #########################################################
+
+def _get_replace_static_urls():
+    """
+    Returns edx-platform's `static_replace.replace_static_urls`, or None outside of edx-platform.
+    The import is only attempted once per process.
+    """
+    global _replace_static_urls  # pylint: disable=global-statement
+    if _replace_static_urls is _NOT_IMPORTED:
+        try:
+            from static_replace import replace_static_urls  # pylint: disable=import-error
+        except ImportError:
+            replace_static_urls = None
+        _replace_static_urls = replace_static_urls
+    return _replace_static_urls
+
 
 # Classes ###########################################################
 
@@ -35,6 +73,9 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
     STANDARD_MODE = "standard"
     ASSESSMENT_MODE = "assessment"
 
+    EVENT_TYPE_PREFIX = "edx.drag_and_drop_v2."
+    MAX_EVENTS_PER_BATCH = 100
+
     display_name = String(
         display_name=_("Title"),
         help=_("The title of the drag and drop problem. The title is displayed to learners."),
@@ -127,12 +168,39 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
         default={},
     )
 
+    item_stats = Dict(
+        help=_(
+            "Number of items the learner has placed correctly, kept up to date as items are placed, "
+            "together with the version of the problem data it was counted against."
+        ),
+        scope=Scope.user_state,
+        default={},
+    )
+
     num_attempts = Integer(
         help=_("Number of attempts learner used"),
         scope=Scope.user_state,
         default=0
     )
 
+    last_published_grade = Float(
+        help=_("The last grade value that was published for the learner"),
+        scope=Scope.user_state,
+        default=None,
+    )
+
+    last_grade_publish_time = Float(
+        help=_("When the learner's grade was last published, in seconds since the epoch"),
+        scope=Scope.user_state,
+        default=None,
+    )
+
+    grade_pending = Boolean(
+        help=_("Whether a change of the learner's grade is waiting for the grade publish interval to pass"),
+        scope=Scope.user_state,
+        default=False,
+    )
+
     completed = Boolean(
         help=_("Indicates whether a learner has completed the problem at least once"),
         scope=Scope.user_state,
@@ -142,6 +210,10 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
     block_settings_key = 'drag-and-drop-v2'
     has_score = True
 
+    # The problem data and its compiled index, as returned by `_get_problem_index`.
+    _problem_index = None
+
+    @metrics.instrumented
     @XBlock.supports("multi_device")  # Enable this block for use in the mobile app via webview
     def student_view(self, context):
         """
@@ -150,16 +222,8 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
 
         fragment = Fragment()
         fragment.add_content(loader.render_template('/templates/html/drag_and_drop.html'))
-        css_urls = (
-            'public/css/vendor/jquery-ui-1.10.4.custom.min.css',
-            'public/css/drag_and_drop.css'
-        )
-        js_urls = (
-            'public/js/vendor/jquery-ui-1.10.4.custom.min.js',
-            'public/js/vendor/jquery-ui-touch-punch-0.2.3.min.js',  # Makes it work on touch devices
-            'public/js/vendor/virtual-dom-1.3.0.min.js',
-            'public/js/drag_and_drop.js',
-        )
+        # Serve the bundled assets, unless they are out of date or the separate files are wanted for debugging.
+        css_urls, js_urls = bundle.student_view_urls(debug=self.get_xblock_settings(default={}).get('debug_assets'))
         for css_url in css_urls:
             fragment.add_css_url(self.runtime.local_resource_url(self, css_url))
         for js_url in js_urls:
@@ -167,7 +231,12 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
 
         self.include_theme_files(fragment)
 
-        fragment.initialize_js('DragAndDropBlock', self.get_configuration())
+        configuration = self.get_configuration()
+        # Embed the learner's state, so that the client can render without fetching it first.
+        # The token lets the client tell whether the embedded state is still current.
+        configuration['initial_state'] = self._get_user_state()
+        configuration['initial_state_token'] = self._get_state_token()
+        fragment.initialize_js('DragAndDropBlock', configuration)
 
         return fragment
 
@@ -176,23 +245,81 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
         Get the configuration data for the student_view.
         The configuration is all the settings defined by the author, except for correct answers
         and feedback.
+
+        The configuration does not depend on the learner, so it is computed once and shared
+        between renders. Only the top-level dict is copied; nested values must not be modified.
         """
+        key = self._get_configuration_key()
+        configuration = _CONFIGURATION_CACHE.get(key)
+        if configuration is None:
+            configuration = self._build_configuration()
+            _CONFIGURATION_CACHE.set(key, configuration)
+        return dict(configuration)
+
+    def _get_configuration_key(self):
+        """
+        The version of the problem data, and the settings fields and runtime URL mapping that the
+        student_view configuration is computed from.
+        """
+        return (
+            self._get_problem_index().version,
+            self.mode,
+            self.max_attempts,
+            self.display_name,
+            self.show_title,
+            self.question_text,
+            self.show_question_header,
+            self.item_background_color,
+            self.item_text_color,
+            getattr(self, 'url_name', ''),
+            type(self.runtime).__name__,
+            unicode(getattr(self.runtime, 'course_id', '')),
+            self.default_background_image_url,
+        )
+
+    def _build_configuration(self):
+        """
+        Compute the configuration data for the student_view.
+        """
+        data = self._get_problem_index().data
+        items = copy.deepcopy(data['items'])
+        image_urls = [item['imageURL'] for item in items]
+        target_img_url = data.get("targetImg")
+        # Expand all the image URLs of the problem, including those of their variants, with a single
+        # call to the runtime.
+        urls = [url for url in image_urls + [target_img_url] if url]
+        for variants in [data.get('targetImgVariants', [])] + [item.get('imgVariants', []) for item in items]:
+            urls.extend(url for url, _ in variants)
+        expanded_urls = dict(zip(urls, self._expand_static_urls(urls)))
+
+        def srcset(url, variants, width):
+            """ The srcset of an image: its variants, and the original at its natural width """
+            if not variants or not width:
+                return ''
+            candidates = [(expanded_urls[variant_url], variant_width) for variant_url, variant_width in variants]
+            candidates.append((expanded_urls[url], width))
+            return ', '.join('{} {}w'.format(candidate_url, candidate_width)
+                             for candidate_url, candidate_width in candidates)
+
+        target_img_size = self._target_img_natural_size(data)
+        if target_img_url:
+            target_img_expanded_url = expanded_urls[target_img_url]
+            target_img_srcset = srcset(target_img_url, data.get('targetImgVariants'), target_img_size[0])
+        else:
+            target_img_expanded_url = self.default_background_image_url
+            target_img_srcset = ''
 
         def items_without_answers():
-            items = copy.deepcopy(self.data.get('items', ''))
-            for item in items:
+            for item, image_url in zip(items, image_urls):
                 del item['feedback']
-                # Use item.pop to remove both `item['zone']` and `item['zones']`; we don't have
-                # a guarantee that either will be present, so we can't use `del`. Legacy instances
-                # will have `item['zone']`, while current versions will have `item['zones']`.
-                item.pop('zone', None)
-                item.pop('zones', None)
-                # Fall back on "backgroundImage" to be backward-compatible.
-                image_url = item.get('imageURL') or item.get('backgroundImage')
+                del item['zones']
+                variants = item.pop('imgVariants', None)
                 if image_url:
-                    item['expandedImageURL'] = self._expand_static_url(image_url)
+                    item['expandedImageURL'] = expanded_urls[image_url]
+                    item['expandedImageSrcset'] = srcset(image_url, variants, item.get('imgNaturalWidth'))
                 else:
                     item['expandedImageURL'] = ''
+                    item['expandedImageSrcset'] = ''
             return items
 
         return {
@@ -201,18 +328,23 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
             "zones": self._get_zones(),
             # SDK doesn't supply url_name.
             "url_name": getattr(self, 'url_name', ''),
-            "display_zone_labels": self.data.get('displayLabels', False),
-            "display_zone_borders": self.data.get('displayBorders', False),
+            "display_zone_labels": data.get('displayLabels', False),
+            "display_zone_borders": data.get('displayBorders', False),
             "items": items_without_answers(),
             "title": self.display_name,
             "show_title": self.show_title,
             "problem_text": self.question_text,
             "show_problem_header": self.show_question_header,
-            "target_img_expanded_url": self.target_img_expanded_url,
+            "target_img_expanded_url": target_img_expanded_url,
             "target_img_description": self.target_img_description,
+            # The natural size of the background image, if it is known, so that the client doesn't
+            # have to wait for the image to load to lay out the problem.
+            "target_img_natural_width": target_img_size[0],
+            "target_img_natural_height": target_img_size[1],
+            "target_img_srcset": target_img_srcset,
             "item_background_color": self.item_background_color or None,
             "item_text_color": self.item_text_color or None,
-            "initial_feedback": self.data['feedback']['start'],
+            "initial_feedback": data['feedback']['start'],
             # final feedback (data.feedback.finish) is not included - it may give away answers.
         }
 
@@ -235,7 +367,7 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
             'help_texts': help_texts,
             'field_values': field_values,
             'self': self,
-            'data': urllib.quote(json.dumps(self.data)),
+            'data': urllib.quote(json.dumps(self._get_problem_index().data)),
         }
 
         fragment = Fragment()
@@ -255,29 +387,28 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
         for js_url in js_urls:
             fragment.add_javascript_url(self.runtime.local_resource_url(self, js_url))
 
-        # Do a bit of manipulation so we get the appearance of a list of zone options on
-        # items that still have just a single zone stored
-
-        items = self.data.get('items', [])
-
-        for item in items:
-            zones = self._get_item_zones(item['id'])
-            # Note that we appear to be mutating the state of the XBlock here, but because
-            # the change won't be committed, we're actually just affecting the data that
-            # we're going to send to the client, not what's saved in the backing store.
-            item['zones'] = zones
-            item.pop('zone', None)
-
+        # The editor always works with normalized data, which is what will be saved.
         fragment.initialize_js('DragAndDropEditBlock', {
-            'data': self.data,
+            'data': self._get_problem_index().data,
             'target_img_expanded_url': self.target_img_expanded_url,
             'default_background_image_url': self.default_background_image_url,
         })
 
         return fragment
 
+    @metrics.instrumented
     @XBlock.json_handler
     def studio_submit(self, submissions, suffix=''):
+        # Problem data is normalized and validated once here, so that it can be used as is when it's read.
+        try:
+            data = normalize_data(submissions['data'])
+            validate_data(data)
+        except ValueError as err:
+            return {
+                'result': 'error',
+                'message': self.ugettext(unicode(err)),
+            }
+
         self.display_name = submissions['display_name']
         self.mode = submissions['mode']
         self.max_attempts = submissions['max_attempts']
@@ -287,108 +418,339 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
         self.weight = float(submissions['weight'])
         self.item_background_color = submissions['item_background_color']
         self.item_text_color = submissions['item_text_color']
-        self.data = submissions['data']
+        self._store_images(data)
+        data['dataVersion'] = data_version(data)
+        self.data = data
 
         return {
             'result': 'success',
         }
 
+    def _store_images(self, data):
+        """
+        Store the natural size of the background image and of the item images in the problem `data`,
+        for those that are course assets that can be read on the server, along with smaller copies of
+        them saved next to them, so that browsers can download the copy that fits.
+        """
+        stored = {
+            obj[keys[0]]: ((obj[keys[1]], obj[keys[2]]) if obj.get(keys[1]) else None, obj.get(keys[3], []))
+            for obj, keys in self._images(self.data) if obj.get(keys[0])
+        }
+        results = {}
+        for obj, (url_key, width_key, height_key, variants_key) in self._images(data):
+            url = obj.get(url_key)
+            if url and url not in results:
+                results[url] = images.get_course_asset_image(self._get_course_key(), url, stored.get(url))
+            size, variants = results.get(url, (None, []))
+            if size:
+                obj[width_key], obj[height_key] = size
+            else:
+                obj.pop(width_key, None)
+                obj.pop(height_key, None)
+            if variants:
+                obj[variants_key] = variants
+            else:
+                obj.pop(variants_key, None)
+
+    @staticmethod
+    def _images(data):
+        """
+        Yields the background image and the items of the problem `data`, with the keys of their image
+        URL, natural width and height, and variants.
+        """
+        yield data, ('targetImg', 'targetImgNaturalWidth', 'targetImgNaturalHeight', 'targetImgVariants')
+        for item in data.get('items', []):
+            yield item, ('imageURL', 'imgNaturalWidth', 'imgNaturalHeight', 'imgVariants')
+
+    def _get_course_key(self):
+        """
+        Returns the key of the course this block belongs to, or None outside of a course.
+        """
+        return getattr(self.scope_ids.usage_id, 'course_key', None) or getattr(self.runtime, 'course_id', None)
+
+    @metrics.instrumented
     @XBlock.json_handler
     def do_attempt(self, attempt, suffix=''):
-        item = self._get_item_definition(attempt['val'])
+        index = self._get_problem_index()
+        item, zone = self._validate_attempt(index, attempt)
+        # Tracking events queued by the client before the drop are sent along with it.
+        self._publish_attempt_events(attempt.get('events', []))
+        is_correct, feedback, drop_event = self._drop_item(index, attempt, item, zone)
+        is_finished, overall_feedback = self._update_grade(index)
+        self._publish('edx.drag_and_drop_v2.item.dropped', drop_event)
+
+        if self.mode == self.ASSESSMENT_MODE:
+            # In assessment mode we don't send any feedback on drop.
+            result = {}
+        else:
+            result = {
+                'correct': is_correct,
+                'finished': is_finished,
+                'overall_feedback': overall_feedback,
+                'feedback': feedback
+            }
+
+        return result
+
+    @metrics.instrumented
+    @XBlock.json_handler
+    def do_attempts(self, data, suffix=''):
+        """
+        Evaluate an ordered list of drops (each in the format accepted by `do_attempt`)
+        in one request, writing the item state and publishing the grade only once.
+        """
+        attempts = data.get('attempts') if isinstance(data, dict) else None
+        if not isinstance(attempts, list):
+            raise JsonHandlerError(400, "Missing list of attempts.")
+
+        index = self._get_problem_index()
+        # Reject the whole batch up front rather than storing only part of it.
+        drops = [(attempt,) + self._validate_attempt(index, attempt) for attempt in attempts]
+        self._publish_attempt_events(data.get('events', []))
+        results = [self._drop_item(index, *drop) for drop in drops]
+        is_finished, overall_feedback = self._update_grade(index)
+        for drop_result in results:
+            self._publish('edx.drag_and_drop_v2.item.dropped', drop_result[2])
+
+        if self.mode == self.ASSESSMENT_MODE:
+            # In assessment mode we don't send any feedback on drop.
+            return {}
+        return {
+            'results': [
+                {'correct': is_correct, 'feedback': feedback}
+                for is_correct, feedback, _drop_event in results
+            ],
+            'finished': is_finished,
+            'overall_feedback': overall_feedback,
+        }
+
+    def _publish_attempt_events(self, events):
+        """
+        Publish the tracking events sent along with drops, or raise a JsonHandlerError if they are invalid.
+        """
+        try:
+            self._publish_client_events(events)
+        except ValueError as err:
+            raise JsonHandlerError(400, err.message)
+
+    def _validate_attempt(self, index, attempt):
+        """
+        Returns the definitions of the item and the zone of a drop, or raises a JsonHandlerError.
+
+        Drops are checked against the point where the item was dropped, (`x`, `y`) in pixels of the
+        background image at its natural size. If the client claims a `zone`, the point must be
+        inside its shape, even where another zone is displayed on top of it; otherwise the zone is
+        the topmost one at that point. The position of the item (`x_percent`, `y_percent`) must be
+        that point, when the size of the background image is known.
+        Clients loaded before drops had coordinates only send the `zone`, which is accepted unless
+        the `allow_attempts_without_coordinates` XBlock setting is disabled.
+        """
+        if not isinstance(attempt, dict) or attempt.get('val') not in index.items:
+            raise JsonHandlerError(400, "Item data invalid.")
+        x_percent = parse_percentage(attempt.get('x_percent'))
+        y_percent = parse_percentage(attempt.get('y_percent'))
+        if x_percent is None or y_percent is None:
+            raise JsonHandlerError(400, "Item position data invalid.")
+        zone_uid = attempt.get('zone')
+        if zone_uid is not None and not isinstance(zone_uid, basestring):
+            raise JsonHandlerError(400, "Item zone data invalid.")
+        if 'x' in attempt or 'y' in attempt:
+            x, y = attempt.get('x'), attempt.get('y')
+            if not is_coordinate(x) or not is_coordinate(y) or not self._is_at(index, x_percent, y_percent, x, y):
+                raise JsonHandlerError(400, "Item position data invalid.")
+            zone = index.find_zone(zone_uid, x, y)
+        elif self.get_xblock_settings(default={}).get('allow_attempts_without_coordinates', True):
+            zone = index.zones_by_uid.get(zone_uid)
+        else:
+            raise JsonHandlerError(400, "Item position data invalid.")
+        if not zone:
+            raise JsonHandlerError(400, "Item zone data invalid.")
+        return index.items[attempt['val']], zone
+
+    @classmethod
+    def _is_at(cls, index, x_percent, y_percent, x, y):
+        """
+        Returns True if the position of an item, in percent of the background image, is the point
+        (x, y) in pixels of the image at its natural size, or if the size of the image is unknown.
+        """
+        width, height = cls._target_img_natural_size(index.data)
+        if not (is_coordinate(width) and is_coordinate(height) and width > 0 and height > 0):
+            return True
+        return (abs(x_percent - x * 100.0 / width) <= DROP_POSITION_TOLERANCE and
+                abs(y_percent - y * 100.0 / height) <= DROP_POSITION_TOLERANCE)
+
+    @staticmethod
+    def _target_img_natural_size(data):
+        """
+        Returns the (width, height) of the background image of the problem `data` at its natural
+        size, each of which is None if unknown.
+        """
+        if data.get('targetImg'):
+            return data.get('targetImgNaturalWidth'), data.get('targetImgNaturalHeight')
+        return images.get_package_image_size(DEFAULT_BACKGROUND_IMAGE) or (None, None)
 
-        state = None
-        zone = None
+    def _drop_item(self, index, attempt, item, zone):
+        """
+        Evaluate a single drop of an item on a zone, and record it in the user state if correct.
+        `item` and `zone` are the definitions of the item and zone of the `attempt`, as returned by
+        `_validate_attempt`.
+        Returns a tuple of whether the drop was correct, the feedback for it, and the data of
+        the tracking event to publish for it.
+        """
         feedback = item['feedback']['incorrect']
-        overall_feedback = None
         is_correct = False
 
-        if self._is_attempt_correct(attempt):  # Student placed item in a correct zone
+        if index.is_correct(item['id'], zone['uid']):  # Student placed item in a correct zone
             is_correct = True
             feedback = item['feedback']['correct']
-            state = {
-                'zone': attempt['zone'],
+            self._set_item_state(index, str(item['id']), {
+                'zone': zone['uid'],
                 'correct': True,
                 'x_percent': attempt['x_percent'],
                 'y_percent': attempt['y_percent'],
-            }
+            })
 
-        if state:
-            self.item_state[str(item['id'])] = state
-            zone = self._get_zone_by_uid(state['zone'])
-        else:
-            zone = self._get_zone_by_uid(attempt['zone'])
-        if not zone:
-            raise JsonHandlerError(400, "Item zone data invalid.")
+        drop_event = {
+            'item_id': item['id'],
+            'location': zone.get("title"),
+            'location_id': zone.get("uid"),
+            'is_correct': is_correct,
+        }
 
-        if self._is_finished():
-            overall_feedback = self.data['feedback']['finish']
+        return is_correct, feedback, drop_event
+
+    def _update_grade(self, index):
+        """
+        Publish the learner's grade after one or more drops, unless the problem was already completed.
+        Returns a tuple of whether the problem is finished and the overall feedback to show, if any.
+        """
+        is_finished = self._is_finished(index)
+        overall_feedback = index.data['feedback']['finish'] if is_finished else None
 
         # don't publish the grade if the student has already completed the problem
         if not self.completed:
-            if self._is_finished():
+            if is_finished:
                 self.completed = True
-            try:
-                self.runtime.publish(self, 'grade', {
-                    'value': self._get_grade(),
-                    'max_value': self.weight,
-                })
-            except NotImplementedError:
-                # Note, this publish method is unimplemented in Studio runtimes,
-                # so we have to figure that we're running in Studio for now
-                pass
-
-        self.runtime.publish(self, 'edx.drag_and_drop_v2.item.dropped', {
-            'item_id': item['id'],
-            'location': zone.get("title"),
-            'location_id': zone.get("uid"),
-            'is_correct': is_correct,
-        })
+            self._publish_grade(self._get_grade(index), is_finished)
 
-        if self.mode == self.ASSESSMENT_MODE:
-            # In assessment mode we don't send any feedback on drop.
-            result = {}
-        else:
-            result = {
-                'correct': is_correct,
-                'finished': self._is_finished(),
-                'overall_feedback': overall_feedback,
-                'feedback': feedback
-            }
+        return is_finished, overall_feedback
 
-        return result
+    def _publish_grade(self, value, immediately):
+        """
+        Publish the learner's grade, unless it is the same as the last published grade.
+
+        If the `grade_publish_interval` setting is set, grades are published at most once per that
+        many seconds, unless `immediately` is set (e.g. when the problem is finished). Changes within
+        the interval are published with the next change after it, or by `_publish_pending_grade`.
+        """
+        if value == self.last_published_grade:
+            self.grade_pending = False
+            metrics.count(self, 'grade.skipped_unchanged')
+            return
+
+        now = time.time()
+        interval = self.get_xblock_settings(default={}).get('grade_publish_interval')
+        if interval and not immediately and self.last_grade_publish_time is not None:
+            if now - self.last_grade_publish_time < interval:
+                self.grade_pending = True
+                metrics.count(self, 'grade.deferred')
+                return
+
+        try:
+            self._publish('grade', {
+                'value': value,
+                'max_value': self.weight,
+            })
+        except NotImplementedError:
+            # Note, this publish method is unimplemented in Studio runtimes,
+            # so we have to figure that we're running in Studio for now
+            return
+        self.last_published_grade = value
+        self.last_grade_publish_time = now
+        self.grade_pending = False
+        metrics.count(self, 'grade.published')
+
+    def _publish_pending_grade(self):
+        """
+        Publish the last grade change deferred by the `grade_publish_interval` setting, if any.
 
+        This is done when the learner loads the problem, which the client reports through the
+        `publish_events` handler, or resets it, so that the last change is published even if no
+        drop follows it. Views and GET handlers don't do it, since their field changes may not
+        be saved.
+        """
+        if self.grade_pending:
+            self._publish_grade(self._get_grade(), immediately=True)
+
+    @metrics.instrumented
     @XBlock.json_handler
     def reset(self, data, suffix=''):
+        self._publish_pending_grade()
         self.item_state = {}
+        self.item_stats = {'version': self._get_problem_index().version, 'placed': 0, 'correct': 0}
         return self._get_user_state()
 
     def _is_attempt_correct(self, attempt):
         """
         Check if the item was placed correctly.
         """
-        correct_zones = self._get_item_zones(attempt['val'])
-        return attempt['zone'] in correct_zones
+        return self._get_problem_index().is_correct(attempt['val'], attempt['zone'])
 
     def _expand_static_url(self, url):
         """
         This is required to make URLs like '/static/dnd-test-image.png' work (note: that is the
         only portable URL format for static files that works across export/import and reruns).
+        """
+        return self._expand_static_urls([url])[0]
+
+    def _expand_static_urls(self, urls):
+        """
+        Expand a list of static URLs, returning the expanded URLs in the same order.
+        URLs that haven't been expanded for this course yet are expanded with a single call
+        to the runtime, and the results are memoized.
+        """
+        key_prefix = (type(self.runtime).__name__, unicode(getattr(self.runtime, 'course_id', '')))
+        expanded = {}
+        missing = []
+        for url in urls:
+            cached = _STATIC_URL_CACHE.get(key_prefix + (url,))
+            if cached is not None:
+                expanded[url] = cached
+            elif url not in missing:
+                missing.append(url)
+        if missing:
+            for url, expanded_url in zip(missing, self._replace_urls(missing)):
+                expanded[url] = expanded_url
+                _STATIC_URL_CACHE.set(key_prefix + (url,), expanded_url)
+        return [expanded[url] for url in urls]
+
+    def _replace_urls(self, urls):
+        """
+        Rewrite static URLs using the runtime. All of the URLs are rewritten as a single document,
+        one quoted URL per line.
         This method is unfortunately a bit hackish since XBlock does not provide a low-level API
         for this.
         """
         if hasattr(self.runtime, 'replace_urls'):
-            url = self.runtime.replace_urls('"{}"'.format(url))[1:-1]
-        elif hasattr(self.runtime, 'course_id'):
+            replace = self.runtime.replace_urls
+        elif hasattr(self.runtime, 'course_id') and _get_replace_static_urls():
             # edX Studio uses a different runtime for 'studio_view' than 'student_view',
             # and the 'studio_view' runtime doesn't provide the replace_urls API.
-            try:
-                from static_replace import replace_static_urls  # pylint: disable=import-error
-                url = replace_static_urls('"{}"'.format(url), None, course_id=self.runtime.course_id)[1:-1]
-            except ImportError:
-                pass
-        return url
+            replace_static_urls = _get_replace_static_urls()
+
+            def replace(text):
+                return replace_static_urls(text, None, course_id=self.runtime.course_id)
+        else:
+            return urls
 
+        if not any('\n' in url for url in urls):
+            lines = replace('\n'.join('"{}"'.format(url) for url in urls)).split('\n')
+            if len(lines) == len(urls):
+                return [line[1:-1] for line in lines]
+        # Fall back on rewriting the URLs one by one.
+        return [replace('"{}"'.format(url))[1:-1] for url in urls]
+
+    @metrics.instrumented
     @XBlock.json_handler
     def expand_static_url(self, url, suffix=''):
         """ AJAX-accessible handler for expanding URLs to static [image] files """
@@ -410,13 +772,25 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
     @property
     def default_background_image_url(self):
         """ The URL to the default background image, shown when no custom background is used """
-        return self.runtime.local_resource_url(self, "public/img/triangle.png")
+        return self.runtime.local_resource_url(self, DEFAULT_BACKGROUND_IMAGE)
 
+    @metrics.instrumented
     @XBlock.handler
     def get_user_state(self, request, suffix=''):
-        """ GET all user-specific data, and any applicable feedback """
-        data = self._get_user_state()
-        return webob.Response(body=json.dumps(data), content_type='application/json')
+        """
+        GET all user-specific data, and any applicable feedback.
+        Supports conditional requests: if the state matches the ETag sent in If-None-Match, the
+        response is an empty "304 Not Modified".
+        """
+        etag = self._get_state_token()
+        if etag in request.if_none_match:
+            response = webob.Response(status=304)
+        else:
+            response = webob.Response(body=json.dumps(self._get_user_state()), content_type='application/json')
+        response.etag = etag
+        # The response is specific to the learner, and must always be revalidated.
+        response.cache_control = 'private, no-cache'
+        return response
 
     def _get_user_state(self):
         """ Get all user-specific data, and any applicable feedback """
@@ -441,104 +815,123 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
             'items': item_state,
             'finished': is_finished,
             'num_attempts': self.num_attempts,
-            'overall_feedback': self.data['feedback']['finish' if is_finished else 'start'],
+            'overall_feedback': self._get_problem_index().data['feedback']['finish' if is_finished else 'start'],
         }
 
+    def _get_state_token(self):
+        """
+        Returns a token identifying the current user state, as returned by `_get_user_state`.
+
+        The token is computed from the stored fields the user state is derived from, rather than
+        from the user state itself, so that it's cheap to compute.
+        """
+        return hashlib.sha1(json.dumps(
+            [self._get_problem_index().version, self.item_state, self.num_attempts, self.completed],
+            sort_keys=True
+        )).hexdigest()
+
     def _get_item_state(self):
         """
-        Returns the user item state.
+        Returns the user item state, decoded from its stored form.
         Converts to a dict if data is stored in legacy tuple form.
         """
-        state = {}
+        return decode_item_state(self.item_state)
 
-        for item_id, item in self.item_state.iteritems():
-            if isinstance(item, dict):
-                state[item_id] = item
-            else:
-                state[item_id] = {'top': item[0], 'left': item[1]}
+    def _get_problem_index(self):
+        """
+        Returns the compiled lookup index for the current version of the problem data.
 
-        return state
+        The index is kept on the block for as long as its `data` is the same object, so that
+        the version of problems saved before it was stored in their data is only computed once.
+        """
+        data = self.data
+        if self._problem_index is None or self._problem_index[0] is not data:
+            self._problem_index = (data, get_problem_index(data))
+        return self._problem_index[1]
 
     def _get_item_definition(self, item_id):
         """
         Returns definition (settings) for item identified by `item_id`.
         """
-        return next(i for i in self.data['items'] if i['id'] == item_id)
+        return self._get_problem_index().items[item_id]
 
     def _get_item_zones(self, item_id):
         """
         Returns a list of the zones that are valid options for the item.
-
-        If the item is configured with a list of zones, return that list. If
-        the item is configured with a single zone, encapsulate that zone's
-        ID in a list and return the list. If the item is not configured with
-        any zones, or if it's configured explicitly with no zones, return an
-        empty list.
-        """
-        item = self._get_item_definition(item_id)
-        if item.get('zones') is not None:
-            return item.get('zones')
-        elif item.get('zone') is not None and item.get('zone') != 'none':
-            return [item.get('zone')]
-        else:
-            return []
+        """
+        return list(self._get_problem_index().item_zones[item_id])
 
     def _get_zones(self):
         """
         Get drop zone data, defined by the author.
         """
-        # Convert zone data from old to new format if necessary
-        zones = []
-        for zone in self.data.get('zones', []):
-            zone = zone.copy()
-            if "uid" not in zone:
-                zone["uid"] = zone.get("title")  # Older versions used title as the zone UID
-            # Remove old, now-unused zone attributes, if present:
-            zone.pop("id", None)
-            zone.pop("index", None)
-            zones.append(zone)
-        return zones
+        return [zone.copy() for zone in self._get_problem_index().zones]
 
     def _get_zone_by_uid(self, uid):
         """
         Given a zone UID, return that zone, or None.
         """
-        for zone in self._get_zones():
-            if zone["uid"] == uid:
-                return zone
+        return self._get_problem_index().zones_by_uid.get(uid)
 
-    def _get_item_stats(self):
+    def _set_item_state(self, index, item_id, state):
         """
-        Returns a tuple representing the number of correctly-placed items,
-        and the total number of items that must be placed on the board (non-decoy items).
+        Stores the learner's placement of an item, updating the correctness counters in place.
         """
-        all_items = self.data['items']
+        self._get_item_stats(index)  # Make sure the counters match the current state before updating them
         item_state = self._get_item_state()
+        was_correct = item_state.get(item_id, {}).get('correct')
+        item_state[item_id] = state
+        # Re-encoding on every write also migrates item states stored in an older format.
+        self.item_state = encode_item_state(item_state)
+
+        stats = dict(self.item_stats, placed=len(item_state))
+        if item_id in index.required_items and state['correct'] and not was_correct:
+            stats['correct'] += 1
+        self.item_stats = stats
+
+    def _count_correct_items(self, index):
+        """
+        Counts the correctly-placed required items by walking the whole user item state.
+        """
+        return index.count_correct(self._get_item_state())
 
-        required_items = [str(item['id']) for item in all_items if self._get_item_zones(item['id']) != []]
-        placed_items = [item for item in required_items if item in item_state]
-        correct_items = [item for item in placed_items if item_state[item]['correct']]
+    def _get_item_stats(self, index=None):
+        """
+        Returns a tuple representing the number of correctly-placed items,
+        and the total number of items that must be placed on the board (non-decoy items).
 
-        required_count = len(required_items)
-        correct_count = len(correct_items)
+        The number of correctly-placed items is maintained as items are placed; it is only
+        recounted if the problem data changed, or the item state was changed behind our back.
+        """
+        if index is None:
+            index = self._get_problem_index()
+        stats = self.item_stats
+        if stats.get('version') != index.version or stats.get('placed') != item_count(self.item_state):
+            stats = {
+                'version': index.version,
+                'placed': item_count(self.item_state),
+                'correct': self._count_correct_items(index),
+            }
+            self.item_stats = stats
 
-        return correct_count, required_count
+        return stats['correct'], len(index.required_items)
 
-    def _get_grade(self):
+    def _get_grade(self, index=None):
         """
         Returns the student's grade for this block.
         """
-        correct_count, required_count = self._get_item_stats()
+        correct_count, required_count = self._get_item_stats(index)
         return correct_count / float(required_count) * self.weight
 
-    def _is_finished(self):
+    def _is_finished(self, index=None):
         """
         All items are at their correct place and a value has been
         submitted for each item that expects a value.
         """
-        correct_count, required_count = self._get_item_stats()
+        correct_count, required_count = self._get_item_stats(index)
         return correct_count == required_count
 
+    @metrics.instrumented
     @XBlock.json_handler
     def publish_event(self, data, suffix=''):
         try:
@@ -546,9 +939,51 @@ class DragAndDropBlock(XBlock, XBlockWithSettingsMixin, ThemableXBlockMixin):
         except KeyError:
             return {'result': 'error', 'message': 'Missing event_type in JSON data'}
 
-        self.runtime.publish(self, event_type, data)
+        self._publish(event_type, data)
         return {'result': 'success'}
 
+    @metrics.instrumented
+    @XBlock.json_handler
+    def publish_events(self, data, suffix=''):
+        """
+        Publish a batch of this block's tracking events, sent as {"events": [{"event_type": ...}, ...]}.
+        The batch is only published if all of its events are valid.
+        """
+        events = data.get('events') if isinstance(data, dict) else None
+        try:
+            self._publish_client_events(events)
+        except ValueError as err:
+            return {'result': 'error', 'message': err.message}
+        self._publish_pending_grade()
+        return {'result': 'success'}
+
+    def _publish_client_events(self, events):
+        """
+        Publish a list of tracking events sent by the client. Raises a ValueError,
+        without publishing anything, if any of the events is invalid.
+        """
+        if not isinstance(events, list):
+            raise ValueError('Missing list of events in JSON data')
+        if len(events) > self.MAX_EVENTS_PER_BATCH:
+            raise ValueError('Too many events in JSON data')
+        for event in events:
+            if not isinstance(event, dict) or not isinstance(event.get('event_type'), basestring):
+                raise ValueError('Missing event_type in JSON data')
+            if not event['event_type'].startswith(self.EVENT_TYPE_PREFIX):
+                raise ValueError('Invalid event_type in JSON data')
+
+        for event in events:
+            event = dict(event)
+            event_type = event.pop('event_type')
+            self._publish(event_type, event)
+
+    def _publish(self, event_type, data):
+        """
+        Publish an event through the runtime, and count it for the instrumentation of the current view or handler.
+        """
+        self.runtime.publish(self, event_type, data)
+        metrics.count_event(event_type)
+
     def _get_unique_id(self):
         usage_id = self.scope_ids.usage_id
         try:
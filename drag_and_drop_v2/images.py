@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+#
+"""
+Measurement and resizing of the images of a problem.
+
+Zones are positioned in pixels of the background image at its natural size, which the client
+otherwise only learns once the whole image has been downloaded. The size is read here from the
+header of the image file, without decoding it.
+
+Authors often upload photos that are much larger than they are displayed. When Pillow is
+installed, smaller copies ("variants") of the PNG and JPEG images that are course assets are
+saved next to them, so that browsers can pick the one that fits the screen from a srcset.
+Variants are named after the content digest of their original, so that course assets that
+haven't changed since the problem was last saved don't have to be read again. The variants of
+earlier versions of an asset are left in place, since other blocks, or reruns of the course, may
+still use them.
+"""
+
+# Imports ###########################################################
+
+import hashlib
+import io
+import logging
+import os
+import re
+import struct
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# Globals ###########################################################
+
+log = logging.getLogger(__name__)
+
+# Number of bytes read from the start of an image to find its size. The size of JPEG images is
+# usually found in the first few kilobytes, after the metadata; SVG root elements come first too.
+HEADER_SIZE = 64 * 1024
+
+# Markers of the JPEG segments that start a frame, and have its size.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+SVG_ROOT_RE = re.compile(r'<svg\b[^>]*>', re.IGNORECASE)
+SVG_ATTRIBUTE_RE = r'\b{}\s*=\s*["\']\s*([^"\']*?)\s*["\']'
+# SVG lengths in absolute units, or without units (pixels). Relative lengths (%, em) are ignored.
+SVG_LENGTH_RE = re.compile(r'^([0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?)\s*(px|pt|pc|mm|cm|in)?$')
+SVG_UNITS = {None: 1.0, 'px': 1.0, 'pt': 4.0 / 3, 'pc': 16.0, 'mm': 96 / 25.4, 'cm': 96 / 2.54, 'in': 96.0}
+
+# Widths of the variants of images that are wider than that, in pixels.
+VARIANT_WIDTHS = (480, 960, 1440)
+
+# Names of the variants: the name of the original, the digest of its content, and their width.
+VARIANT_NAME_RE = re.compile(r'\.([0-9a-f]{8})\.[0-9]+w\.[a-z]+$')
+
+# File extension, content type and compact encoding options of the variants, by image format.
+VARIANT_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'PNG': ('png', 'image/png', {'optimize': True}),
+}
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_NOT_IMPORTED = object()
+_contentstore = _NOT_IMPORTED
+
+# Sizes of the images that are part of this package, by path.
+_package_image_sizes = {}
+
+
+# Functions #########################################################
+
+def get_image_size(header):
+    """
+    Returns the (width, height) in pixels of a PNG, GIF, JPEG or SVG image from the first bytes of
+    its file, or None if it isn't one of those formats or its size can't be found.
+    """
+    try:
+        if header.startswith('\x89PNG\r\n\x1a\n') and header[12:16] == 'IHDR':
+            return struct.unpack('>II', header[16:24])
+        if header[:6] in ('GIF87a', 'GIF89a'):
+            return struct.unpack('<HH', header[6:10])
+        if header.startswith('\xff\xd8'):
+            return _get_jpeg_size(header)
+    except struct.error:
+        return None
+    return _get_svg_size(header)
+
+
+def _get_jpeg_size(header):
+    """
+    Walks the segments of a JPEG image until the start of the frame.
+    """
+    offset = 2
+    while offset + 4 <= len(header):
+        if header[offset] != '\xff':
+            return None
+        marker = ord(header[offset + 1])
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # Markers without a length
+            offset += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', header[offset + 5:offset + 9])
+            return (width, height) if width and height else None
+        offset += 2 + struct.unpack('>H', header[offset + 2:offset + 4])[0]
+    return None
+
+
+def _get_svg_size(header):
+    """
+    Returns the size of an SVG image from the width and height of its root element, or its viewBox.
+    """
+    text = header.decode('utf-8', 'ignore')
+    root = SVG_ROOT_RE.search(text)
+    if root is None:
+        return None
+    root = root.group(0)
+
+    def attribute(name):
+        match = re.search(SVG_ATTRIBUTE_RE.format(name), root)
+        return match.group(1) if match else None
+
+    width, height = _svg_length(attribute('width')), _svg_length(attribute('height'))
+    view_box = (attribute('viewBox') or '').replace(',', ' ').split()
+    if len(view_box) == 4 and (width is None or height is None):
+        try:
+            box_width, box_height = float(view_box[2]), float(view_box[3])
+        except ValueError:
+            box_width = box_height = 0
+        if box_width > 0 and box_height > 0:
+            # Like browsers, keep the aspect ratio of the viewBox when only one length is given.
+            if width is not None:
+                height = width * box_height / box_width
+            elif height is not None:
+                width = height * box_width / box_height
+            else:
+                width, height = box_width, box_height
+    if not width or not height:
+        return None
+    return int(round(width)), int(round(height))
+
+
+def _svg_length(value):
+    match = SVG_LENGTH_RE.match(value or '')
+    if match is None:
+        return None
+    return float(match.group(1)) * SVG_UNITS[match.group(2)]
+
+
+def get_package_image_size(path):
+    """
+    Returns the size of the image at `path` in this package, e.g. the default background image.
+    """
+    if path not in _package_image_sizes:
+        header = read_file_header(os.path.join(PACKAGE_DIR, path))
+        _package_image_sizes[path] = get_image_size(header) if header else None
+    return _package_image_sizes[path]
+
+
+def read_file_header(path):
+    """
+    Returns the first bytes of the file at `path`, or None if it can't be read.
+    """
+    try:
+        with open(path, 'rb') as image:
+            return image.read(HEADER_SIZE)
+    except (IOError, OSError):
+        return None
+
+
+def get_course_asset_image(course_key, url, stored=None):
+    """
+    Returns the (width, height) of the course asset image at the portable URL `url` ("/static/..."),
+    or None, and the [url, width] of its variants from the narrowest to the widest, as a tuple.
+
+    `stored` is the (size, variants) tuple returned for the image when the problem was last saved.
+    It is returned as is if the asset hasn't changed since. Otherwise the asset is read once, and
+    the variants that don't exist yet are saved next to it.
+
+    Returns (None, []) if the asset can't be found or the edx-platform contentstore is not available.
+    There are no variants if the image is not a PNG or JPEG image wider than the narrowest variant,
+    or if Pillow is not installed.
+    """
+    contentstore = _get_contentstore()
+    if contentstore is None or course_key is None or not url.startswith('/static/'):
+        return None, []
+    static_content, get_contentstore = contentstore
+    stored_variants = stored[1] if stored else []
+    try:
+        asset = get_contentstore().find(
+            static_content.compute_location(course_key, url[len('/static/'):]), as_stream=True
+        )
+    except Exception:  # pylint: disable=broad-except
+        # The contentstore raises NotFoundError, which we can't import here.
+        return None, []
+    # The contentstore keeps a digest of the content of assets, which is in the names of their variants.
+    digest = getattr(asset, 'content_digest', None)
+    if digest and stored_variants and all(_variant_digest(name) == digest[:8] for name, _ in stored_variants):
+        return stored
+    return _read_course_asset_image(contentstore, course_key, url, asset)
+
+
+def _read_course_asset_image(contentstore, course_key, url, asset):
+    """
+    Reads the course asset `url` once, to find the size of the image and save its variants.
+    The size is returned even if the variants can't be saved.
+    """
+    chunks = iter(asset.stream_data())
+    header = ''.join(_take(chunks, HEADER_SIZE))
+    size = get_image_size(header)
+    if Image is None or not size or size[0] <= min(VARIANT_WIDTHS):
+        return size, []
+    content = header + ''.join(chunks)
+    try:
+        return size, _save_variants(contentstore, course_key, url, content, getattr(asset, 'content_digest', None))
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Could not save the variants of the course asset %s", url)
+        return size, []
+
+
+def _save_variants(contentstore, course_key, url, content, digest=None):
+    """
+    Saves the variants of the course asset `url` with the given `content` that don't exist yet,
+    and returns the [url, width] of all its variants.
+    """
+    try:
+        image = Image.open(io.BytesIO(content))  # Only reads the header.
+    except (IOError, ValueError, SyntaxError):
+        return []
+    if image.format not in VARIANT_FORMATS:
+        return []
+
+    # Variants are named after the content of the original, so they are made again when it changes.
+    names = _variant_names(url, image, digest or hashlib.sha1(content).hexdigest())
+    static_content, get_contentstore = contentstore
+    missing = [
+        width for width, name in names.iteritems()
+        if get_contentstore().find(
+            static_content.compute_location(course_key, name), throw_on_not_found=False, as_stream=True
+        ) is None
+    ]
+    for width, content_type, variant in make_variants(content, missing):
+        location = static_content.compute_location(course_key, names[width])
+        get_contentstore().save(static_content(location, names[width], content_type, variant))
+    return [['/static/' + names[width], width] for width in sorted(names)]
+
+
+def _variant_names(url, image, digest):
+    """
+    Returns the names of the variants of the course asset `url`, by width.
+    """
+    stem = os.path.splitext(url[len('/static/'):])[0]
+    extension = VARIANT_FORMATS[image.format][0]
+    return {
+        width: '{}.{}.{}w.{}'.format(stem, digest[:8], width, extension)
+        for width in VARIANT_WIDTHS if width < image.size[0]
+    }
+
+
+def _variant_digest(variant_url):
+    """
+    Returns the digest in the name of a variant, or None if it isn't named like one.
+    """
+    match = VARIANT_NAME_RE.search(variant_url)
+    return match.group(1) if match else None
+
+
+def make_variants(content, widths=VARIANT_WIDTHS):
+    """
+    Returns copies of the PNG or JPEG image `content` at the given widths, in the same format, as a
+    list of (width, content type, bytes) tuples. Widths that aren't smaller than the image are
+    skipped. Returns an empty list if Pillow is not installed or the image isn't supported.
+    """
+    if Image is None:
+        return []
+    try:
+        image = Image.open(io.BytesIO(content))
+        image.load()
+    except (IOError, ValueError, SyntaxError):
+        return []
+    if image.format not in VARIANT_FORMATS:
+        return []
+    _extension, content_type, options = VARIANT_FORMATS[image.format]
+    original_width, original_height = image.size
+    variants = []
+    for width in sorted(set(widths)):
+        if width >= original_width:
+            break
+        height = max(1, int(round(original_height * float(width) / original_width)))
+        variant = image.resize((width, height), Image.LANCZOS)
+        if image.format == 'JPEG' and variant.mode not in ('RGB', 'L'):
+            variant = variant.convert('RGB')
+        output = io.BytesIO()
+        variant.save(output, image.format, **options)
+        variants.append((width, content_type, output.getvalue()))
+    return variants
+
+
+def _take(chunks, size):
+    """
+    Yields chunks from the iterable `chunks` until at least `size` bytes have been yielded.
+    """
+    for chunk in chunks:
+        yield chunk
+        size -= len(chunk)
+        if size <= 0:
+            return
+
+
+def _get_contentstore():
+    """
+    Returns edx-platform's StaticContent class and contentstore function, or None outside of
+    edx-platform. The import is only attempted once per process.
+    """
+    global _contentstore  # pylint: disable=global-statement
+    if _contentstore is _NOT_IMPORTED:
+        try:
+            # pylint: disable=import-error
+            from xmodule.contentstore.content import StaticContent
+            from xmodule.contentstore.django import contentstore
+        except ImportError:
+            _contentstore = None
+        else:
+            _contentstore = (StaticContent, contentstore)
+    return _contentstore
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+#
+
+# Imports ###########################################################
+
+import functools
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+
+# Globals ###########################################################
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters = Counter()
+_histograms = {}
+
+# Upper bounds of the histogram buckets, for latencies in milliseconds, payload sizes in bytes,
+# and other counts.
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SIZE_BUCKETS_BYTES = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Sinks already configured, by their JSON-encoded configuration.
+_sinks = {}
+
+# The sinks of the settings objects seen so far, by their id. XBlock settings are read from the
+# Django settings, so they are the same objects on every request, and the configuration of their
+# sink only has to be encoded once.
+_settings_sinks = {}
+
+# Instrumentation context of the view or handler that is running in the current thread.
+_context = threading.local()
+_NO_CONTEXT = object()
+
+
+# Functions #########################################################
+
+def increment(name, value=1):
+    """
+    Add `value` to the process-wide counter `name`.
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def count(block, name, value=1):
+    """
+    Add `value` to the counter `name` of the metrics sink configured for the block, or to the
+    process-wide counter if instrumentation is not enabled. Within an instrumented view or
+    handler, the sink it reports to is reused.
+    """
+    sink = getattr(_context, 'sink', _NO_CONTEXT)
+    if sink is _NO_CONTEXT:
+        sink = get_sink(block)
+    if sink is None:
+        increment(name, value)
+    else:
+        sink.increment(name, value)
+
+
+def observe(name, value, buckets):
+    """
+    Record `value` in the process-wide histogram `name`, which has the given bucket upper bounds.
+    """
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def get_counters():
+    """
+    Returns a snapshot of all counters, as a dict.
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def get_histograms():
+    """
+    Returns a snapshot of all histograms, as a dict of dicts with the bucket counts, sum and count.
+    """
+    with _lock:
+        return {name: histogram.snapshot() for name, histogram in _histograms.iteritems()}
+
+
+def reset():
+    """
+    Reset all counters and histograms.
+    """
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def prometheus_text(prefix='drag_and_drop_v2', labels=()):
+    """
+    Returns the process-wide counters and histograms in the Prometheus text exposition format,
+    with the given (name, value) `labels` on every sample.
+    """
+    lines = []
+    for name, value in sorted(get_counters().iteritems()):
+        metric = _prometheus_name(prefix, name) + '_total'
+        lines.append('# TYPE {} counter'.format(metric))
+        lines.append('{}{} {}'.format(metric, _prometheus_labels(labels), value))
+    for name, histogram in sorted(get_histograms().iteritems()):
+        metric = _prometheus_name(prefix, name)
+        lines.append('# TYPE {} histogram'.format(metric))
+        cumulative = 0
+        for bound, bucket_count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += bucket_count
+            lines.append('{}_bucket{} {}'.format(metric, _prometheus_labels(labels, le=bound), cumulative))
+        lines.append('{}_bucket{} {}'.format(metric, _prometheus_labels(labels, le='+Inf'), histogram['count']))
+        lines.append('{}_sum{} {}'.format(metric, _prometheus_labels(labels), histogram['sum']))
+        lines.append('{}_count{} {}'.format(metric, _prometheus_labels(labels), histogram['count']))
+    return '\n'.join(lines) + '\n'
+
+
+def count_event(event_type):
+    """
+    Counts an event published by the view or handler that is running in the current thread, if it is instrumented.
+    """
+    events = getattr(_context, 'events', None)
+    if events is not None:
+        events[event_type] += 1
+
+
+def get_sink(block):
+    """
+    Returns the metrics sink configured in the `metrics` entry of the block's XBlock settings,
+    or None if instrumentation is not enabled.
+    """
+    config = block.get_xblock_settings(default={}).get('metrics')
+    if not config:
+        return None
+    # The settings object is kept along with its sink, so that its id isn't reused by another object.
+    cached = _settings_sinks.get(id(config))
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    key = json.dumps(config, sort_keys=True)
+    sink = _sinks.get(key)
+    if sink is None:
+        sink = _sinks[key] = _make_sink(config)
+    _settings_sinks[id(config)] = (config, sink)
+    return sink
+
+
+def instrumented(func):
+    """
+    Decorator for views and handlers of the block, which reports their latency, the size of
+    their request and response, the number of fields they read and write, and the events they
+    publish to the configured metrics sink.
+
+    The decorated function keeps the attributes XBlock uses to find views and handlers. The sink
+    is looked up once per call, and reused by `count` while the function runs.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(block, request_or_context, *args, **kwargs):
+        sink = get_sink(block)
+        previous_context = getattr(_context, 'sink', _NO_CONTEXT), getattr(_context, 'events', None)
+        _context.sink = sink
+        _context.events = events = Counter() if sink is not None else None
+        try:
+            if sink is None:
+                return func(block, request_or_context, *args, **kwargs)
+            fields_loaded, _ = _field_counts(block)
+            start = time.time()
+            result = func(block, request_or_context, *args, **kwargs)
+        finally:
+            _restore_context(*previous_context)
+        sink.timing(name + '.latency_ms', (time.time() - start) * 1000)
+
+        _report_sizes(sink, name, request_or_context, result)
+        _report_fields(sink, name, block, fields_loaded)
+        for event_type, event_count in events.iteritems():
+            sink.increment('{}.events.{}'.format(name, event_type), event_count)
+        return result
+
+    return wrapper
+
+
+def _restore_context(sink, events):
+    """
+    Restores the instrumentation context of the view or handler that called an instrumented one, if any.
+    """
+    if sink is _NO_CONTEXT:
+        del _context.sink
+    else:
+        _context.sink = sink
+    _context.events = events
+
+
+def _report_sizes(sink, name, request_or_context, result):
+    """
+    Reports the size of the request and response of the view or handler `name`, when they have one.
+    """
+    for metric, payload in (('.request_bytes', request_or_context), ('.response_bytes', result)):
+        size = _payload_size(payload)
+        if size is not None:
+            sink.histogram(name + metric, size)
+
+
+def _report_fields(sink, name, block, fields_loaded):
+    """
+    Reports the number of fields the view or handler `name` read and has to save, when they can be counted.
+    """
+    fields_read, fields_written = _field_counts(block)
+    if fields_read is not None:
+        sink.histogram(name + '.field_reads', fields_read - fields_loaded)
+        sink.histogram(name + '.field_writes', fields_written)
+
+
+def _field_counts(block):
+    """
+    Returns the number of fields the block has read from its field data, and the number of fields
+    it has to save, or (None, None) if they can't be counted.
+
+    XBlock has no public API for these: this relies on the field cache and dirty field tracking of
+    XBlock 1.x (tested with XBlock 1.2). Fields are read from the field data the first time they're
+    accessed, and cached afterwards.
+    """
+    # pylint: disable=protected-access
+    try:
+        return len(block._field_data_cache), len(block._get_fields_to_save())
+    except (AttributeError, TypeError):
+        return None, None
+
+
+def _payload_size(value):
+    """
+    Returns the size of the body of a request or response, or of the content of a fragment.
+    """
+    if hasattr(value, 'body'):
+        return len(value.body)
+    if hasattr(value, 'content'):
+        return len(value.content)
+    return None
+
+
+def _make_sink(config):
+    """
+    Instantiates a sink from its configuration: the name of a built-in sink or the dotted path
+    of a sink class, and the keyword arguments of its constructor.
+    """
+    config = dict(config)
+    sink_name = config.pop('sink', 'memory')
+    if sink_name in SINKS:
+        sink_class = SINKS[sink_name]
+    else:
+        module_name, class_name = sink_name.rsplit('.', 1)
+        sink_class = getattr(importlib.import_module(module_name), class_name)
+    return sink_class(**config)
+
+
+def _prometheus_name(prefix, name):
+    return ''.join(char if char.isalnum() else '_' for char in '{}_{}'.format(prefix, name))
+
+
+def _prometheus_labels(labels, **extra_labels):
+    labels = list(labels) + sorted(extra_labels.iteritems())
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, value) for name, value in labels) + '}'
+
+
+# Classes ###########################################################
+
+class Histogram(object):
+    """
+    Counts of observed values per bucket, with their sum. Not thread-safe by itself.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {'buckets': self.buckets, 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class MemorySink(object):
+    """
+    Records metrics in the process-wide counters and histograms of this module.
+    """
+
+    @staticmethod
+    def timing(name, milliseconds):
+        observe(name, milliseconds, LATENCY_BUCKETS_MS)
+
+    @staticmethod
+    def histogram(name, value):
+        observe(name, value, SIZE_BUCKETS_BYTES if name.endswith('_bytes') else COUNT_BUCKETS)
+
+    @staticmethod
+    def increment(name, value=1):
+        increment(name, value)
+
+
+class StatsdSink(object):
+    """
+    Sends metrics to a statsd server over UDP. Metrics that can't be sent are dropped.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='drag_and_drop_v2'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def _send(self, name, value, metric_type):
+        try:
+            self._socket.sendto('{}.{}:{}|{}'.format(self.prefix, name, value, metric_type), self.address)
+        except socket.error:
+            pass
+
+    def timing(self, name, milliseconds):
+        self._send(name, '{:.3f}'.format(milliseconds), 'ms')
+
+    def histogram(self, name, value):
+        self._send(name, value, 'h')
+
+    def increment(self, name, value=1):
+        self._send(name, value, 'c')
+
+
+class PrometheusSink(MemorySink):
+    """
+    Records metrics in memory, and writes them in the Prometheus text format at most every
+    `interval` seconds, e.g. for the textfile collector of the node exporter.
+
+    Each process only knows its own metrics, so each one writes them to its own file, named after
+    `path` and its PID: "metrics.prom" becomes "metrics.<pid>.prom". Their samples have a `pid`
+    label, so that the collector can read all of them, and queries have to sum them up.
+    """
+
+    def __init__(self, path, interval=15, prefix='drag_and_drop_v2'):
+        self.path = path
+        self.interval = interval
+        self.prefix = prefix
+        self._last_dump = 0
+
+    def _maybe_dump(self):
+        now = time.time()
+        if now - self._last_dump < self.interval:
+            return
+        self._last_dump = now
+        pid = os.getpid()
+        path = self.process_path(pid)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as dump:
+                dump.write(prometheus_text(self.prefix, labels=[('pid', pid)]))
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            log.exception("Could not write the metrics to %s", path)
+
+    def process_path(self, pid):
+        """
+        Returns the path of the file the process with the given PID writes its metrics to.
+        """
+        root, extension = os.path.splitext(self.path)
+        return '{}.{}{}'.format(root, pid, extension or '.prom')
+
+    def timing(self, name, milliseconds):
+        super(PrometheusSink, self).timing(name, milliseconds)
+        self._maybe_dump()
+
+    def histogram(self, name, value):
+        super(PrometheusSink, self).histogram(name, value)
+        self._maybe_dump()
+
+    def increment(self, name, value=1):
+        super(PrometheusSink, self).increment(name, value)
+        self._maybe_dump()
+
+
+SINKS = {
+    'memory': MemorySink,
+    'statsd': StatsdSink,
+    'prometheus': PrometheusSink,
+}
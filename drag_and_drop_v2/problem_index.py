@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+#
+
+# Imports ###########################################################
+
+import bisect
+import copy
+import hashlib
+import json
+import math
+
+from .schema import is_normalized, normalize_data
+from .utils import LRUCache
+
+
+# Globals ###########################################################
+
+# Compiled indexes are shared by all blocks in the process that have the same problem data.
+_INDEX_CACHE = LRUCache(maxsize=256)
+
+
+# Functions #########################################################
+
+def data_version(data):
+    """
+    Returns a content hash identifying this version of the problem `data`, not counting the
+    version stored in it, if any.
+
+    Hashing serializes the whole problem, so it's done when the problem is saved in Studio,
+    which stores the result in the data as "dataVersion".
+    """
+    if 'dataVersion' in data:
+        data = dict(data)
+        del data['dataVersion']
+    return hashlib.sha1(json.dumps(data, sort_keys=True)).hexdigest()
+
+
+def get_problem_index(data):
+    """
+    Returns the compiled ProblemIndex for `data`, building it only if this
+    version of the data has not been seen by the current process yet.
+
+    Data stored in an older format is normalized here, once per process, until
+    the problem is saved again in Studio. Indexes are cached by the content hash
+    of their data. The "dataVersion" stored in the data is only used to find the
+    index without hashing the data, if the index was built from the same data:
+    data changed outside of Studio (e.g. imported from OLX or edited by hand)
+    may keep a stale version. Otherwise the data is hashed on every call, so
+    callers should hold on to the index rather than look it up again.
+    """
+    stored_version = data.get('dataVersion')
+    index = _INDEX_CACHE.get(stored_version) if isinstance(stored_version, basestring) else None
+    if index is not None and index.data == {key: value for key, value in data.iteritems() if key != 'dataVersion'}:
+        return index
+    version = data_version(data)
+    index = _INDEX_CACHE.get(version)
+    if index is None:
+        index = ProblemIndex(data if is_normalized(data) else normalize_data(data), version)
+        _INDEX_CACHE.set(version, index)
+    return index
+
+
+# Classes ###########################################################
+
+class ProblemIndex(object):
+    """
+    Lookup tables compiled once per version of a block's problem data.
+
+    Instances are shared between blocks and requests, so the structures they
+    hold must be treated as read-only.
+    """
+
+    def __init__(self, data, version):
+        """
+        `data` must be normalized problem data; see the `schema` module.
+        """
+        self.version = version
+        self.data = copy.deepcopy(data)
+        self.data.pop('dataVersion', None)
+        self.items = {}
+        self.item_zones = {}
+        self.item_zone_sets = {}
+        for item in self.data['items']:
+            zones = tuple(item['zones'])
+            self.items[item['id']] = item
+            self.item_zones[item['id']] = zones
+            self.item_zone_sets[item['id']] = frozenset(zones)
+        self.zones = tuple(self.data['zones'])
+        self.zones_by_uid = {}
+        for zone in self.zones:
+            # Keep the first zone with a given UID, like a linear scan would.
+            self.zones_by_uid.setdefault(zone['uid'], zone)
+        self.required_items = frozenset(
+            str(item_id) for item_id, zones in self.item_zones.iteritems() if zones
+        )
+        self.zone_grid = ZoneGrid(self.zones)
+
+    def is_correct(self, item_id, zone_uid):
+        """
+        Returns True if `zone_uid` is one of the correct zones for the item.
+        """
+        return zone_uid in self.item_zone_sets.get(item_id, ())
+
+    def find_zone(self, zone_uid, x, y):
+        """
+        Returns the zone an item dropped at the point (x, y) is dropped on, or None: the zone with
+        the UID `zone_uid` if the point is inside it, even where other zones are displayed on top
+        of it, or the topmost zone at that point if `zone_uid` is None.
+        """
+        if zone_uid is None:
+            return self.zone_grid.find(x, y)
+        if self.zone_grid.contains(zone_uid, x, y):
+            return self.zones_by_uid[zone_uid]
+        return None
+
+    def count_correct(self, item_state):
+        """
+        Counts the correctly-placed required items in a (decoded) user item state.
+        """
+        return len([
+            item_id for item_id in self.required_items
+            if item_id in item_state and item_state[item_id].get('correct')
+        ])
+
+
+class ZoneGrid(object):
+    """
+    Uniform grid over the zone rectangles, to find the zone at a point of the background image.
+
+    The rectangles are in the pixel coordinates of the background image at its natural size.
+    Polygon zones are indexed by their bounding rectangle, and points inside it are then tested
+    against the polygon itself. Zones without a numeric position and size are left out.
+    """
+
+    def __init__(self, zones):
+        self.rects = []
+        self.polygons = {}
+        self.positions_by_uid = {}
+        for zone in zones:
+            rect = self._zone_rect(zone)
+            if rect is not None:
+                if zone.get('points'):
+                    self.polygons[len(self.rects)] = Polygon(zone['points'])
+                # Keep the first zone with a given UID, like `ProblemIndex.zones_by_uid`.
+                self.positions_by_uid.setdefault(zone['uid'], len(self.rects))
+                self.rects.append((rect, zone))
+
+        # Use about as many cells as there are zones, so that each cell only overlaps a few zones.
+        self.columns = self.rows = max(1, int(math.ceil(math.sqrt(len(self.rects)))))
+        self.width = max([rect[2] for rect, _ in self.rects] or [1]) or 1
+        self.height = max([rect[3] for rect, _ in self.rects] or [1]) or 1
+        self.cells = {}
+        for position, (rect, _) in enumerate(self.rects):
+            left, top, right, bottom = rect
+            for column in range(self._column(left), self._column(right) + 1):
+                for row in range(self._row(top), self._row(bottom) + 1):
+                    self.cells.setdefault((column, row), []).append(position)
+
+    def _column(self, x):
+        return min(max(int(x * self.columns / self.width), 0), self.columns - 1)
+
+    def _row(self, y):
+        return min(max(int(y * self.rows / self.height), 0), self.rows - 1)
+
+    def find(self, x, y):
+        """
+        Returns the zone containing the point (x, y), or None. Where zones overlap, the zone
+        defined last is returned, since it is displayed on top of the others.
+        """
+        for position in reversed(self.cells.get((self._column(x), self._row(y)), ())):
+            if self._contains(position, x, y):
+                return self.rects[position][1]
+        return None
+
+    def contains(self, zone_uid, x, y):
+        """
+        Returns True if the point (x, y) is inside the shape of the zone with the UID `zone_uid`,
+        whether or not other zones are displayed on top of it there.
+        """
+        position = self.positions_by_uid.get(zone_uid)
+        return position is not None and self._contains(position, x, y)
+
+    def _contains(self, position, x, y):
+        (left, top, right, bottom), _ = self.rects[position]
+        if not (left <= x <= right and top <= y <= bottom):
+            return False
+        polygon = self.polygons.get(position)
+        return polygon is None or polygon.contains(x, y)
+
+    @staticmethod
+    def _zone_rect(zone):
+        """
+        Returns the (left, top, right, bottom) rectangle of a zone, or None.
+        """
+        try:
+            left, top, width, height = [float(zone[key]) for key in ('x', 'y', 'width', 'height')]
+        except (KeyError, TypeError, ValueError):
+            return None
+        return left, top, left + width, top + height
+
+
+class Polygon(object):
+    """
+    Slab decomposition of a polygon, for point-in-polygon tests in logarithmic time.
+
+    The horizontal lines through the vertices cut the polygon into slabs. No vertex lies strictly
+    inside a slab, so the edges that cross a slab can be sorted from left to right once; a point
+    is inside the polygon if an odd number of those edges lies on its left.
+    """
+
+    def __init__(self, points):
+        points = [(float(x), float(y)) for x, y in points]
+        self.ys = sorted(set(y for _, y in points))
+        edges = [
+            (start, end) for start, end in zip(points, points[1:] + points[:1])
+            if start[1] != end[1]  # Horizontal edges are never crossed by a horizontal ray.
+        ]
+        self.slabs = [self._make_slab(edges, top, bottom) for top, bottom in zip(self.ys, self.ys[1:])]
+
+    @classmethod
+    def _make_slab(cls, edges, top, bottom):
+        """
+        Returns the edges crossing the slab between `top` and `bottom`, sorted from left to right,
+        and whether that order holds over the whole slab.
+        """
+        slab = []
+        for (x1, y1), (x2, y2) in edges:
+            if min(y1, y2) <= top and max(y1, y2) >= bottom:
+                # Store the edge as the line x = a + b * y.
+                slope = (x2 - x1) / (y2 - y1)
+                slab.append((x1 - slope * y1, slope))
+        middle = (top + bottom) / 2
+        slab.sort(key=lambda edge: cls._x_at(edge, middle))
+        # Edges of self-intersecting polygons may cross inside a slab, and can't be bisected.
+        ordered = all(
+            cls._x_at(slab[i], y) <= cls._x_at(slab[i + 1], y)
+            for i in range(len(slab) - 1) for y in (top, bottom)
+        )
+        return slab, ordered
+
+    @staticmethod
+    def _x_at(edge, y):
+        return edge[0] + edge[1] * y
+
+    def contains(self, x, y):
+        """
+        Returns True if the point (x, y) is inside the polygon.
+        """
+        if not self.slabs or not self.ys[0] <= y <= self.ys[-1]:
+            return False
+        slab, ordered = self.slabs[min(bisect.bisect_right(self.ys, y), len(self.slabs)) - 1]
+        if ordered:
+            low, high = 0, len(slab)
+            while low < high:
+                middle = (low + high) // 2
+                if self._x_at(slab[middle], y) <= x:
+                    low = middle + 1
+                else:
+                    high = middle
+            edges_on_left = low
+        else:
+            edges_on_left = len([edge for edge in slab if self._x_at(edge, y) <= x])
+        return edges_on_left % 2 == 1
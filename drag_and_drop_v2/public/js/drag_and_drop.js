@@ -1,6 +1,7 @@
 function DragAndDropTemplates(configuration) {
     "use strict";
     var h = virtualDom.h;
+    var SVG_NAMESPACE = 'http://www.w3.org/2000/svg';
     // Set up a mock for gettext if it isn't available in the client runtime:
     if (!window.gettext) { window.gettext = function gettext_stub(string) { return string; }; }
 
@@ -21,12 +22,48 @@ function DragAndDropTemplates(configuration) {
         });
     };
 
-    var getZone = function(zoneUID, ctx) {
-        for (var i = 0; i < ctx.zones.length; i++) {
-            if (ctx.zones[i].uid === zoneUID) {
-                return ctx.zones[i];
-            }
+    /**
+     * Inputs of memoized templates are equal if they are identical, or if they are arrays or plain
+     * objects with identical elements or properties; nested objects are compared one level deep.
+     */
+    var inputsEqual = function(a, b, shallow) {
+        if (a === b) {
+            return true;
+        }
+        if (shallow || !a || !b || typeof a !== 'object' || typeof b !== 'object') {
+            return false;
         }
+        var keys = Object.keys(a);
+        if (keys.length !== Object.keys(b).length) {
+            return false;
+        }
+        return keys.every(function(key) {
+            return b.hasOwnProperty(key) && inputsEqual(a[key], b[key], $.isArray(a) ? false : true);
+        });
+    };
+
+    /**
+     * A virtual-dom thunk that renders `template` with `args`. When the previous render had a thunk
+     * for the same template at the same place (with the same key) and equal `inputs`, its vnode is
+     * reused, and virtual-dom skips diffing the whole subtree.
+     */
+    var MemoizedThunk = function(template, key, inputs, args) {
+        this.template = template;
+        this.key = key;
+        this.inputs = inputs;
+        this.args = args;
+    };
+    MemoizedThunk.prototype.type = 'Thunk';
+    MemoizedThunk.prototype.render = function(previous) {
+        if (previous instanceof MemoizedThunk && previous.template === this.template && previous.vnode &&
+                inputsEqual(previous.inputs, this.inputs)) {
+            return previous.vnode;
+        }
+        return this.template.apply(null, this.args);
+    };
+
+    var getZone = function(zoneUID, ctx) {
+        return ctx.zones_by_uid[zoneUID];
     };
 
     var bankItemWidthStyles = function(item, ctx) {
@@ -44,10 +81,39 @@ function DragAndDropTemplates(configuration) {
         return style;
     };
 
-    var itemContentTemplate = function(item) {
+    /**
+     * Returns the "sizes" attribute of an image displayed at `percent` of the width of the viewport,
+     * but no wider than `maxWidth` pixels if it is known, so that browsers don't download (and scale
+     * up to) a variant of the image that is wider than it's displayed.
+     */
+    var imageSizes = function(percent, maxWidth) {
+        if (!maxWidth) {
+            return percent + 'vw';
+        }
+        return '(max-width: ' + Math.round(maxWidth * 100 / percent) + 'px) ' + percent + 'vw, ' +
+            Math.round(maxWidth) + 'px';
+    };
+
+    var itemContentTemplate = function(item, ctx) {
         var item_content_html = item.displayName;
         if (item.imageURL) {
-            item_content_html = '<img src="' + item.imageURL + '" alt="' + item.imageDescription + '" />';
+            var srcset = '';
+            if (item.imageSrcset) {
+                // Items are at most as wide as their width, or 30% of the background image, which
+                // is itself at most as wide as the viewport and its natural width. Items without a
+                // width are also at most as wide as their image.
+                var percent = item.widthPercent || 30;
+                var maxWidths = [];
+                if (ctx.bg_image_width) {
+                    maxWidths.push(percent / 100 * ctx.bg_image_width);
+                }
+                if (!item.widthPercent && item.imgNaturalWidth) {
+                    maxWidths.push(item.imgNaturalWidth);
+                }
+                var sizes = imageSizes(percent, maxWidths.length ? Math.min.apply(Math, maxWidths) : undefined);
+                srcset = ' srcset="' + item.imageSrcset + '" sizes="' + sizes + '"';
+            }
+            item_content_html = '<img src="' + item.imageURL + '"' + srcset + ' alt="' + item.imageDescription + '" />';
         }
         var key = item.value + '-content';
         return h('div', { key: key, innerHTML: item_content_html, className: "item-content" });
@@ -115,7 +181,7 @@ function DragAndDropTemplates(configuration) {
         var children = [
             itemSpinnerTemplate(item)
         ];
-        var item_content = itemContentTemplate(item);
+        var item_content = itemContentTemplate(item, ctx);
         if (item.is_placed) {
             // Insert information about zone in which this item has been placed
             var item_description_id = configuration.url_name + '-item-' + item.value + '-description';
@@ -154,6 +220,13 @@ function DragAndDropTemplates(configuration) {
         );
     };
 
+    // Items only depend on their own properties, on the zone they are placed in and on the size of
+    // the background image.
+    var memoizedItemTemplate = function(item, ctx) {
+        var inputs = [item, getZone(item.zone, ctx), ctx.bg_image_width];
+        return new MemoizedThunk(itemTemplate, item.value + (item.is_placed ? "-p" : "-u"), inputs, [item, ctx]);
+    };
+
     // When an item is dragged out of the bank, a hidden placeholder of the same width and height as
     // the original item is rendered in the bank. The function of the placeholder is to take up the
     // same amount of space as the original item so that the bank does not collapse when you've dragged
@@ -178,23 +251,46 @@ function DragAndDropTemplates(configuration) {
                     attributes: {draggable: false},
                     style: style
                 },
-                itemContentTemplate(item)
+                itemContentTemplate(item, ctx)
             )
         );
     };
 
+    var memoizedItemPlaceholderTemplate = function(item, ctx) {
+        var inputs = [item, ctx.bg_image_width];
+        return new MemoizedThunk(itemPlaceholderTemplate, 'placeholder-' + item.value, inputs, [item, ctx]);
+    };
+
+    var getItemsInZone = function(zone, ctx) {
+        if (zone.align === 'none') {
+            return [];
+        }
+        return ctx.items_by_zone[zone.uid] || [];
+    };
+
+    // Zones only depend on their own properties, on the display options, and on the items placed
+    // in them if they are aligned.
+    var memoizedZoneTemplate = function(zone, ctx) {
+        var inputs = [zone, ctx.display_zone_labels, ctx.display_zone_borders, getItemsInZone(zone, ctx)];
+        return new MemoizedThunk(zoneTemplate, zone.prefixed_uid, inputs, [zone, ctx]);
+    };
+
     var zoneTemplate = function(zone, ctx) {
         var className = ctx.display_zone_labels ? 'zone-name' : 'zone-name sr';
-        var selector = ctx.display_zone_borders ? 'div.zone.zone-with-borders' : 'div.zone';
+        var selector = 'div.zone';
+        if (zone.points_percent) {
+            // The outline of polygon zones is drawn by zonesOverlayTemplate.
+            selector += '.zone-polygon';
+        } else if (ctx.display_zone_borders) {
+            selector += '.zone-with-borders';
+        }
 
         // If zone is aligned, mark its item alignment
         // and render its placed items as children
         var item_wrapper = 'div.item-wrapper';
-        var items_in_zone = [];
+        var items_in_zone = getItemsInZone(zone, ctx);
         if (zone.align !== 'none') {
             item_wrapper += '.item-align.item-align-' + zone.align;
-            var is_item_in_zone = function(i) { return i.is_placed && (i.zone === zone.uid); };
-            items_in_zone = $.grep(ctx.items, is_item_in_zone);
         }
 
         return (
@@ -220,12 +316,43 @@ function DragAndDropTemplates(configuration) {
                 [
                     h('p', { className: className }, zone.title),
                     h('p', { className: 'zone-description sr' }, zone.description),
-                    h(item_wrapper, renderCollection(itemTemplate, items_in_zone, ctx))
+                    h(item_wrapper, renderCollection(memoizedItemTemplate, items_in_zone, ctx))
                 ]
             )
         );
     };
 
+    // Polygon zones are still rendered as (invisible) divs covering their bounding box, which can be
+    // focused and receive drops; their outlines are drawn together in a single SVG element.
+    var zonesOverlayTemplate = function(ctx) {
+        var polygon_zones = $.grep(ctx.zones, function(zone) { return !!zone.points_percent; });
+        if (!ctx.display_zone_borders || polygon_zones.length === 0) {
+            return null;
+        }
+        var outlines = polygon_zones.map(function(zone) {
+            var points = zone.points_percent.map(function(point) { return point[0] + ',' + point[1]; });
+            return h('polygon', {
+                namespace: SVG_NAMESPACE,
+                key: zone.prefixed_uid,
+                attributes: {'class': 'zone-outline', 'points': points.join(' ')}
+            });
+        });
+        return h(
+            'svg',
+            {
+                namespace: SVG_NAMESPACE,
+                attributes: {
+                    'class': 'zone-overlay',
+                    'viewBox': '0 0 100 100',
+                    'preserveAspectRatio': 'none',
+                    'aria-hidden': 'true',
+                    'focusable': 'false',
+                }
+            },
+            outlines
+        );
+    };
+
     var feedbackTemplate = function(ctx) {
         var feedback_display = ctx.feedback_html ? 'block' : 'none';
         var properties = { attributes: { 'aria-live': 'polite' } };
@@ -342,8 +469,8 @@ function DragAndDropTemplates(configuration) {
                 h('section.drag-container', {}, [
                     h('div.item-bank', item_bank_properties, [
                         h('p', { className: 'zone-description sr' }, gettext('Item Bank')),
-                        renderCollection(itemTemplate, items_in_bank, ctx),
-                        renderCollection(itemPlaceholderTemplate, items_placed, ctx)
+                        renderCollection(memoizedItemTemplate, items_in_bank, ctx),
+                        renderCollection(memoizedItemPlaceholderTemplate, items_placed, ctx)
                     ]),
                     h('div.target',
                         {
@@ -365,11 +492,21 @@ function DragAndDropTemplates(configuration) {
                                 ]
                             ),
                             h('div.target-img-wrapper', [
-                                h('img.target-img', {src: ctx.target_img_src, alt: ctx.target_img_description}),
+                                h('img.target-img', {
+                                    src: ctx.target_img_src,
+                                    alt: ctx.target_img_description,
+                                    // Browsers pick the smallest variant of the image that fills the viewport,
+                                    // up to the natural width of the image.
+                                    attributes: ctx.target_img_srcset ? {
+                                        srcset: ctx.target_img_srcset,
+                                        sizes: imageSizes(100, ctx.bg_image_width),
+                                    } : {}
+                                }),
                             ]
                         ),
-                        renderCollection(itemTemplate, items_placed_unaligned, ctx),
-                        renderCollection(zoneTemplate, ctx.zones, ctx)
+                        zonesOverlayTemplate(ctx),
+                        renderCollection(memoizedItemTemplate, items_placed_unaligned, ctx),
+                        renderCollection(memoizedZoneTemplate, ctx.zones, ctx)
                     ]),
                 ]),
                 h("section.actions-toolbar", {}, [
@@ -390,6 +527,11 @@ function DragAndDropBlock(runtime, element, configuration) {
 
     DragAndDropBlock.STANDARD_MODE = 'standard';
     DragAndDropBlock.ASSESSMENT_MODE = 'assessment';
+    // Tokens of embedded initial states that are known to be out of date, by get_user_state URL.
+    // This is kept on the constructor so it survives re-initialization of the block on the same page.
+    DragAndDropBlock.staleStateTokens = DragAndDropBlock.staleStateTokens || {};
+    // Last get_user_state response body and its ETag, by get_user_state URL.
+    DragAndDropBlock.userStateCache = DragAndDropBlock.userStateCache || {};
 
     var renderView = DragAndDropTemplates(configuration);
 
@@ -405,11 +547,26 @@ function DragAndDropBlock(runtime, element, configuration) {
 
     var state = undefined;
     var bgImgNaturalWidth = undefined; // pixel width of the background image (when not scaled)
+    var bgImgNaturalHeight = undefined; // pixel height of the background image (when not scaled)
+    var usingCachedState = false;
     var __vdom = virtualDom.h();  // blank virtual DOM
 
     // Event string size limit.
     var MAX_LENGTH = 255;
 
+    // In assessment mode drops don't get any feedback, so they are queued and submitted in batches
+    // after this many milliseconds.
+    var ATTEMPTS_FLUSH_DELAY = 500;
+    var pendingAttempts = [];
+    var pendingAttemptsTimer = null;
+
+    // Tracking events are queued and published in batches, every EVENTS_FLUSH_DELAY milliseconds
+    // or as soon as EVENTS_MAX_BATCH events are queued.
+    var EVENTS_FLUSH_DELAY = 5000;
+    var EVENTS_MAX_BATCH = 20;
+    var pendingEvents = [];
+    var pendingEventsTimer = null;
+
     // Keyboard accessibility
     var ESC = 27;
     var RET = 13;
@@ -420,30 +577,75 @@ function DragAndDropBlock(runtime, element, configuration) {
     var $selectedItem;
     var $focusedElement;
 
+    // Items of the configuration, by ID.
+    var itemsById = {};
+    var webkitFixTimer = null;
+
+    // The item being dragged with a pointer, or null.
+    var drag = null;
+
+    // Blocks start initializing when they are this close to the viewport.
+    var LAZY_INIT_MARGIN = '200px 0px';
+
+    // Dragging items with a pointer. Mouse and touch events are used in browsers that don't support Pointer Events.
+    var DRAG_START_EVENTS = window.PointerEvent ? 'pointerdown' : 'mousedown touchstart';
+    var DRAG_MOVE_EVENTS = window.PointerEvent ? ['pointermove'] : ['mousemove', 'touchmove'];
+    var DRAG_END_EVENTS = window.PointerEvent ? ['pointerup', 'pointercancel'] : ['mouseup', 'touchend', 'touchcancel'];
+    // Touch listeners on the document are passive by default in some browsers, which can't stop the page from scrolling.
+    var DRAG_LISTENER_OPTIONS = {passive: false};
+    // Distance in pixels that the pointer has to move before an item starts being dragged.
+    var DRAG_DISTANCE = 3;
+    // Duration in milliseconds of the animation of items that are dropped outside of any zone.
+    var REVERT_DURATION = 150;
+    var requestFrame = window.requestAnimationFrame ?
+        window.requestAnimationFrame.bind(window) : function(callback) { return setTimeout(callback, 16); };
+    var cancelFrame = window.cancelAnimationFrame ? window.cancelAnimationFrame.bind(window) : clearTimeout;
+
+    /**
+     * Initializing a block fetches its state, loads its background image and renders it, so on pages
+     * with several problems, the blocks that are off-screen are only initialized when they are about
+     * to be scrolled into view. Until then, they show the loading message of the template.
+     */
+    var initWhenVisible = function() {
+        if (!window.IntersectionObserver) {
+            init();
+            return;
+        }
+        var observer = new IntersectionObserver(function(entries) {
+            var isVisible = entries.some(function(entry) { return entry.isIntersecting; });
+            if (isVisible) {
+                observer.disconnect();
+                init();
+            }
+        }, {rootMargin: LAZY_INIT_MARGIN});
+        observer.observe(element);
+    };
+
     var init = function() {
-        // Load the current user state, and load the image, then render the block.
-        // We load the user state via AJAX rather than passing it in statically (like we do with
-        // configuration) due to how the LMS handles unit tabs. If you click on a unit with this
-        // block, make changes, click on the tab for another unit, then click back, this block
-        // would re-initialize with the old state. To avoid that, we always fetch the state
-        // using AJAX during initialization.
+        // Load the current user state, and get the size of the image, then render the block.
         $.when(
-            $.ajax(runtime.handlerUrl(element, 'get_user_state'), {dataType: 'json'}),
-            loadBackgroundImage()
-        ).done(function(stateResult, bgImg){
+            loadUserState(),
+            getBackgroundImageSize()
+        ).done(function(userState, bgImg){
             // Render problem
             configuration.zones.forEach(function (zone) {
                 computeZoneDimension(zone, bgImg.width, bgImg.height);
             });
-            state = stateResult[0]; // stateResult is an array of [data, statusText, jqXHR]
+            state = userState;
             migrateConfiguration(bgImg.width);
             migrateState(bgImg.width, bgImg.height);
             markItemZoneAlign();
+            configuration.items.forEach(function(item) {
+                itemsById[item.id] = item;
+            });
             bgImgNaturalWidth = bgImg.width;
+            bgImgNaturalHeight = bgImg.height;
 
             // Set up event handlers:
 
-            $(document).on('keydown mousedown touchstart', closePopup);
+            // Dragging an item prevents the default action of pointerdown, which suppresses mousedown,
+            // so the popup is closed on the same events that start a drag.
+            $(document).on('keydown ' + DRAG_START_EVENTS, closePopup);
             $element.on('click', '.keyboard-help-button', showKeyboardHelp);
             $element.on('keydown', '.keyboard-help-button', function(evt) {
                 runOnKey(evt, RET, showKeyboardHelp);
@@ -452,16 +654,24 @@ function DragAndDropBlock(runtime, element, configuration) {
             $element.on('keydown', '.reset-button', function(evt) {
                 runOnKey(evt, RET, resetProblem);
             });
+            // Submit any queued drops and events before the learner leaves the page.
+            $(window).on('pagehide beforeunload', flushAttemptsOnUnload);
+            $(window).on('pagehide beforeunload', flushEventsOnUnload);
 
             // For the next one, we need to use addEventListener with useCapture 'true' in order
             // to watch for load events on any child element, since load events do not bubble.
             element.addEventListener('load', webkitFix, true);
 
+            initKeyboardHandlers();
+            initPointerHandlers();
             applyState();
-            initDroppable();
 
             // Indicate that problem is done loading
             publishEvent({event_type: 'edx.drag_and_drop_v2.loaded'});
+
+            if (usingCachedState) {
+                revalidateUserState();
+            }
         }).fail(function() {
             $root.text(gettext("An error occurred. Unable to load drag and drop problem."));
         });
@@ -534,7 +744,97 @@ function DragAndDropBlock(runtime, element, configuration) {
         $keyboardHelpDialog.find('.modal-dismiss-button').off();
     };
 
-    /** Asynchronously load the main background image used for this block. */
+    /**
+     * Get the current user state.
+     * The state is embedded in the configuration, so usually there's no need to wait for an AJAX
+     * request. However, the embedded state may be out of date due to how the LMS handles unit tabs:
+     * if you click on a unit with this block, make changes, click on the tab for another unit, then
+     * click back, this block re-initializes with the configuration (and state) of the original page
+     * load. So whenever this block changes the state on the server, it marks the token of the embedded
+     * state as stale (see markStateStale), and in that case we fetch the state using AJAX instead.
+     */
+    var loadUserState = function() {
+        var url = runtime.handlerUrl(element, 'get_user_state');
+        if (configuration.initial_state) {
+            var cached = DragAndDropBlock.userStateCache[url];
+            if (!cached) {
+                cached = DragAndDropBlock.userStateCache[url] = {
+                    etag: '"' + configuration.initial_state_token + '"',
+                    body: configuration.initial_state
+                };
+            }
+            if (configuration.initial_state_token !== DragAndDropBlock.staleStateTokens[url]) {
+                // Any response cached since the page was loaded is at least as recent as the embedded state.
+                usingCachedState = true;
+                return $.Deferred().resolve($.extend(true, {}, cached.body));
+            }
+        }
+        return fetchUserState();
+    };
+
+    /**
+     * Fetch the user state with a conditional GET: if the state on the server still matches the
+     * last response we got, the server only answers "304 Not Modified" and we use our cached copy.
+     */
+    var fetchUserState = function() {
+        var url = runtime.handlerUrl(element, 'get_user_state');
+        var cached = DragAndDropBlock.userStateCache[url];
+        var promise = $.Deferred();
+        $.ajax(url, {
+            dataType: 'json',
+            headers: cached ? {'If-None-Match': cached.etag} : {}
+        }).done(function(data, textStatus, jqXHR) {
+            if (jqXHR.status === 304) {
+                data = cached.body;
+            } else {
+                DragAndDropBlock.userStateCache[url] = {etag: jqXHR.getResponseHeader('ETag'), body: data};
+            }
+            // The client modifies its state, so never hand out the cached object itself.
+            promise.resolve($.extend(true, {}, data));
+        }).fail(function() {
+            promise.reject();
+        });
+        return promise;
+    };
+
+    /**
+     * Check whether the embedded or cached state we rendered is still current, and re-render if it
+     * isn't (unless the learner has already started changing the state in the meantime).
+     */
+    var revalidateUserState = function() {
+        var url = runtime.handlerUrl(element, 'get_user_state');
+        var renderedEtag = DragAndDropBlock.userStateCache[url].etag;
+        fetchUserState().done(function(userState) {
+            var isStale = DragAndDropBlock.userStateCache[url].etag !== renderedEtag;
+            var changedLocally = DragAndDropBlock.staleStateTokens[url] === configuration.initial_state_token;
+            if (isStale && !changedLocally) {
+                state = userState;
+                migrateState(bgImgNaturalWidth, bgImgNaturalHeight);
+                markItemZoneAlign();
+                applyState();
+            }
+        });
+    };
+
+    /** Record that the state embedded in the configuration no longer matches the state on the server. */
+    var markStateStale = function() {
+        DragAndDropBlock.staleStateTokens[runtime.handlerUrl(element, 'get_user_state')] = configuration.initial_state_token;
+    };
+
+    /**
+     * The layout of the problem only depends on the natural size of the background image. The server
+     * sends it when it knows it, so the problem can be rendered while the image itself is downloaded.
+     */
+    var getBackgroundImageSize = function() {
+        if (configuration.target_img_natural_width && configuration.target_img_natural_height) {
+            return $.Deferred().resolve({
+                width: configuration.target_img_natural_width,
+                height: configuration.target_img_natural_height
+            });
+        }
+        return loadBackgroundImage();
+    };
+
     var loadBackgroundImage = function() {
         var promise = $.Deferred();
         var img = new Image();
@@ -564,6 +864,12 @@ function DragAndDropBlock(runtime, element, configuration) {
             delete zone.width;
             zone.height_percent = (+zone.height) / bg_image_height * 100;
             delete zone.height;
+            if (zone.points) {
+                zone.points_percent = zone.points.map(function(point) {
+                    return [(+point[0]) / bg_image_width * 100, (+point[1]) / bg_image_height * 100];
+                });
+                delete zone.points;
+            }
             // Generate an HTML ID value that's unique within the DOM and not containing spaces etc:
             zone.prefixed_uid = configuration.url_name + '-' + zone.uid.replace(/([^\w\-])/g, "_");
         }
@@ -592,13 +898,23 @@ function DragAndDropBlock(runtime, element, configuration) {
         if (!$option.is('.option')) {
             return;
         }
-        var itemId = $option.data('value');
-        configuration.items.forEach(function(item) {
-            if (item.id == itemId) {
-                item.imgNaturalWidth = event.target.naturalWidth;
-            }
-        });
-        setTimeout(applyState, 0); // Apply changes to the DOM after the event handling completes.
+        // The server sends the width of the item images it could measure when the problem was saved,
+        // so this only has to re-render the problem for the other images.
+        // Images with a srcset are always measured on the server: their natural width in the browser
+        // depends on the "sizes" attribute, rather than on the size of the original image.
+        var item = itemsById[$option.data('value')];
+        if (!item || item.expandedImageSrcset || item.imgNaturalWidth === event.target.naturalWidth) {
+            return;
+        }
+        item.imgNaturalWidth = event.target.naturalWidth;
+        // Apply changes to the DOM after the event handling completes, once for all the images that
+        // load at about the same time.
+        if (webkitFixTimer === null) {
+            webkitFixTimer = setTimeout(function() {
+                webkitFixTimer = null;
+                applyState();
+            }, 0);
+        }
     };
 
 
@@ -630,10 +946,6 @@ function DragAndDropBlock(runtime, element, configuration) {
         }
 
         updateDOM();
-        destroyDraggable();
-        if (!state.finished) {
-            initDraggable();
-        }
     };
 
     var updateDOM = function(state) {
@@ -645,11 +957,39 @@ function DragAndDropBlock(runtime, element, configuration) {
     };
 
     var publishEvent = function(data) {
-        $.ajax({
-            type: 'POST',
-            url: runtime.handlerUrl(element, 'publish_event'),
-            data: JSON.stringify(data)
-        });
+        pendingEvents.push(data);
+        if (pendingEvents.length >= EVENTS_MAX_BATCH) {
+            flushEvents();
+        } else if (pendingEventsTimer === null) {
+            pendingEventsTimer = setTimeout(flushEvents, EVENTS_FLUSH_DELAY);
+        }
+    };
+
+    var clearPendingEvents = function() {
+        var events = pendingEvents;
+        clearTimeout(pendingEventsTimer);
+        pendingEventsTimer = null;
+        pendingEvents = [];
+        return events;
+    };
+
+    /** Publish all queued events in a single request to the publish_events handler. */
+    var flushEvents = function() {
+        var events = clearPendingEvents();
+        if (events.length) {
+            $.ajax({
+                type: 'POST',
+                url: runtime.handlerUrl(element, 'publish_events'),
+                data: JSON.stringify({events: events})
+            });
+        }
+    };
+
+    var flushEventsOnUnload = function() {
+        var events = clearPendingEvents();
+        if (events.length) {
+            postOnUnload(runtime.handlerUrl(element, 'publish_events'), {events: events});
+        }
     };
 
     var isCycleKey = function(evt) {
@@ -699,30 +1039,120 @@ function DragAndDropBlock(runtime, element, configuration) {
         $root.find('.item-bank .option').first().focus();
     };
 
-    var placeItem = function($zone, $item) {
-        var item_id;
-        var $anchor;
-        if ($item !== undefined) {
-            item_id = $item.data('value');
-            // Element was placed using the mouse,
-            // so use relevant properties of *item* when calculating new position below.
-            $anchor = $item;
-        } else {
-            item_id = $selectedItem.data('value');
-            // Element was placed using the keyboard,
-            // so use relevant properties of *zone* when calculating new position below.
-            $anchor = $zone;
+    /**
+     * Returns true if the point (x, y) is inside the polygon, using the even-odd rule.
+     */
+    var isPointInPolygon = function(x, y, points) {
+        var inside = false;
+        for (var i = 0, j = points.length - 1; i < points.length; j = i++) {
+            var xi = points[i][0], yi = points[i][1], xj = points[j][0], yj = points[j][1];
+            if ((yi > y) !== (yj > y) && x < (xj - xi) * (y - yi) / (yj - yi) + xi) {
+                inside = !inside;
+            }
+        }
+        return inside;
+    };
+
+    /**
+     * Returns the zone at the point (x, y) of the background image, in percent of its size, or
+     * undefined. Like on the server, where zones overlap the one defined last (displayed on top) wins.
+     */
+    var findZoneAt = function(x, y) {
+        for (var i = configuration.zones.length - 1; i >= 0; i--) {
+            if (isPointInZone(x, y, configuration.zones[i])) {
+                return configuration.zones[i];
+            }
         }
+        return undefined;
+    };
+
+    /**
+     * Returns true if the point (x, y) of the background image, in percent of its size, is inside the zone.
+     */
+    var isPointInZone = function(x, y, zone) {
+        if (x < zone.x_percent || x > zone.x_percent + zone.width_percent ||
+            y < zone.y_percent || y > zone.y_percent + zone.height_percent) {
+            return false;
+        }
+        return !zone.points_percent || isPointInPolygon(x, y, zone.points_percent);
+    };
+
+    // Number of rows and columns of the points tried in a zone, to place an item on it with the keyboard.
+    var ZONE_DROP_POINT_GRID = 8;
+
+    /**
+     * Returns the point where an item placed on the zone with the keyboard is dropped, in percent of
+     * the size of the background image: its center if no other zone covers it, or else the first
+     * point of a grid over the zone that isn't covered by another zone. Where the zone is entirely
+     * covered, the center is still inside the zone, which is all the server checks.
+     */
+    var getZoneDropPoint = function(zone) {
+        var center = getZoneCenter(zone);
+        if (findZoneAt(center.x, center.y) === zone) {
+            return center;
+        }
+        for (var row = 0; row < ZONE_DROP_POINT_GRID; row++) {
+            for (var column = 0; column < ZONE_DROP_POINT_GRID; column++) {
+                var x = zone.x_percent + (column + 0.5) / ZONE_DROP_POINT_GRID * zone.width_percent;
+                var y = zone.y_percent + (row + 0.5) / ZONE_DROP_POINT_GRID * zone.height_percent;
+                if (findZoneAt(x, y) === zone) {
+                    return {x: x, y: y};
+                }
+            }
+        }
+        return center;
+    };
+
+    /**
+     * Returns a point inside the zone, in percent of the size of the background image: the center of
+     * its rectangle or, for polygon zones, the middle of the first span of the polygon on the
+     * horizontal line through that center.
+     */
+    var getZoneCenter = function(zone) {
+        var x = zone.x_percent + zone.width_percent / 2;
+        var y = zone.y_percent + zone.height_percent / 2;
+        var points = zone.points_percent;
+        if (points && !isPointInPolygon(x, y, points)) {
+            var crossings = [];
+            for (var i = 0, j = points.length - 1; i < points.length; j = i++) {
+                var xi = points[i][0], yi = points[i][1], xj = points[j][0], yj = points[j][1];
+                if ((yi > y) !== (yj > y)) {
+                    crossings.push((xj - xi) * (y - yi) / (yj - yi) + xi);
+                }
+            }
+            crossings.sort(function(a, b) { return a - b; });
+            if (crossings.length >= 2) {
+                x = (crossings[0] + crossings[1]) / 2;
+            }
+        }
+        return {x: x, y: y};
+    };
+
+    var placeItem = function($zone, $item, pointer) {
+        // The item is placed with the mouse if it was dropped at the position of the pointer, or
+        // with the keyboard otherwise.
+        var item_id = ($item !== undefined ? $item : $selectedItem).data('value');
         var zone = String($zone.data('uid'));
-        var zone_id = $zone.data('zone_id');
         var zone_align = $zone.data('zone_align');
         var $target_img = $root.find('.target-img');
 
-        // Calculate the position of the item to place relative to the image.
-        var x_pos = $anchor.offset().left + ($anchor.outerWidth()/2) - $target_img.offset().left;
-        var y_pos = $anchor.offset().top + ($anchor.outerHeight()/2) - $target_img.offset().top;
-        var x_pos_percent = x_pos / $target_img.width() * 100;
-        var y_pos_percent = y_pos / $target_img.height() * 100;
+        // The item is centered on the point where it was dropped, in percent of the size of the
+        // background image: the position of the pointer, or a point of the zone where no other zone
+        // covers it. The server checks that the point is inside the zone.
+        var x_pos_percent, y_pos_percent;
+        if (pointer !== undefined) {
+            x_pos_percent = (pointer.pageX - $target_img.offset().left) / $target_img.width() * 100;
+            y_pos_percent = (pointer.pageY - $target_img.offset().top) / $target_img.height() * 100;
+        } else {
+            var point = getZoneDropPoint($.grep(configuration.zones, function(z) { return z.uid === zone; })[0]);
+            x_pos_percent = point.x;
+            y_pos_percent = point.y;
+        }
+        // The server gets the point in pixels of the background image at its natural size.
+        var drop_point = {
+            x: x_pos_percent / 100 * bgImgNaturalWidth,
+            y: y_pos_percent / 100 * bgImgNaturalHeight,
+        };
 
         state.items[item_id] = {
             zone: zone,
@@ -731,123 +1161,259 @@ function DragAndDropBlock(runtime, element, configuration) {
             y_percent: y_pos_percent,
             submitting_location: true,
         };
-        // Wrap in setTimeout to let the droppable event finish.
+        // Wrap in setTimeout to let the drag finish.
         setTimeout(function() {
             applyState();
-            submitLocation(item_id, zone, x_pos_percent, y_pos_percent);
+            submitLocation(item_id, zone, x_pos_percent, y_pos_percent, drop_point);
         }, 0);
     };
 
-    var initDroppable = function() {
-        // Set up zones for keyboard interaction
-        $root.find('.zone, .item-bank').each(function() {
-            var $zone = $(this);
-            $zone.on('keydown', function(evt) {
-                if (state.keyboard_placement_mode) {
-                    if (isCycleKey(evt)) {
-                        focusNextZone(evt, $zone);
-                    } else if (isCancelKey(evt)) {
-                        evt.preventDefault();
-                        state.keyboard_placement_mode = false;
-                        releaseItem($selectedItem);
-                    } else if (isActionKey(evt)) {
-                        evt.preventDefault();
-                        state.keyboard_placement_mode = false;
-                        releaseItem($selectedItem);
-                        if ($zone.is('.item-bank')) {
-                            delete state.items[$selectedItem.data('value')];
-                            applyState();
-                        } else {
-                            placeItem($zone);
-                        }
-                    }
-                } else if (isSpaceKey(evt)) {
-                  // Pressing the space bar moves the page down by default in most browsers.
-                  // That can be distracting while moving items with the keyboard, so prevent
-                  // the default scroll from happening while a zone is focused.
-                  evt.preventDefault();
-                }
-            });
+    /**
+     * Returns the rectangle of the element, in page coordinates.
+     */
+    var getPageRect = function(element) {
+        var rect = element.getBoundingClientRect();
+        var left = rect.left + window.pageXOffset;
+        var top = rect.top + window.pageYOffset;
+        return {left: left, top: top, right: left + rect.width, bottom: top + rect.height};
+    };
+
+    var isInRect = function(point, rect) {
+        return point.pageX >= rect.left && point.pageX <= rect.right &&
+               point.pageY >= rect.top && point.pageY <= rect.bottom;
+    };
+
+    var clamp = function(value, min, max) {
+        return Math.min(Math.max(value, min), max);
+    };
+
+    /**
+     * Returns the position of the pointer of a pointer, mouse or touch event, in page coordinates.
+     */
+    var getPointerPosition = function(evt) {
+        var point = evt.changedTouches ? evt.changedTouches[0] : evt;
+        return {pageX: point.pageX, pageY: point.pageY};
+    };
+
+    /**
+     * Items are dragged with the mouse, a finger or a pen using Pointer Events, or mouse and touch
+     * events in browsers that don't support them. Everything that has to be measured is measured
+     * once, when the drag starts: while it goes on, the item is only moved with a CSS transform,
+     * once per animation frame, which doesn't cause layout.
+     */
+    var initPointerHandlers = function() {
+        // Only the start of a drag is listened to on the block; the rest is listened to on the
+        // document while the item is being dragged.
+        $element.on(DRAG_START_EVENTS, '.drag-container .option[draggable=true]', onDragPointerDown);
+        // The items have the draggable attribute, which would start a native drag and drop.
+        $element.on('dragstart', '.drag-container .option', function(evt) {
+            evt.preventDefault();
+        });
+    };
+
+    var onDragPointerDown = function(evt) {
+        var originalEvent = evt.originalEvent;
+        // Drag one item at a time, with the primary mouse button or pointer.
+        if (drag !== null || originalEvent.button > 0 || originalEvent.isPrimary === false) {
+            return;
+        }
+        // Don't select text, or scroll the page (in browsers that don't support Pointer Events).
+        evt.preventDefault();
+        var position = getPointerPosition(originalEvent);
+        drag = {
+            $item: $(this),
+            pointerId: originalEvent.pointerId,
+            startX: position.pageX,
+            startY: position.pageY,
+            pageX: position.pageX,
+            pageY: position.pageY,
+            started: false,
+            frame: null
+        };
+        DRAG_MOVE_EVENTS.forEach(function(type) {
+            document.addEventListener(type, onDragPointerMove, DRAG_LISTENER_OPTIONS);
         });
+        DRAG_END_EVENTS.forEach(function(type) {
+            document.addEventListener(type, onDragPointerUp, DRAG_LISTENER_OPTIONS);
+        });
+    };
 
-        // Make zones accept items that are dropped using the mouse
-        $root.find('.zone').droppable({
-            accept: '.drag-container .option',
-            tolerance: 'pointer',
-            drop: function(evt, ui) {
-                var $zone = $(this);
-                var $item = ui.helper;
-                placeItem($zone, $item);
+    var isDragPointer = function(evt) {
+        return evt.pointerId === undefined || evt.pointerId === drag.pointerId;
+    };
+
+    var onDragPointerMove = function(evt) {
+        if (!isDragPointer(evt)) {
+            return;
+        }
+        var position = getPointerPosition(evt);
+        drag.pageX = position.pageX;
+        drag.pageY = position.pageY;
+        if (!drag.started) {
+            if (Math.abs(drag.pageX - drag.startX) < DRAG_DISTANCE && Math.abs(drag.pageY - drag.startY) < DRAG_DISTANCE) {
+                return;
             }
+            startDrag();
+        }
+        if (evt.cancelable) {
+            evt.preventDefault();
+        }
+        if (drag.frame === null) {
+            drag.frame = requestFrame(moveDraggedItem);
+        }
+    };
+
+    var startDrag = function() {
+        var $item = drag.$item;
+        grabItem($item, 'mouse');
+        publishEvent({
+            event_type: 'edx.drag_and_drop_v2.item.picked_up',
+            item_id: $item.data('value'),
         });
 
-        if (configuration.mode === DragAndDropBlock.ASSESSMENT_MODE) {
-            // Make item bank accept items that are returned to the bank using the mouse
-            $root.find('.item-bank').droppable({
-                accept: '.target .option',
-                tolerance: 'pointer',
-                drop: function(evt, ui) {
-                    var $item = ui.helper;
-                    var item_id = $item.data('value');
-                    releaseItem($item);
-                    delete state.items[item_id];
-                    applyState();
-                }
-            });
+        // The grabbed item is moved by adding a translation to the transform it already has (placed
+        // items are centered on their position with one).
+        var transform = window.getComputedStyle($item[0]).transform;
+        var itemRect = getPageRect($item[0]);
+        var containerRect = getPageRect($root.find('.drag-container')[0]);
+        drag.started = true;
+        drag.transform = (transform && transform !== 'none') ? ' ' + transform : '';
+        // The item can't be dragged out of the drag container.
+        drag.minX = containerRect.left - itemRect.left;
+        drag.maxX = containerRect.right - itemRect.right;
+        drag.minY = containerRect.top - itemRect.top;
+        drag.maxY = containerRect.bottom - itemRect.bottom;
+        drag.targetRect = getPageRect($root.find('.target-img')[0]);
+        drag.bankRect = getPageRect($root.find('.item-bank')[0]);
+    };
+
+    var moveDraggedItem = function() {
+        if (drag === null) {
+            return;
         }
+        drag.frame = null;
+        var x = clamp(drag.pageX - drag.startX, drag.minX, drag.maxX);
+        var y = clamp(drag.pageY - drag.startY, drag.minY, drag.maxY);
+        drag.$item[0].style.transform = 'translate(' + x + 'px, ' + y + 'px)' + drag.transform;
     };
 
-    var initDraggable = function() {
-        $root.find('.drag-container .option[draggable=true]').each(function() {
-            var $item = $(this);
+    var onDragPointerUp = function(evt) {
+        if (!isDragPointer(evt)) {
+            return;
+        }
+        DRAG_MOVE_EVENTS.forEach(function(type) {
+            document.removeEventListener(type, onDragPointerMove, DRAG_LISTENER_OPTIONS);
+        });
+        DRAG_END_EVENTS.forEach(function(type) {
+            document.removeEventListener(type, onDragPointerUp, DRAG_LISTENER_OPTIONS);
+        });
+        if (drag.frame !== null) {
+            cancelFrame(drag.frame);
+        }
+        var position = getPointerPosition(evt);
+        drag.pageX = position.pageX;
+        drag.pageY = position.pageY;
+        var finished = drag;
+        if (finished.started) {
+            // The item is placed where it is at the end of the drag.
+            moveDraggedItem();
+        }
+        drag = null;
+        if (!finished.started) {
+            return;
+        }
+        if (evt.type === 'pointercancel' || evt.type === 'touchcancel') {
+            revertDraggedItem(finished.$item);
+        } else {
+            dropItem(finished, position);
+        }
+    };
 
-            // Allow item to be "picked up" using the keyboard
-            $item.on('keydown', function(evt) {
-                if (isActionKey(evt)) {
-                    evt.preventDefault();
-                    evt.stopPropagation();
-                    state.keyboard_placement_mode = true;
-                    grabItem($item, 'keyboard');
-                    $selectedItem = $item;
-                    $root.find('.target .zone').first().focus();
-                }
+    var dropItem = function(finished, pointer) {
+        var $item = finished.$item;
+        var targetRect = finished.targetRect;
+        var zone = findZoneAt(
+            (pointer.pageX - targetRect.left) / (targetRect.right - targetRect.left) * 100,
+            (pointer.pageY - targetRect.top) / (targetRect.bottom - targetRect.top) * 100
+        );
+        if (zone) {
+            var $zone = $root.find('.zone').filter(function() {
+                return String($(this).data('uid')) === zone.uid;
             });
+            placeItem($zone, $item, pointer);
+            resetDraggedItem($item);
+        } else if (configuration.mode === DragAndDropBlock.ASSESSMENT_MODE &&
+                   $item.closest('.target').length && isInRect(pointer, finished.bankRect)) {
+            // Items that were placed can be returned to the bank.
+            resetDraggedItem($item);
+            delete state.items[$item.data('value')];
+            applyState();
+        } else {
+            revertDraggedItem($item);
+        }
+    };
 
-            // Make item draggable using the mouse
-            try {
-                $item.draggable({
-                    addClasses: false,  // don't add ui-draggable-* classes as they don't play well with virtual DOM.
-                    containment: $root.find('.drag-container'),
-                    cursor: 'move',
-                    stack: $root.find('.drag-container .option'),
-                    revert: 'invalid',
-                    revertDuration: 150,
-                    start: function(evt, ui) {
-                        var $item = $(this);
-                        // Store initial position of dragged item to be able to revert back to it on cancelled drag
-                        // (when user drops the item onto an area that is not a droppable zone).
-                        // The jQuery UI draggable library usually knows how to revert correctly, but our dropped items
-                        // have a translation transform that confuses jQuery UI draggable, so we "help" it do the right
-                        // thing by manually storing the initial position and resetting it in the 'stop' handler below.
-                        $item.data('initial-position', {
-                            left: $item.css('left'),
-                            top: $item.css('top')
-                        });
-                        grabItem($item, 'mouse');
-                        publishEvent({
-                            event_type: 'edx.drag_and_drop_v2.item.picked_up',
-                            item_id: $item.data('value'),
-                        });
-                    },
-                    stop: function(evt, ui) {
-                        // Revert to original position.
-                        $item.css($item.data('initial-position'));
-                        releaseItem($(this));
+    var resetDraggedItem = function($item) {
+        $item[0].style.transition = '';
+        $item[0].style.transform = '';
+        releaseItem($item);
+    };
+
+    /**
+     * Moves the item back to where it was before it was dragged.
+     */
+    var revertDraggedItem = function($item) {
+        $item[0].style.transition = 'transform ' + REVERT_DURATION + 'ms';
+        $item[0].style.transform = '';
+        setTimeout(function() {
+            resetDraggedItem($item);
+        }, REVERT_DURATION);
+    };
+
+    /**
+     * Keyboard interaction with items and zones. The handlers are delegated to the root element,
+     * so they keep working for the item and zone elements that are created by later renders.
+     */
+    var initKeyboardHandlers = function() {
+        // Allow items to be "picked up" using the keyboard
+        $element.on('keydown', '.drag-container .option[draggable=true]', function(evt) {
+            if (isActionKey(evt)) {
+                var $item = $(this);
+                evt.preventDefault();
+                evt.stopPropagation();
+                state.keyboard_placement_mode = true;
+                grabItem($item, 'keyboard');
+                $selectedItem = $item;
+                $root.find('.target .zone').first().focus();
+            }
+        });
+
+        // Allow the picked up item to be placed on a zone, or returned to the bank
+        $element.on('keydown', '.drag-container .zone, .drag-container .item-bank', function(evt) {
+            var $zone = $(this);
+            if (state.keyboard_placement_mode) {
+                if (isCycleKey(evt)) {
+                    focusNextZone(evt, $zone);
+                } else if (isCancelKey(evt)) {
+                    evt.preventDefault();
+                    state.keyboard_placement_mode = false;
+                    releaseItem($selectedItem);
+                } else if (isActionKey(evt)) {
+                    evt.preventDefault();
+                    state.keyboard_placement_mode = false;
+                    releaseItem($selectedItem);
+                    if ($zone.is('.item-bank')) {
+                        delete state.items[$selectedItem.data('value')];
+                        applyState();
+                    } else {
+                        placeItem($zone);
                     }
-                });
-            } catch (e) {
-                // Initializing the draggable will fail if draggable was already
-                // initialized. That's expected, ignore the exception.
+                }
+            } else if (isSpaceKey(evt)) {
+              // Pressing the space bar moves the page down by default in most browsers.
+              // That can be distracting while moving items with the keyboard, so prevent
+              // the default scroll from happening while a zone is focused.
+              evt.preventDefault();
             }
         });
     };
@@ -878,22 +1444,7 @@ function DragAndDropBlock(runtime, element, configuration) {
         });
     };
 
-    var destroyDraggable = function() {
-        $root.find('.drag-container .option[draggable=false]').each(function() {
-            var $item = $(this);
-
-            $item.off();
-
-            try {
-                $item.draggable('destroy');
-            } catch (e) {
-                // Destroying the draggable will fail if draggable was
-                // not initialized in the first place. Ignore the exception.
-            }
-        });
-    };
-
-    var submitLocation = function(item_id, zone, x_percent, y_percent) {
+    var submitLocation = function(item_id, zone, x_percent, y_percent, drop_point) {
         if (!zone) {
             return;
         }
@@ -904,7 +1455,19 @@ function DragAndDropBlock(runtime, element, configuration) {
             x_percent: x_percent,
             y_percent: y_percent,
         };
+        if (drop_point !== undefined) {
+            data.x = drop_point.x;
+            data.y = drop_point.y;
+        }
+
+        if (configuration.mode === DragAndDropBlock.ASSESSMENT_MODE) {
+            queueAttempt(data);
+            return;
+        }
 
+        // Send any queued tracking events along with the drop, so that they are published before it.
+        data.events = clearPendingEvents();
+        markStateStale();
         $.post(url, JSON.stringify(data), 'json')
             .done(function(data){
                 state.items[item_id].submitting_location = false;
@@ -929,6 +1492,78 @@ function DragAndDropBlock(runtime, element, configuration) {
             });
     };
 
+    var queueAttempt = function(attempt) {
+        pendingAttempts.push(attempt);
+        if (pendingAttemptsTimer === null) {
+            pendingAttemptsTimer = setTimeout(flushAttempts, ATTEMPTS_FLUSH_DELAY);
+        }
+    };
+
+    var clearPendingAttempts = function() {
+        var attempts = pendingAttempts;
+        clearTimeout(pendingAttemptsTimer);
+        pendingAttemptsTimer = null;
+        pendingAttempts = [];
+        return attempts;
+    };
+
+    /** Submit all queued drops in a single request to the do_attempts handler. */
+    var flushAttempts = function() {
+        var attempts = clearPendingAttempts();
+        if (!attempts.length) {
+            return;
+        }
+        var url = runtime.handlerUrl(element, 'do_attempts');
+        markStateStale();
+        $.post(url, JSON.stringify({attempts: attempts, events: clearPendingEvents()}), 'json')
+            .done(function() {
+                attempts.forEach(function(attempt) {
+                    if (state.items[attempt.val]) {
+                        state.items[attempt.val].submitting_location = false;
+                    }
+                });
+                applyState();
+            })
+            .fail(function() {
+                attempts.forEach(function(attempt) {
+                    delete state.items[attempt.val];
+                });
+                applyState();
+            });
+    };
+
+    var flushAttemptsOnUnload = function() {
+        var attempts = clearPendingAttempts();
+        if (attempts.length) {
+            markStateStale();
+            postOnUnload(runtime.handlerUrl(element, 'do_attempts'), {attempts: attempts, events: clearPendingEvents()});
+        }
+    };
+
+    var getCookie = function(name) {
+        var match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+        return match ? decodeURIComponent(match[1]) : null;
+    };
+
+    /**
+     * Send a JSON request that is allowed to outlive the page. Regular AJAX requests are cancelled
+     * when the page is unloaded. A keepalive fetch is preferred over navigator.sendBeacon because the
+     * latter can't send the CSRF header that the LMS requires for handler calls.
+     */
+    var postOnUnload = function(url, data) {
+        var body = JSON.stringify(data);
+        if (window.fetch) {
+            var headers = {'Content-Type': 'application/json'};
+            var csrftoken = getCookie('csrftoken');
+            if (csrftoken) {
+                headers['X-CSRFToken'] = csrftoken;
+            }
+            window.fetch(url, {method: 'POST', body: body, headers: headers, credentials: 'same-origin', keepalive: true});
+        } else if (navigator.sendBeacon) {
+            navigator.sendBeacon(url, body);
+        }
+    };
+
     var closePopup = function(evt) {
         if (!state.feedback) {
             return;
@@ -958,6 +1593,9 @@ function DragAndDropBlock(runtime, element, configuration) {
 
     var resetProblem = function(evt) {
         evt.preventDefault();
+        // Drops that haven't been submitted yet would be wiped out by the reset anyway.
+        clearPendingAttempts();
+        markStateStale();
         $.ajax({
             type: 'POST',
             url: runtime.handlerUrl(element, 'reset'),
@@ -993,6 +1631,7 @@ function DragAndDropBlock(runtime, element, configuration) {
                 xhr_active: (item_user_state && item_user_state.submitting_location),
                 displayName: item.displayName,
                 imageURL: item.expandedImageURL,
+                imageSrcset: item.expandedImageSrcset,
                 imageDescription: item.imageDescription,
                 has_image: !!item.expandedImageURL,
                 grabbed: grabbed,
@@ -1016,6 +1655,22 @@ function DragAndDropBlock(runtime, element, configuration) {
             return itemProperties;
         });
 
+        // Look up zones and the items placed in them in constant time while rendering.
+        // Objects without a prototype can't confuse a zone UID with an inherited property.
+        var zones_by_uid = Object.create(null);
+        configuration.zones.forEach(function(zone) {
+            // Keep the first zone with a given UID, like a linear scan would.
+            if (!(zone.uid in zones_by_uid)) {
+                zones_by_uid[zone.uid] = zone;
+            }
+        });
+        var items_by_zone = Object.create(null);
+        items.forEach(function(item) {
+            if (item.is_placed) {
+                (items_by_zone[item.zone] = items_by_zone[item.zone] || []).push(item);
+            }
+        });
+
         // In assessment mode, it is possible to move items back to the bank, so the bank should be able to
         // gain focus while keyboard placement is in progress.
         var item_bank_focusable = state.keyboard_placement_mode &&
@@ -1033,11 +1688,14 @@ function DragAndDropBlock(runtime, element, configuration) {
             show_problem_header: configuration.show_problem_header,
             show_submit_answer: configuration.mode == DragAndDropBlock.ASSESSMENT_MODE,
             target_img_src: configuration.target_img_expanded_url,
+            target_img_srcset: configuration.target_img_srcset,
             target_img_description: configuration.target_img_description,
             display_zone_labels: configuration.display_zone_labels,
             display_zone_borders: configuration.display_zone_borders,
             zones: configuration.zones,
+            zones_by_uid: zones_by_uid,
             items: items,
+            items_by_zone: items_by_zone,
             // state - parts that can change:
             last_action_correct: state.last_action_correct,
             item_bank_focusable: item_bank_focusable,
@@ -1115,5 +1773,5 @@ function DragAndDropBlock(runtime, element, configuration) {
         });
     };
 
-    init();
+    initWhenVisible();
 }
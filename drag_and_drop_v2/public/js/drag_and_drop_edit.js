@@ -258,15 +258,17 @@ function DragAndDropEditBlock(runtime, element, params) {
                                 title: oldZone.title || 'Zone ' + num,
                                 description: oldZone.description,
                                 // uid: unique ID for this zone. For backwards compatibility,
-                                // this field cannot be called "id" and must inherit the "title"
-                                // property if no 'uid' value is present, since old versions of
-                                // this block used the title as the primary identifier.
-                                uid: oldZone.uid || oldZone.title || _fn.build.form.zone.generateUID(),
+                                // this field cannot be called "id". Zones from old versions of
+                                // this block, which used the title as the primary identifier,
+                                // already had their 'uid' filled in from the title on the server.
+                                uid: oldZone.uid || _fn.build.form.zone.generateUID(),
                                 width: oldZone.width || 200,
                                 height: oldZone.height || 100,
                                 x: oldZone.x || 0,
                                 y: oldZone.y || 0,
-                                align: oldZone.align || ''
+                                align: oldZone.align || '',
+                                // Corners of polygon zones, which can't be edited here yet.
+                                points: oldZone.points
                             };
 
                             _fn.build.form.zone.zoneObjects.push(zoneObj);
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+"""
+Offline rescoring of learners' state after the problem data of a block was changed.
+
+When an author changes the correct zones of items, the `correct` flags stored in the learners'
+item state and the grades published for them become stale. This tool recomputes them from a
+dump of the learners' state, using the same evaluation logic as the block, and writes one JSON
+line for every learner whose state or grade changed:
+
+    {"student_id": 42, "module_id": "...", "state": {<updated fields>}, "grade": {"value": 0.5, "max_value": 1.0}}
+
+"grade" is only present if the grade changed; it has the same format as the block's grade events.
+
+The input is either a JSON lines file with one row per learner, or an SQLite database with a
+`courseware_studentmodule` table. Rows have the `student_id`, `module_id` and `state` columns
+of courseware_studentmodule, where `state` is the JSON dict of the block's user state fields.
+
+Usage:
+
+    python -m drag_and_drop_v2.rescoring --data problem_data.json --weight 1 states.jsonl > rescored.jsonl
+    python -m drag_and_drop_v2.rescoring --data problem_data.json --sqlite --module-id <usage key> dump.db
+"""
+
+# Imports ###########################################################
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import sqlite3
+import sys
+
+from .problem_index import get_problem_index
+from .state_encoding import decode_item_state, encode_item_state
+
+
+# Globals ###########################################################
+
+# Number of learner rows sent to a worker process at a time.
+CHUNK_SIZE = 2000
+
+# Problem data and weight the rows of the current worker process are rescored against.
+_worker_problem = None
+
+
+# Functions #########################################################
+
+def rescore_state(index, weight, state):
+    """
+    Rescores the user `state` of a single learner (a dict of the block's user state fields)
+    against the problem `index`.
+
+    Returns a tuple of a dict of the fields that changed, and the new grade if it changed (or None).
+    """
+    item_state = decode_item_state(state.get('item_state', {}))
+    rescored = {}
+    for item_id, item in item_state.iteritems():
+        item_zones = index.item_zones.get(int(item_id))
+        if not item_zones:
+            # The item was deleted, or is now a decoy.
+            continue
+        if item.get('zone') is None:
+            # Placements from old versions of this block don't record the zone; the block deduces
+            # that they were placed on the first valid zone, so they stay correct.
+            rescored[item_id] = item
+        elif item.get('correct') and index.is_correct(int(item_id), item['zone']):
+            rescored[item_id] = item
+        # Otherwise the item isn't in a correct zone anymore. The block only stores correct
+        # placements, so the item goes back to the item bank.
+
+    correct_count = index.count_correct(rescored)
+    required_count = len(index.required_items)
+    grade = correct_count / float(required_count) * weight if required_count else 0.0
+
+    updates = {}
+    if rescored != item_state:
+        updates['item_state'] = encode_item_state(rescored)
+    # Learners that aren't finished anymore must get their grade published again when they are.
+    completed = correct_count == required_count
+    if bool(state.get('completed')) != completed:
+        updates['completed'] = completed
+    last_grade = state.get('last_published_grade')
+    if grade != last_grade and (last_grade is not None or item_state):
+        updates['last_published_grade'] = grade
+    else:
+        # Learners that were never graded don't get a grade now either.
+        grade = None
+    if updates:
+        # The block would recount these on its own, but it's cheaper to do it here.
+        updates['item_stats'] = {'version': index.version, 'placed': len(rescored), 'correct': correct_count}
+    return updates, grade
+
+
+def rescore_rows(data, weight, rows, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Rescores (student_id, module_id, state) `rows` against the problem `data` in a pool of
+    `processes` worker processes (one per CPU by default), and yields an output record for
+    every learner whose state or grade changed, in the order of the input rows.
+
+    `state` may be either a JSON string, as stored in courseware_studentmodule, or a dict.
+    """
+    chunks = _chunks(rows, chunk_size)
+    if processes == 1:
+        _init_worker(data, weight)
+        for records in itertools.imap(_rescore_chunk, chunks):
+            for record in records:
+                yield record
+        return
+
+    pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(data, weight))
+    try:
+        for records in pool.imap(_rescore_chunk, chunks):
+            for record in records:
+                yield record
+    finally:
+        # Also stops the workers when a worker fails, or the caller stops consuming the records.
+        pool.terminate()
+        pool.join()
+
+
+def read_json_lines(path):
+    """
+    Yields (student_id, module_id, state) rows from a JSON lines file.
+    """
+    with open(path) as lines:
+        for line in lines:
+            if line.strip():
+                row = json.loads(line)
+                yield row['student_id'], row.get('module_id'), row['state']
+
+
+def read_sqlite(path, module_id=None):
+    """
+    Yields (student_id, module_id, state) rows from the courseware_studentmodule table of an SQLite database.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        query = 'SELECT student_id, module_id, state FROM courseware_studentmodule'
+        if module_id is None:
+            cursor = connection.execute(query)
+        else:
+            cursor = connection.execute(query + ' WHERE module_id = ?', (module_id,))
+        for row in cursor:
+            yield row
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Rescore learners' drag and drop state after a problem was edited.")
+    parser.add_argument('input', help="JSON lines file, or SQLite database with --sqlite")
+    parser.add_argument('--data', required=True, help="JSON file with the current problem data of the block")
+    parser.add_argument('--weight', type=float, default=1, help="Weight (maximum score) of the block")
+    parser.add_argument('--sqlite', action='store_true', help="Read rows from the courseware_studentmodule table")
+    parser.add_argument('--module-id', help="Only rescore rows of this block (SQLite only)")
+    parser.add_argument('--processes', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--output', help="File to write the results to, instead of standard output")
+    args = parser.parse_args(argv)
+
+    with open(args.data) as data_file:
+        data = json.load(data_file)
+    if args.sqlite:
+        rows = read_sqlite(args.input, args.module_id)
+    else:
+        rows = read_json_lines(args.input)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for record in rescore_rows(data, args.weight, rows, args.processes):
+            output.write(json.dumps(record, sort_keys=True) + '\n')
+    finally:
+        if args.output:
+            output.close()
+
+
+def _init_worker(data, weight):
+    """
+    Compiles the problem index once per worker process.
+    """
+    global _worker_problem  # pylint: disable=global-statement
+    _worker_problem = (get_problem_index(data), weight)
+
+
+def _rescore_chunk(rows):
+    """
+    Rescores a chunk of rows in a worker process.
+    """
+    index, weight = _worker_problem
+    records = []
+    for student_id, module_id, state in rows:
+        if isinstance(state, basestring):
+            state = json.loads(state)
+        updates, grade = rescore_state(index, weight, state)
+        if not updates:
+            continue
+        record = {'student_id': student_id, 'module_id': module_id, 'state': updates}
+        if grade is not None:
+            record['grade'] = {'value': grade, 'max_value': weight}
+        records.append(record)
+    return records
+
+
+def _chunks(rows, chunk_size):
+    """
+    Splits an iterable of rows into lists of at most `chunk_size` rows, without reading it all.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+if __name__ == '__main__':
+    main()
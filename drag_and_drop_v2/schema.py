@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+"""
+Versioned schema of the problem data stored in the `data` field.
+
+Older versions of this XBlock stored problem data in several different shapes. Rather than
+handling all of them on every read, data is converted to the canonical shape described by
+SCHEMA_VERSION once: when an author saves the problem in Studio, or (for problems that have
+not been saved since) when the data is first compiled into a ProblemIndex by a process.
+
+Canonical problem data:
+
+- has "schemaVersion" set to SCHEMA_VERSION;
+- has "feedback" with "start" and "finish" messages;
+- has a list of "zones", each with a "uid" and without the unused "id" and "index" attributes;
+  polygon zones have a list of [x, y] "points", and their bounding rectangle as their "x", "y",
+  "width" and "height";
+- has a list of "items", each with an integer "id", a list of the "zones" it belongs to
+  (possibly empty), "feedback" with "correct" and "incorrect" messages, and an "imageURL"
+  (possibly empty).
+
+When the images are course assets, the natural size of the background image
+("targetImgNaturalWidth" and "targetImgNaturalHeight") and of the item images ("imgNaturalWidth"
+and "imgNaturalHeight") is also measured when the problem is saved, and the smaller copies
+made of them are listed as [url, width] pairs in "targetImgVariants" and "imgVariants".
+
+Saved problem data also has a "dataVersion": a hash of the rest of the data, which identifies
+the compiled ProblemIndex of the problem without hashing the data on every request. It is only
+trusted if the index it identifies was built from the same data.
+
+Migrations that depend on the size of the background image (pixel coordinates and sizes) can
+not be done here, and are still done by the client.
+"""
+
+# Imports ###########################################################
+
+import copy
+import numbers
+
+from .utils import _
+
+
+# Globals ###########################################################
+
+SCHEMA_VERSION = 1
+
+
+# Functions #########################################################
+
+def is_normalized(data):
+    """
+    Returns True if `data` is already in the canonical shape for the current schema version.
+    """
+    return data.get('schemaVersion') == SCHEMA_VERSION
+
+
+def normalize_data(data):
+    """
+    Returns a copy of the problem `data`, converted to the canonical shape.
+    Raises a ValueError if `data` isn't made of the containers problem data is made of.
+    """
+    _check_containers(data)
+    data = copy.deepcopy(data)
+
+    feedback = data.setdefault('feedback', {})
+    feedback.setdefault('start', '')
+    feedback.setdefault('finish', '')
+
+    zones = data.setdefault('zones', [])
+    for zone in zones:
+        if "uid" not in zone:
+            zone["uid"] = zone.get("title")  # Older versions used title as the zone UID
+        # Remove old, now-unused zone attributes, if present:
+        zone.pop("id", None)
+        zone.pop("index", None)
+        if _is_polygon(zone.get("points")):
+            xs = [float(x) for x, _ in zone["points"]]
+            ys = [float(y) for _, y in zone["points"]]
+            zone["x"], zone["y"] = min(xs), min(ys)
+            zone["width"], zone["height"] = max(xs) - min(xs), max(ys) - min(ys)
+
+    for item in data.setdefault('items', []):
+        # Legacy instances have a single `item['zone']`, while current versions have `item['zones']`.
+        zone = item.pop('zone', None)
+        if item.get('zones') is None:
+            item['zones'] = [zone] if zone is not None and zone != 'none' else []
+        # Older versions stored the image URL as "backgroundImage".
+        background_image = item.pop('backgroundImage', None)
+        item['imageURL'] = item.get('imageURL') or background_image or ''
+        item_feedback = item.setdefault('feedback', {})
+        item_feedback.setdefault('correct', '')
+        item_feedback.setdefault('incorrect', '')
+
+    data['schemaVersion'] = SCHEMA_VERSION
+    return data
+
+
+def validate_data(data):
+    """
+    Checks that normalized problem `data` is consistent, raising a ValueError describing
+    the first problem found otherwise.
+    """
+    _check_containers(data)
+    if not isinstance(data['feedback'].get('start'), basestring) or \
+            not isinstance(data['feedback'].get('finish'), basestring):
+        raise ValueError(_("The problem feedback is invalid."))
+
+    zone_uids = set()
+    for zone in data['zones']:
+        if not isinstance(zone.get('uid'), basestring) or zone['uid'] in zone_uids:
+            raise ValueError(_("Every zone must have a unique ID."))
+        zone_uids.add(zone['uid'])
+        for dimension in ('x', 'y', 'width', 'height'):
+            if dimension in zone and not _is_number(zone[dimension]):
+                raise ValueError(_("The position and size of every zone must be numbers."))
+        if 'points' in zone and not _is_polygon(zone['points']):
+            raise ValueError(_("The points of a polygon zone must be a list of at least three [x, y] pairs."))
+
+    item_ids = set()
+    for item in data['items']:
+        item_id = item.get('id')
+        if isinstance(item_id, bool) or not isinstance(item_id, (int, long)) or item_id in item_ids:
+            raise ValueError(_("Every item must have a unique numeric ID."))
+        item_ids.add(item_id)
+        if not all(isinstance(uid, basestring) for uid in item['zones']) or not set(item['zones']).issubset(zone_uids):
+            raise ValueError(_("Items can only be assigned to zones that exist."))
+
+
+def _check_containers(data):
+    """
+    Raises a ValueError if the problem `data`, its feedback, zones or items are not the dicts and
+    lists they should be, e.g. when the data submitted from Studio is malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError(_("The problem data is invalid."))
+    if not isinstance(data.get('feedback', {}), dict):
+        raise ValueError(_("The problem feedback is invalid."))
+    zones = data.get('zones', [])
+    if not isinstance(zones, list) or not all(isinstance(zone, dict) for zone in zones):
+        raise ValueError(_("The zones of the problem are invalid."))
+    items = data.get('items', [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(_("The items of the problem are invalid."))
+    for item in items:
+        if not isinstance(item.get('feedback', {}), dict) or not isinstance(item.get('zones', []), (list, type(None))):
+            raise ValueError(_("The items of the problem are invalid."))
+
+
+def _is_number(value):
+    """
+    Zone dimensions are numbers, although older versions of the editor stored them as strings.
+    """
+    if isinstance(value, basestring):
+        try:
+            float(value)
+        except ValueError:
+            return False
+        return True
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _is_polygon(points):
+    """
+    Polygon zones are outlined by at least three [x, y] points, in pixels of the background image.
+    """
+    if not isinstance(points, list) or len(points) < 3:
+        return False
+    return all(
+        isinstance(point, list) and len(point) == 2 and all(_is_number(value) for value in point)
+        for point in points
+    )
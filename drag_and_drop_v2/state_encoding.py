@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+"""
+Compact encoding of the `item_state` user field.
+
+The decoded item state is a dict mapping item IDs (as strings) to dicts such as
+{'zone': 'zone-1', 'correct': True, 'x_percent': 33.3, 'y_percent': 11.1}.
+
+The encoded form is versioned:
+
+    {"v": 1, "z": ["zone-1", ...], "i": {"0": [zone_index, flags, x, y], ...}}
+
+- "z" is the table of zone UIDs used by the items, so each UID is only stored once.
+- zone_index is an index into "z", or -1 if the item has no zone.
+- flags is a bit field of FLAG_CORRECT and FLAG_PERCENT_STRINGS.
+- x and y are the coordinates in basis points (hundredths of a percent). Coordinates are
+  rounded to the nearest basis point, i.e. 0.01% of the size of the background image, which
+  is at most a pixel for images up to 10000 pixels wide; they are otherwise decoded exactly.
+
+Placements that don't fit this format (like positions stored by very old versions of
+this XBlock) are stored as dicts, unchanged.
+
+Item states that were stored before this encoding existed (a dict mapping item IDs to dicts
+or to (top, left) tuples) can still be decoded; they are re-encoded the next time they are written.
+"""
+
+# Globals ###########################################################
+
+VERSION = 1
+
+# The item is placed in a correct zone.
+FLAG_CORRECT = 1
+# The coordinates were sent as strings like "33%" rather than as numbers.
+FLAG_PERCENT_STRINGS = 2
+
+_COMPACT_KEYS = frozenset(['zone', 'correct', 'x_percent', 'y_percent'])
+
+
+# Functions #########################################################
+
+def is_encoded(raw_state):
+    """
+    Returns True if `raw_state` uses the compact encoding.
+    """
+    return 'v' in raw_state
+
+
+def item_count(raw_state):
+    """
+    Returns the number of items in a stored item state, without decoding it.
+    """
+    if is_encoded(raw_state):
+        return len(raw_state['i'])
+    return len(raw_state)
+
+
+def decode_item_state(raw_state):
+    """
+    Returns the decoded item state for the stored value of the `item_state` field.
+    """
+    if not is_encoded(raw_state):
+        return {item_id: _decode_legacy_item(item) for item_id, item in raw_state.iteritems()}
+
+    zones = raw_state['z']
+    state = {}
+    for item_id, item in raw_state['i'].iteritems():
+        if isinstance(item, dict):
+            state[item_id] = dict(item)
+            continue
+        zone_index, flags, x_bp, y_bp = item
+        decoded = {
+            'correct': bool(flags & FLAG_CORRECT),
+            'x_percent': _decode_coordinate(x_bp, flags),
+            'y_percent': _decode_coordinate(y_bp, flags),
+        }
+        if zone_index >= 0:
+            decoded['zone'] = zones[zone_index]
+        state[item_id] = decoded
+    return state
+
+
+def encode_item_state(state):
+    """
+    Returns the value to store in the `item_state` field for the decoded item `state`.
+    """
+    if not state:
+        return {}
+
+    zones = []
+    zone_indexes = {}
+    items = {}
+    for item_id, item in state.iteritems():
+        encoded = _encode_item(item, zones, zone_indexes)
+        items[item_id] = encoded if encoded is not None else item
+    return {'v': VERSION, 'z': zones, 'i': items}
+
+
+def _decode_legacy_item(item):
+    """
+    Items used to be stored as dicts, and before that as (top, left) tuples.
+    """
+    if isinstance(item, dict):
+        return dict(item)
+    return {'top': item[0], 'left': item[1]}
+
+
+def _encode_item(item, zones, zone_indexes):
+    """
+    Returns the compact list for a decoded item, or None if it can't be represented as one.
+    """
+    if not _COMPACT_KEYS.issuperset(item) or not isinstance(item.get('correct'), bool):
+        return None
+    x_bp, x_is_string = _encode_coordinate(item.get('x_percent'))
+    y_bp, y_is_string = _encode_coordinate(item.get('y_percent'))
+    if x_bp is None or y_bp is None or x_is_string != y_is_string:
+        return None
+
+    zone = item.get('zone')
+    if zone is None:
+        zone_index = -1
+    elif zone in zone_indexes:
+        zone_index = zone_indexes[zone]
+    else:
+        zone_index = zone_indexes[zone] = len(zones)
+        zones.append(zone)
+
+    flags = (FLAG_CORRECT if item['correct'] else 0) | (FLAG_PERCENT_STRINGS if x_is_string else 0)
+    return [zone_index, flags, x_bp, y_bp]
+
+
+def _encode_coordinate(value):
+    """
+    Returns a tuple of the coordinate in basis points (or None if it isn't a valid coordinate)
+    and whether it was given as a string like "33%".
+    """
+    is_string = isinstance(value, basestring)
+    if is_string:
+        if not value.endswith('%'):
+            return None, is_string
+        value = value[:-1]
+    elif isinstance(value, bool) or not isinstance(value, (int, long, float)):
+        return None, is_string
+    try:
+        return int(round(float(value) * 100)), is_string
+    except ValueError:
+        return None, is_string
+
+
+def _decode_coordinate(basis_points, flags):
+    """
+    Returns the coordinate, in the format it was originally given in.
+    """
+    percent = basis_points / 100.0
+    if flags & FLAG_PERCENT_STRINGS:
+        # repr keeps all the digits of the coordinate, unlike '{:g}', which keeps 6 significant digits.
+        text = repr(percent)
+        return (text[:-2] if text.endswith('.0') else text) + '%'
+    return percent
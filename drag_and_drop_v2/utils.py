@@ -1,7 +1,79 @@
 # -*- coding: utf-8 -*-
 #
 
+# Imports ###########################################################
+
+import math
+import numbers
+import threading
+from collections import OrderedDict
+
 
 # Make '_' a no-op so we can scrape strings
 def _(text):
     return text
+
+
+def is_coordinate(value):
+    """
+    Returns True if `value` is a finite number.
+    """
+    return (
+        isinstance(value, numbers.Real) and not isinstance(value, bool) and
+        not math.isinf(value) and not math.isnan(value)
+    )
+
+
+def parse_percentage(value):
+    """
+    Returns the number of percent of `value`, a number or a string like "33%", as sent by clients
+    for the position of items; or None if it's neither.
+    """
+    if isinstance(value, basestring) and value.endswith('%'):
+        try:
+            value = float(value[:-1])
+        except ValueError:
+            return None
+    return value if is_coordinate(value) else None
+
+
+# Classes ###########################################################
+
+class LRUCache(object):
+    """
+    A small thread-safe mapping that evicts its least recently used entries
+    once it holds more than `maxsize` of them.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
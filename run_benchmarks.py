@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Run the benchmarks of the Drag and Drop V2 XBlock handlers,
+or with `load` as the first argument, the concurrent learners load test.
+
+Like run_tests.py, this runs inside the xblock-sdk workbench, using its settings file.
+"""
+
+import logging
+import os
+import sys
+import workbench
+
+if __name__ == "__main__":
+    # Find the location of the XBlock SDK. Note: it must be installed in development mode.
+    # ('python setup.py develop' or 'pip install -e')
+    xblock_sdk_dir = os.path.dirname(os.path.dirname(workbench.__file__))
+    sys.path.append(xblock_sdk_dir)
+
+    # Use the workbench settings file:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+    # Silence too verbose Django logging
+    logging.disable(logging.DEBUG)
+
+    try:
+        os.mkdir('var')
+    except OSError:
+        # The var dir may already exist.
+        pass
+
+    import django
+    django.setup()
+
+    if sys.argv[1:2] == ['load']:
+        from tests.benchmarks.load import main
+        sys.exit(main(sys.argv[2:]))
+    else:
+        from tests.benchmarks.handlers import main
+        sys.exit(main())
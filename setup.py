@@ -4,6 +4,7 @@
 
 import os
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 
 # Functions #########################################################
@@ -19,8 +20,38 @@ def package_data(pkg, root_list):
     return {pkg: data}
 
 
+def load_module_globals(path):
+    """Runs the Python module at `path` on its own, and returns its globals."""
+    module_globals = {'__file__': os.path.abspath(path), '__name__': os.path.splitext(os.path.basename(path))[0]}
+    with open(path) as module_file:
+        exec(compile(module_file.read(), path, 'exec'), module_globals)  # pylint: disable=exec-used
+    return module_globals
+
+
+# Classes ###########################################################
+
+class BuildPy(build_py):
+    """Builds the asset bundles of the student view along with the package."""
+
+    def run(self):
+        # Run the module by path, since the package imports dependencies that may not be installed yet.
+        bundle = load_module_globals(os.path.join('drag_and_drop_v2', 'bundle.py'))
+        missing = bundle['missing_minifiers']()
+        if missing:
+            self.warn(
+                "{} not installed: the asset bundles will not be minified. "
+                "Install the 'minify' extra to minify them.".format(', '.join(missing))
+            )
+        bundle['build'](os.path.abspath('drag_and_drop_v2'))
+        build_py.run(self)
+
+
 # Main ##############################################################
 
+PACKAGE_DATA = package_data("drag_and_drop_v2", ["static", "templates", "public", "translations"])
+# Patterns are matched when the package is built, after BuildPy has built the bundles.
+PACKAGE_DATA["drag_and_drop_v2"].append("public/bundle/*")
+
 setup(
     name='xblock-drag-and-drop-v2',
     version='2.0.7',
@@ -32,8 +63,13 @@ setup(
         'ddt',
         'mock',
     ],
+    extras_require={
+        # Minifiers of the asset bundles, used when the package is built.
+        'minify': ['rcssmin', 'rjsmin'],
+    },
     entry_points={
         'xblock.v1': 'drag-and-drop-v2 = drag_and_drop_v2:DragAndDropBlock',
     },
-    package_data=package_data("drag_and_drop_v2", ["static", "templates", "public", "translations"]),
+    package_data=PACKAGE_DATA,
+    cmdclass={'build_py': BuildPy},
 )
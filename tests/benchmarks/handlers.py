@@ -0,0 +1,154 @@
+"""
+Microbenchmarks of the views and handlers of the block, over synthetic problems of increasing size.
+
+Run them with `python run_benchmarks.py`; see `python run_benchmarks.py --help` for the options.
+"""
+
+import argparse
+import json
+import re
+import sys
+import timeit
+
+from mock import patch
+
+from drag_and_drop_v2 import drag_and_drop_v2, problem_index
+
+from .synthetic import correct_attempt, make_problem_data
+from ..utils import make_block, make_request, make_studio_submission
+
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_REPEAT = 10
+DEFAULT_THRESHOLD = 1.5
+
+
+def clear_caches():
+    """ Empties the process-wide caches, so that the next call does all the work again. """
+    drag_and_drop_v2._CONFIGURATION_CACHE.clear()  # pylint: disable=protected-access
+    drag_and_drop_v2._STATIC_URL_CACHE.clear()  # pylint: disable=protected-access
+    problem_index._INDEX_CACHE.clear()  # pylint: disable=protected-access
+
+
+def call_handler(block, handler_name, data=None, method='POST'):
+    response = block.handle(handler_name, make_request(data, method=method))
+    assert response.status_code == 200, response.body
+    return response
+
+
+def make_operations(block, data):
+    """
+    Returns a dict of the benchmarked operations on `block`, as functions taking the
+    number of the iteration.
+    """
+    submission = make_studio_submission(data, display_name="Benchmark")
+
+    def get_configuration_cold(_iteration):
+        clear_caches()
+        block.get_configuration()
+
+    return {
+        'get_configuration': lambda _iteration: block.get_configuration(),
+        'get_configuration_cold': get_configuration_cold,
+        'student_view': lambda _iteration: block.student_view({}),
+        'do_attempt': lambda iteration: call_handler(block, 'do_attempt', correct_attempt(data, iteration)),
+        'get_user_state': lambda _iteration: call_handler(block, 'get_user_state', method='GET'),
+        'reset': lambda _iteration: call_handler(block, 'reset', {}),
+        'studio_submit': lambda _iteration: call_handler(block, 'studio_submit', submission),
+    }
+
+
+def time_operation(operation, repeat):
+    """
+    Calls `operation` once to warm up, then `repeat` times, and returns the fastest and
+    median durations in milliseconds.
+    """
+    operation(0)
+    durations = []
+    for iteration in range(1, repeat + 1):
+        start = timeit.default_timer()
+        operation(iteration)
+        durations.append((timeit.default_timer() - start) * 1000)
+    durations.sort()
+    return {'min_ms': durations[0], 'median_ms': durations[len(durations) // 2]}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, operations=None):
+    """
+    Runs the benchmarks for problems with each of the given numbers of items and zones, and
+    returns the results as {size: {operation: {'min_ms': ..., 'median_ms': ...}}}.
+    """
+    results = {}
+    with patch(
+        'workbench.runtime.WorkbenchRuntime.local_resource_url',
+        lambda _, _block, path: '/expanded/url/to/drag_and_drop_v2/' + path
+    ), patch(
+        'workbench.runtime.WorkbenchRuntime.replace_urls',
+        lambda _, html: re.sub(r'"/static/([^"]*)"', r'"/course/test-course/assets/\1"', html),
+        create=True,
+    ):
+        for size in sizes:
+            data = make_problem_data(size)
+            block = make_block()
+            block.data = data
+            size_results = results[str(size)] = {}
+            for name, operation in sorted(make_operations(block, data).items()):
+                if operations is None or name in operations:
+                    size_results[name] = time_operation(operation, repeat)
+            clear_caches()
+    return results
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns a list of (size, operation, baseline_ms, ms) for the operations whose fastest
+    time is more than `threshold` times their fastest time in the `baseline` results.
+    """
+    regressions = []
+    for size, size_results in sorted(results.items()):
+        for name, timings in sorted(size_results.items()):
+            baseline_timings = baseline.get(size, {}).get(name)
+            if baseline_timings and timings['min_ms'] > baseline_timings['min_ms'] * threshold:
+                regressions.append((size, name, baseline_timings['min_ms'], timings['min_ms']))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks, and returns the exit status: 1 if any operation regressed compared to the baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Drag and Drop XBlock handlers.")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated numbers of items and zones of the synthetic problems")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Number of timed calls per operation")
+    parser.add_argument('--operations', help="Comma-separated names of the operations to benchmark (default: all)")
+    parser.add_argument('--output', help="File to save the results to, as JSON")
+    parser.add_argument('--baseline', help="Results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Maximum allowed ratio of the time of an operation to its baseline time")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    operations = args.operations.split(',') if args.operations else None
+    results = run_benchmarks(sizes, args.repeat, operations)
+
+    for size in sizes:
+        for name, timings in sorted(results[str(size)].items()):
+            print "{:>6} {:<24} {:>10.3f} ms (median {:.3f} ms)".format(
+                size, name, timings['min_ms'], timings['median_ms']
+            )
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(results, baseline, args.threshold)
+        for size, name, baseline_ms, ms in regressions:
+            print >> sys.stderr, "Regression: {} with {} items took {:.3f} ms, baseline {:.3f} ms".format(
+                name, size, ms, baseline_ms
+            )
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,241 @@
+"""
+Load test of the block with many concurrent learners, run entirely on the local machine.
+
+Learners are simulated by a pool of threads or processes. Every request builds a new instance of
+the block, like the LMS does, over field data stored in a shared SQLite database, and calls one of
+its handlers. Each learner loads their state, drops items (sometimes on the wrong zone), and
+sometimes resets the problem.
+
+Run it with `python run_benchmarks.py load`; see `python run_benchmarks.py load --help` for the options.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import multiprocessing.pool
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import timeit
+
+from workbench.runtime import WorkbenchRuntime
+from xblock.fields import ScopeIds
+from xblock.runtime import KeyValueStore, KvsFieldData
+
+from drag_and_drop_v2 import DragAndDropBlock
+
+from .synthetic import attempt_on_zone, correct_attempt, make_problem_data
+from ..utils import make_request
+
+
+BLOCK_TYPE = 'drag_and_drop_v2'
+DEF_ID = 'drag_and_drop_v2.load_test.d0'
+USAGE_ID = 'drag_and_drop_v2.load_test.u0'
+
+# Probabilities of the learner actions after each drop.
+WRONG_DROP_PROBABILITY = 0.2
+RESET_PROBABILITY = 0.02
+STATE_FETCH_PROBABILITY = 0.1
+
+
+class SQLiteKeyValueStore(KeyValueStore):
+    """
+    A KeyValueStore backed by an SQLite database, which can be shared by threads and processes.
+    Every thread uses its own connection.
+    """
+
+    def __init__(self, path):
+        super(SQLiteKeyValueStore, self).__init__()
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS kvs (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connection(self):
+        # Connections can't be shared by threads, nor by processes after a fork.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = sqlite3.connect(self.path, timeout=60)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    @staticmethod
+    def _key(key):
+        return json.dumps([
+            unicode(key.scope), key.user_id, unicode(key.block_scope_id), key.field_name, key.block_family
+        ])
+
+    def get(self, key):
+        row = self._connection().execute('SELECT value FROM kvs WHERE key = ?', (self._key(key),)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, update_dict):
+        with self._connection() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO kvs (key, value) VALUES (?, ?)',
+                [(self._key(key), json.dumps(value)) for key, value in update_dict.iteritems()]
+            )
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM kvs WHERE key = ?', (self._key(key),))
+
+    def has(self, key):
+        row = self._connection().execute('SELECT 1 FROM kvs WHERE key = ?', (self._key(key),)).fetchone()
+        return row is not None
+
+
+def make_learner_block(field_data, user_id):
+    """ Instantiates the load-tested block for the learner `user_id`. """
+    runtime = WorkbenchRuntime(user_id)
+    scope_ids = ScopeIds(user_id, BLOCK_TYPE, DEF_ID, USAGE_ID)
+    return DragAndDropBlock(runtime, field_data, scope_ids=scope_ids)
+
+
+def percentile(sorted_values, percent):
+    """ Returns the nearest-rank `percent` percentile of a sorted list. """
+    rank = int(math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+# Field data of the current worker; set up by _init_worker.
+_worker_field_data = None
+
+
+def _init_worker(db_path):
+    global _worker_field_data  # pylint: disable=global-statement
+    _worker_field_data = KvsFieldData(SQLiteKeyValueStore(db_path))
+
+
+def _run_learner(args):
+    """
+    Simulates the session of one learner, and returns a list of (handler name, duration) tuples.
+    """
+    learner, num_drops, data, seed = args
+    rng = random.Random(seed + learner)
+    user_id = 'learner-{}'.format(learner)
+    timings = []
+
+    def request(handler_name, body=None, method='POST'):
+        start = timeit.default_timer()
+        block = make_learner_block(_worker_field_data, user_id)
+        response = block.handle(handler_name, make_request(body, method=method))
+        timings.append((handler_name, timeit.default_timer() - start))
+        assert response.status_code == 200, response.body
+
+    # Loading the page fetches the state.
+    request('get_user_state', method='GET')
+    for _ in range(num_drops):
+        item_index = rng.randrange(len(data['items']))
+        if rng.random() < WRONG_DROP_PROBABILITY:
+            attempt = attempt_on_zone(data['items'][item_index], rng.choice(data['zones']))
+        else:
+            attempt = correct_attempt(data, item_index)
+        request('do_attempt', attempt)
+        if rng.random() < RESET_PROBABILITY:
+            request('reset', {})
+        if rng.random() < STATE_FETCH_PROBABILITY:
+            request('get_user_state', method='GET')
+    return timings
+
+
+def _run_sessions(db_path, data, learners, drops, workers, use_processes, seed):
+    """
+    Simulates the sessions of all the learners concurrently, and returns their timings and the total duration.
+    """
+    pool_class = multiprocessing.Pool if use_processes else multiprocessing.pool.ThreadPool
+    pool = pool_class(workers, initializer=_init_worker, initargs=(db_path,))
+    start = timeit.default_timer()
+    try:
+        sessions = pool.map(_run_learner, [(learner, drops, data, seed) for learner in range(learners)])
+    finally:
+        pool.close()
+        pool.join()
+    return sessions, timeit.default_timer() - start
+
+
+def _handler_latencies(sessions):
+    """ Returns the sorted latencies in milliseconds of the requests of the sessions, per handler. """
+    by_handler = {}
+    for session in sessions:
+        for handler_name, seconds in session:
+            by_handler.setdefault(handler_name, []).append(seconds * 1000)
+    for latencies in by_handler.values():
+        latencies.sort()
+    return by_handler
+
+
+def run_load_test(learners=100, drops=20, items=20, workers=8, use_processes=False, seed=0, db_path=None):
+    """
+    Runs the load test and returns a report of the throughput, and of the number of requests
+    and their 50th, 95th and 99th percentile latency in milliseconds per handler.
+    """
+    tmp_dir = None
+    if db_path is None:
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, 'kvs.sqlite')
+    try:
+        data = make_problem_data(items)
+        author_block = make_learner_block(KvsFieldData(SQLiteKeyValueStore(db_path)), 'author')
+        author_block.data = data
+        author_block.save()
+        sessions, duration = _run_sessions(db_path, data, learners, drops, workers, use_processes, seed)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+    by_handler = _handler_latencies(sessions)
+    num_requests = sum(len(latencies) for latencies in by_handler.values())
+    return {
+        'learners': learners,
+        'workers': workers,
+        'processes': use_processes,
+        'requests': num_requests,
+        'duration_s': duration,
+        'throughput_rps': num_requests / duration,
+        'handlers': {
+            handler_name: {
+                'requests': len(latencies),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+            }
+            for handler_name, latencies in by_handler.iteritems()
+        },
+    }
+
+
+def main(argv=None):
+    """ Runs the load test and prints its report. """
+    parser = argparse.ArgumentParser(description="Load test the Drag and Drop XBlock with concurrent learners.")
+    parser.add_argument('--learners', type=int, default=100, help="Number of simulated learners")
+    parser.add_argument('--drops', type=int, default=20, help="Number of drops per learner")
+    parser.add_argument('--items', type=int, default=20, help="Number of items and zones of the problem")
+    parser.add_argument('--workers', type=int, default=8, help="Number of concurrent workers")
+    parser.add_argument('--processes', action='store_true', help="Use worker processes instead of threads")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the simulated learners' choices")
+    parser.add_argument('--db', help="SQLite database to store the field data in (default: a temporary file)")
+    parser.add_argument('--output', help="File to save the report to, as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(
+        args.learners, args.drops, args.items, args.workers, args.processes, args.seed, args.db
+    )
+    print "{requests} requests in {duration_s:.2f} s: {throughput_rps:.1f} requests/s".format(**report)
+    for handler_name, stats in sorted(report['handlers'].items()):
+        print "{:<16} {:>6} requests  p50 {:>8.2f} ms  p95 {:>8.2f} ms  p99 {:>8.2f} ms".format(
+            handler_name, stats['requests'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms']
+        )
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    return 0
@@ -0,0 +1,81 @@
+"""
+Synthetic problem data of arbitrary size, for benchmarks.
+"""
+
+from drag_and_drop_v2.schema import normalize_data
+
+
+def make_problem_data(num_items, num_zones=None):
+    """
+    Returns normalized problem data with `num_items` items and `num_zones` zones (by default,
+    as many zones as items), laid out in a grid on a 1000x1000 pixel background image.
+
+    Every item belongs to one zone, except every tenth item, which is a decoy.
+    """
+    if num_zones is None:
+        num_zones = num_items
+    columns = max(1, int(num_zones ** 0.5))
+    rows = (num_zones + columns - 1) // columns
+    zone_width = 1000.0 / columns
+    zone_height = 1000.0 / rows
+
+    zones = []
+    for i in range(num_zones):
+        zones.append({
+            "uid": "zone-{}".format(i),
+            "title": "Zone {}".format(i),
+            "description": "Description of zone {}".format(i),
+            "x": (i % columns) * zone_width,
+            "y": (i // columns) * zone_height,
+            "width": zone_width,
+            "height": zone_height,
+        })
+
+    items = []
+    for i in range(num_items):
+        items.append({
+            "id": i,
+            "displayName": "Item {}".format(i),
+            "imageURL": "/static/item-{}.png".format(i) if i % 2 else "",
+            "imageDescription": "",
+            "zones": [] if i % 10 == 9 else ["zone-{}".format(i % num_zones)],
+            "feedback": {
+                "correct": "Correct! Item {} belongs here.".format(i),
+                "incorrect": "No, item {} does not belong here.".format(i),
+            },
+        })
+
+    return normalize_data({
+        "targetImg": "/static/background.png",
+        "targetImgDescription": "Synthetic background",
+        "displayLabels": False,
+        "displayBorders": False,
+        "feedback": {"start": "Start", "finish": "Finish"},
+        "zones": zones,
+        "items": items,
+    })
+
+
+def correct_attempt(data, item_index):
+    """
+    Returns a do_attempt request body dropping the item at `item_index` on its zone
+    (or, for decoys, on the first zone).
+    """
+    item = data["items"][item_index % len(data["items"])]
+    # Zones are named after their position in the list of zones.
+    zone_index = int(item["zones"][0].split("-")[1]) if item["zones"] else 0
+    return attempt_on_zone(item, data["zones"][zone_index])
+
+
+def attempt_on_zone(item, zone):
+    """
+    Returns a do_attempt request body dropping `item` on the center of `zone`.
+    """
+    return {
+        "val": item["id"],
+        "zone": zone["uid"],
+        "x": zone["x"] + zone["width"] / 2,
+        "y": zone["y"] + zone["height"] / 2,
+        "x_percent": "50%",
+        "y_percent": "50%",
+    }
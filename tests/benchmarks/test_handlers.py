@@ -0,0 +1,29 @@
+import unittest
+
+from drag_and_drop_v2.schema import validate_data
+
+from .handlers import compare_results, run_benchmarks
+from .synthetic import make_problem_data
+
+
+class BenchmarkSmokeTests(unittest.TestCase):
+    """ Quick checks that the benchmarks work, so they don't break unnoticed """
+
+    def test_synthetic_data(self):
+        data = make_problem_data(20, 5)
+        validate_data(data)
+        self.assertEqual(len(data['items']), 20)
+        self.assertEqual(len(data['zones']), 5)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(sizes=[10], repeat=2)
+        self.assertEqual(sorted(results['10']), [
+            'do_attempt', 'get_configuration', 'get_configuration_cold', 'get_user_state',
+            'reset', 'student_view', 'studio_submit',
+        ])
+        self.assertEqual(compare_results(results, results), [])
+
+        slower = {'10': {'reset': {'min_ms': results['10']['reset']['min_ms'] * 2 + 1, 'median_ms': 0}}}
+        self.assertEqual(compare_results(slower, results), [
+            ('10', 'reset', results['10']['reset']['min_ms'], slower['10']['reset']['min_ms']),
+        ])
@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from xblock.fields import Scope
+from xblock.runtime import KeyValueStore
+
+from .load import SQLiteKeyValueStore, percentile, run_load_test
+
+
+class LoadTestSmokeTests(unittest.TestCase):
+    """ Quick checks that the load test works, so it doesn't break unnoticed """
+
+    def test_sqlite_key_value_store(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        kvs = SQLiteKeyValueStore(os.path.join(tmp_dir, 'kvs.sqlite'))
+        key = KeyValueStore.Key(Scope.user_state, 'learner', 'usage', 'item_state')
+        self.assertFalse(kvs.has(key))
+        kvs.set(key, {'v': 1})
+        self.assertTrue(kvs.has(key))
+        self.assertEqual(kvs.get(key), {'v': 1})
+        kvs.delete(key)
+        with self.assertRaises(KeyError):
+            kvs.get(key)
+
+    def test_percentile(self):
+        values = range(1, 101)
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 95), 5)
+
+    def test_run_load_test(self):
+        for use_processes in (False, True):
+            report = run_load_test(learners=4, drops=5, items=5, workers=2, use_processes=use_processes)
+            self.assertEqual(report['handlers']['do_attempt']['requests'], 20)
+            self.assertGreaterEqual(report['handlers']['get_user_state']['requests'], 4)
+            self.assertGreater(report['throughput_rps'], 0)
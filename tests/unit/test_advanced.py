@@ -64,8 +64,7 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
     """
     def test_do_attempt_wrong_with_feedback(self):
         item_id, zone_id = 0, self.ZONE_2
-        data = {"val": item_id, "zone": zone_id, "x_percent": "33%", "y_percent": "11%"}
-        res = self.call_handler('do_attempt', data)
+        res = self.drop(item_id, zone_id)
         self.assertEqual(res, {
             "overall_feedback": None,
             "finished": False,
@@ -75,8 +74,7 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
 
     def test_do_attempt_wrong_without_feedback(self):
         item_id, zone_id = 2, self.ZONE_1
-        data = {"val": item_id, "zone": zone_id, "x_percent": "33%", "y_percent": "11%"}
-        res = self.call_handler('do_attempt', data)
+        res = self.drop(item_id, zone_id)
         self.assertEqual(res, {
             "overall_feedback": None,
             "finished": False,
@@ -86,8 +84,7 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
 
     def test_do_attempt_correct(self):
         item_id, zone_id = 0, self.ZONE_1
-        data = {"val": item_id, "zone": zone_id, "x_percent": "33%", "y_percent": "11%"}
-        res = self.call_handler('do_attempt', data)
+        res = self.drop(item_id, zone_id)
         self.assertEqual(res, {
             "overall_feedback": None,
             "finished": False,
@@ -103,27 +100,24 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
                 published_grades.append(params)
         self.block.runtime.publish = mock_publish
 
-        self.call_handler('do_attempt', {
-            "val": 0, "zone": self.ZONE_1, "y_percent": "11%", "x_percent": "33%"
-        })
+        self.drop(0, self.ZONE_1)
 
         self.assertEqual(1, len(published_grades))
         self.assertEqual({'value': 0.5, 'max_value': 1}, published_grades[-1])
 
-        self.call_handler('do_attempt', {
-            "val": 1, "zone": self.ZONE_2, "y_percent": "90%", "x_percent": "42%"
-        })
+        self.drop(1, self.ZONE_2)
 
         self.assertEqual(2, len(published_grades))
         self.assertEqual({'value': 1, 'max_value': 1}, published_grades[-1])
 
     def test_do_attempt_final(self):
-        data = {"val": 0, "zone": self.ZONE_1, "x_percent": "33%", "y_percent": "11%"}
-        self.call_handler('do_attempt', data)
+        data_0 = self.drop_attempt(0, self.ZONE_1)
+        self.call_handler('do_attempt', data_0)
 
         expected_state = {
             "items": {
-                "0": {"x_percent": "33%", "y_percent": "11%", "correct": True, "zone": self.ZONE_1}
+                "0": {"x_percent": data_0["x_percent"], "y_percent": data_0["y_percent"], "correct": True,
+                      "zone": self.ZONE_1}
             },
             "finished": False,
             "num_attempts": 0,
@@ -131,8 +125,8 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
         }
         self.assertEqual(expected_state, self.call_handler('get_user_state', method="GET"))
 
-        data = {"val": 1, "zone": self.ZONE_2, "x_percent": "22%", "y_percent": "22%"}
-        res = self.call_handler('do_attempt', data)
+        data_1 = self.drop_attempt(1, self.ZONE_2)
+        res = self.call_handler('do_attempt', data_1)
         self.assertEqual(res, {
             "overall_feedback": self.FINAL_FEEDBACK,
             "finished": True,
@@ -143,10 +137,12 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
         expected_state = {
             "items": {
                 "0": {
-                    "x_percent": "33%", "y_percent": "11%", "correct": True, "zone": self.ZONE_1,
+                    "x_percent": data_0["x_percent"], "y_percent": data_0["y_percent"], "correct": True,
+                    "zone": self.ZONE_1,
                 },
                 "1": {
-                    "x_percent": "22%", "y_percent": "22%", "correct": True, "zone": self.ZONE_2,
+                    "x_percent": data_1["x_percent"], "y_percent": data_1["y_percent"], "correct": True,
+                    "zone": self.ZONE_2,
                 }
             },
             "finished": True,
@@ -155,6 +151,33 @@ class StandardModeFixture(BaseDragAndDropAjaxFixture):
         }
         self.assertEqual(expected_state, self.call_handler('get_user_state', method="GET"))
 
+    def test_do_attempts(self):
+        res = self.call_handler('do_attempts', {"attempts": [
+            self.drop_attempt(0, self.ZONE_2),
+            self.drop_attempt(0, self.ZONE_1),
+            self.drop_attempt(1, self.ZONE_2),
+        ]})
+        self.assertEqual(res, {
+            "results": [
+                {"correct": False, "feedback": self.FEEDBACK[0]["incorrect"]},
+                {"correct": True, "feedback": self.FEEDBACK[0]["correct"]},
+                {"correct": True, "feedback": self.FEEDBACK[1]["correct"]},
+            ],
+            "overall_feedback": self.FINAL_FEEDBACK,
+            "finished": True,
+        })
+
+    def test_do_attempts_invalid(self):
+        res = self.call_handler('do_attempts', {"val": 0}, expect_json=False)
+        self.assertEqual(res.status_code, 400)
+        res = self.call_handler('do_attempts', {"attempts": [
+            self.drop_attempt(0, self.ZONE_1),
+            self.drop_attempt(1, "no-such-zone"),
+        ]}, expect_json=False)
+        self.assertEqual(res.status_code, 400)
+        # Nothing in a rejected batch is stored:
+        self.assertEqual(self.call_handler('get_user_state', method="GET")["items"], {})
+
 
 class AssessmentModeFixture(BaseDragAndDropAjaxFixture):
     """
@@ -162,11 +185,26 @@ class AssessmentModeFixture(BaseDragAndDropAjaxFixture):
     """
     def test_do_attempt_in_assessment_mode(self):
         item_id, zone_id = 0, self.ZONE_1
-        data = {"val": item_id, "zone": zone_id, "x_percent": "33%", "y_percent": "11%"}
-        res = self.call_handler('do_attempt', data)
+        res = self.drop(item_id, zone_id)
         # In assessment mode, the do_attempt doesn't return any data.
         self.assertEqual(res, {})
 
+    def test_do_attempts_in_assessment_mode(self):
+        published_grades = []
+
+        def mock_publish(self, event, params):
+            if event == 'grade':
+                published_grades.append(params)
+        self.block.runtime.publish = mock_publish
+
+        res = self.call_handler('do_attempts', {"attempts": [
+            self.drop_attempt(0, self.ZONE_1),
+            self.drop_attempt(1, self.ZONE_2),
+        ]})
+        self.assertEqual(res, {})
+        self.assertEqual(published_grades, [{'value': 1, 'max_value': 1}])
+        self.assertEqual(sorted(self.call_handler('get_user_state', method="GET")["items"]), ["0", "1"])
+
 
 class TestDragAndDropHtmlData(StandardModeFixture, unittest.TestCase):
     FOLDER = "html"
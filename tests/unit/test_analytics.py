@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from drag_and_drop_v2.analytics import DropAggregator, aggregate_files, merge_results
+
+
+def dropped_event(user_id, item_id, zone, is_correct, block_id='block-1'):
+    return {
+        'event_type': 'edx.drag_and_drop_v2.item.dropped',
+        'event': {'item_id': item_id, 'location': zone.title(), 'location_id': zone, 'is_correct': is_correct},
+        'context': {'user_id': user_id, 'module': {'usage_key': block_id}},
+    }
+
+
+EVENTS = [
+    dropped_event(1, 0, 'top', True),
+    dropped_event(1, 0, 'top', True),  # Drops after the first correct one are not attempts
+    dropped_event(2, 0, 'bottom', False),
+    dropped_event(2, 0, 'middle', False),
+    dropped_event(2, 0, 'top', True),
+    dropped_event(2, 1, 'top', False),
+    dropped_event(3, 0, 'top', True, block_id='block-2'),
+]
+
+
+class AnalyticsTests(unittest.TestCase):
+    """ Tests for the tracking log aggregator """
+
+    def test_aggregate(self):
+        aggregator = DropAggregator()
+        for event in EVENTS:
+            aggregator.add_event(event)
+        result = aggregator.result()
+        self.assertEqual(result['evicted'], 0)
+        self.assertEqual(result['blocks']['block-1'], {
+            'drops': {'0': {'top': 3, 'bottom': 1, 'middle': 1}, '1': {'top': 1}},
+            'first_attempts': {'0': {'correct': 1, 'total': 2}, '1': {'correct': 0, 'total': 1}},
+            'attempts_to_correct': {'0': {'1': 1, '3': 1}},
+        })
+        self.assertEqual(result['blocks']['block-2']['first_attempts'], {'0': {'correct': 1, 'total': 1}})
+
+    def test_malformed_events(self):
+        aggregator = DropAggregator()
+        context = EVENTS[0]['context']
+        for event in [
+            {'event_type': 'edx.drag_and_drop_v2.item.dropped', 'context': context},
+            {'event_type': 'edx.drag_and_drop_v2.item.dropped', 'event': 'not json', 'context': context},
+            {'event_type': 'edx.drag_and_drop_v2.item.dropped', 'event': '[1]', 'context': context},
+            dict(EVENTS[0], event=json.dumps(EVENTS[0]['event'])),
+        ]:
+            aggregator.add_event(event)
+        self.assertEqual(aggregator.result()['blocks']['block-1']['drops'], {'0': {'top': 1}})
+
+    def test_malformed_lines(self):
+        aggregator = DropAggregator()
+        event_type = '"edx.drag_and_drop_v2.item.dropped"'
+        aggregator.add_lines([
+            '[{}]'.format(event_type),
+            event_type,
+            json.dumps(dict(EVENTS[0], context=None)),
+            json.dumps(dict(EVENTS[0], context='not a dict')),
+            json.dumps(dict(EVENTS[0], context={'user_id': 1, 'module': None})),
+            json.dumps(dict(EVENTS[0], context={'user_id': 1, 'module': 'not a dict'})),
+            json.dumps(EVENTS[0]),
+        ])
+        self.assertEqual(aggregator.result()['blocks'].keys(), ['block-1'])
+        self.assertEqual(aggregator.result()['blocks']['block-1']['drops'], {'0': {'top': 1}})
+
+    def test_bounded_memory(self):
+        aggregator = DropAggregator(max_pending=1)
+        for event in EVENTS[2:6]:
+            aggregator.add_event(event)
+        result = aggregator.result()
+        self.assertEqual(result['evicted'], 1)
+        self.assertEqual(result['blocks']['block-1']['attempts_to_correct'], {'0': {'3': 1}})
+
+    def test_merge_shards(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        paths = [os.path.join(tmp_dir, 'tracking.log'), os.path.join(tmp_dir, 'tracking.log.1.gz')]
+        with open(paths[0], 'w') as log:
+            log.write(json.dumps({'event_type': 'other', 'event': {}}) + '\n')
+            for event in EVENTS[:2]:
+                log.write(json.dumps(event) + '\n')
+        log = gzip.open(paths[1], 'wb')
+        for event in EVENTS[2:]:
+            log.write(json.dumps(event) + '\n')
+        log.close()
+
+        aggregator = DropAggregator()
+        for event in EVENTS:
+            aggregator.add_event(event)
+        expected = merge_results([aggregator.result()])
+        self.assertEqual(aggregate_files(paths, processes=1), expected)
+        self.assertEqual(aggregate_files(paths, processes=2), expected)
@@ -1,10 +1,12 @@
 import unittest
 
+from drag_and_drop_v2 import problem_index
 from drag_and_drop_v2.drag_and_drop_v2 import DragAndDropBlock
 from drag_and_drop_v2.default_data import (
     TARGET_IMG_DESCRIPTION, TOP_ZONE_ID, MIDDLE_ZONE_ID, BOTTOM_ZONE_ID,
     START_FEEDBACK, FINISH_FEEDBACK, DEFAULT_DATA
 )
+from drag_and_drop_v2.state_encoding import decode_item_state
 from ..utils import make_block, TestCaseMixin
 
 
@@ -40,6 +42,9 @@ class BasicTests(TestCaseMixin, unittest.TestCase):
             "show_problem_header": True,
             "target_img_expanded_url": '/expanded/url/to/drag_and_drop_v2/public/img/triangle.png',
             "target_img_description": TARGET_IMG_DESCRIPTION,
+            "target_img_natural_width": 514,
+            "target_img_natural_height": 486,
+            "target_img_srcset": "",
             "item_background_color": None,
             "item_text_color": None,
             "initial_feedback": START_FEEDBACK,
@@ -48,7 +53,7 @@ class BasicTests(TestCaseMixin, unittest.TestCase):
         self.assertEqual(zones, DEFAULT_DATA["zones"])
         # Items should contain no answer data:
         self.assertEqual(items, [
-            {"id": i, "displayName": display_name, "imageURL": "", "expandedImageURL": ""}
+            {"id": i, "displayName": display_name, "imageURL": "", "expandedImageURL": "", "expandedImageSrcset": ""}
             for i, display_name in enumerate(
                 [
                     "Goes to the top",
@@ -75,30 +80,26 @@ class BasicTests(TestCaseMixin, unittest.TestCase):
         assert_user_state_empty()
 
         # Drag three items into the correct spot:
-        data = {"val": 0, "zone": TOP_ZONE_ID, "x_percent": "33%", "y_percent": "11%"}
-        self.call_handler('do_attempt', data)
-        data = {"val": 1, "zone": MIDDLE_ZONE_ID, "x_percent": "67%", "y_percent": "80%"}
-        self.call_handler('do_attempt', data)
-        data = {"val": 2, "zone": BOTTOM_ZONE_ID, "x_percent": "99%", "y_percent": "95%"}
-        self.call_handler('do_attempt', data)
-        data = {"val": 3, "zone": MIDDLE_ZONE_ID, "x_percent": "67%", "y_percent": "80%"}
-        self.call_handler('do_attempt', data)
+        attempts = [
+            self.drop_attempt(0, TOP_ZONE_ID),
+            self.drop_attempt(1, MIDDLE_ZONE_ID),
+            self.drop_attempt(2, BOTTOM_ZONE_ID),
+            self.drop_attempt(3, MIDDLE_ZONE_ID),
+        ]
+        for data in attempts:
+            self.call_handler('do_attempt', data)
 
         # Check the result:
+        expected_items = {
+            str(data['val']): {
+                'x_percent': data['x_percent'], 'y_percent': data['y_percent'], 'correct': True, 'zone': data['zone'],
+            }
+            for data in attempts
+        }
         self.assertTrue(self.block.completed)
-        self.assertEqual(self.block.item_state, {
-            '0': {'x_percent': '33%', 'y_percent': '11%', 'correct': True, 'zone': TOP_ZONE_ID},
-            '1': {'x_percent': '67%', 'y_percent': '80%', 'correct': True, 'zone': MIDDLE_ZONE_ID},
-            '2': {'x_percent': '99%', 'y_percent': '95%', 'correct': True, 'zone': BOTTOM_ZONE_ID},
-            '3': {'x_percent': '67%', 'y_percent': '80%', 'correct': True, "zone": MIDDLE_ZONE_ID},
-        })
+        self.assertEqual(decode_item_state(self.block.item_state), expected_items)
         self.assertEqual(self.call_handler('get_user_state'), {
-            'items': {
-                '0': {'x_percent': '33%', 'y_percent': '11%', 'correct': True, 'zone': TOP_ZONE_ID},
-                '1': {'x_percent': '67%', 'y_percent': '80%', 'correct': True, 'zone': MIDDLE_ZONE_ID},
-                '2': {'x_percent': '99%', 'y_percent': '95%', 'correct': True, 'zone': BOTTOM_ZONE_ID},
-                '3': {'x_percent': '67%', 'y_percent': '80%', 'correct': True, "zone": MIDDLE_ZONE_ID},
-            },
+            'items': expected_items,
             'finished': True,
             "num_attempts": 0,
             'overall_feedback': FINISH_FEEDBACK,
@@ -121,7 +122,9 @@ class BasicTests(TestCaseMixin, unittest.TestCase):
             'item_text_color': 'coral',
             'weight': '5',
             'data': {
-                'foo': 1
+                'feedback': {'start': "Start", 'finish': "Finish"},
+                'zones': [{'title': "Zone 1", 'x': 10, 'y': 20, 'width': 30, 'height': 40}],
+                'items': [{'id': 0, 'displayName': "Item", 'zone': "Zone 1"}],
             },
         }
         res = self.call_handler('studio_submit', body)
@@ -136,7 +139,46 @@ class BasicTests(TestCaseMixin, unittest.TestCase):
         self.assertEqual(self.block.item_background_color, "cornflowerblue")
         self.assertEqual(self.block.item_text_color, "coral")
         self.assertEqual(self.block.weight, 5)
-        self.assertEqual(self.block.data, {'foo': 1})
+        data_version = self.block.data.pop('dataVersion')
+        self.assertEqual(data_version, problem_index.data_version(self.block.data))
+        self.assertEqual(self.block.data, {
+            'schemaVersion': 1,
+            'feedback': {'start': "Start", 'finish': "Finish"},
+            'zones': [{'title': "Zone 1", 'uid': "Zone 1", 'x': 10, 'y': 20, 'width': 30, 'height': 40}],
+            'items': [{
+                'id': 0,
+                'displayName': "Item",
+                'zones': ["Zone 1"],
+                'imageURL': '',
+                'feedback': {'correct': '', 'incorrect': ''},
+            }],
+        })
+
+    def test_studio_submit_invalid_data(self):
+        body = {
+            'display_name': "Test Drag & Drop",
+            'mode': DragAndDropBlock.ASSESSMENT_MODE,
+            'max_attempts': 1,
+            'show_title': False,
+            'problem_text': "Problem Drag & Drop",
+            'show_problem_header': False,
+            'item_background_color': '',
+            'item_text_color': '',
+            'weight': '5',
+            'data': {
+                'zones': [{'uid': "zone-1"}],
+                'items': [{'id': 0, 'zones': ["zone-2"]}],
+            },
+        }
+        res = self.call_handler('studio_submit', body)
+        self.assertEqual(res, {'result': 'error', 'message': "Items can only be assigned to zones that exist."})
+        self.assertEqual(self.block.data, DEFAULT_DATA)
+        self.assertEqual(self.block.display_name, "Drag and Drop")
+
+        body['data'] = {'zones': "zone-1", 'items': []}
+        res = self.call_handler('studio_submit', body)
+        self.assertEqual(res, {'result': 'error', 'message': "The zones of the problem are invalid."})
+        self.assertEqual(self.block.data, DEFAULT_DATA)
 
     def test_expand_static_url(self):
         """ Test the expand_static_url handler needed in Studio when changing the image """
@@ -151,7 +193,7 @@ class BasicTests(TestCaseMixin, unittest.TestCase):
             '/expanded/url/to/drag_and_drop_v2/public/img/triangle.png',
         )
 
-        self.block.data["targetImg"] = "/static/foo.png"
+        self.block.data = dict(self.block.data, targetImg="/static/foo.png")
         self.assertEqual(
             self.block.get_configuration()["target_img_expanded_url"],
             '/course/test-course/assets/foo.png',
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from drag_and_drop_v2 import bundle
+
+
+class BundleTests(unittest.TestCase):
+    """ Tests for the asset bundles of the student view """
+
+    def setUp(self):
+        # Build the bundles in a copy of the package, rather than in the package itself.
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.package_dir = os.path.join(tmp_dir, 'drag_and_drop_v2')
+        shutil.copytree(os.path.join(bundle.PACKAGE_DIR, 'public'), os.path.join(self.package_dir, 'public'))
+        shutil.rmtree(os.path.join(self.package_dir, bundle.BUNDLE_DIR), ignore_errors=True)
+
+    def urls(self, debug=False):
+        return bundle.student_view_urls(debug=debug, package_dir=self.package_dir)
+
+    def test_without_bundles(self):
+        self.assertEqual(self.urls(), (bundle.STUDENT_VIEW_CSS, bundle.STUDENT_VIEW_JS))
+
+    def test_build(self):
+        manifest = bundle.build(self.package_dir)
+        self.assertEqual(self.urls(), ((manifest['css'],), (manifest['js'],)))
+        self.assertRegexpMatches(manifest['js'], r'^public/bundle/student_view\.[0-9a-f]{12}\.js$')
+        self.assertEqual(self.urls(debug=True), (bundle.STUDENT_VIEW_CSS, bundle.STUDENT_VIEW_JS))
+
+        with open(os.path.join(self.package_dir, manifest['css'])) as css:
+            self.assertIn('.xblock--drag-and-drop', css.read())
+        with open(os.path.join(self.package_dir, manifest['js'])) as js:
+            self.assertIn('function DragAndDropBlock(', js.read())
+
+    def test_stale_bundles_are_not_used(self):
+        manifest = bundle.build(self.package_dir)
+        self.assertEqual(self.urls(), ((manifest['css'],), (manifest['js'],)))
+        path = os.path.join(self.package_dir, 'public/js/drag_and_drop.js')
+        with open(path, 'a') as source:
+            source.write('\n// Changed\n')
+        # Make sure the change is noticed even if the file system only stores whole seconds.
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (mtime, mtime))
+        self.assertEqual(self.urls(), (bundle.STUDENT_VIEW_CSS, bundle.STUDENT_VIEW_JS))
+
+    def test_missing_minifiers(self):
+        with patch.object(bundle, 'rcssmin', None), patch.object(bundle, 'rjsmin', None):
+            self.assertEqual(bundle.missing_minifiers(), ['rcssmin', 'rjsmin'])
+            manifest = bundle.build(self.package_dir)
+        with open(os.path.join(self.package_dir, manifest['js'])) as js:
+            self.assertIn('function DragAndDropBlock(runtime, element, configuration) {', js.read())
@@ -0,0 +1,89 @@
+import copy
+import unittest
+
+from drag_and_drop_v2.default_data import TOP_ZONE_ID, MIDDLE_ZONE_ID, BOTTOM_ZONE_ID
+from drag_and_drop_v2.schema import normalize_data
+from drag_and_drop_v2.state_encoding import decode_item_state
+from ..utils import make_block, TestCaseMixin
+
+
+class DropValidationTests(TestCaseMixin, unittest.TestCase):
+    """ Tests for the validation of the zone and position of drops """
+
+    def setUp(self):
+        self.block = make_block()
+        self.patch_workbench()
+
+    def test_do_attempt_resolves_zone_from_coordinates(self):
+        """
+        The zone of a drop is found from its coordinates. A zone the client claims must contain them,
+        and the item must be placed at them.
+        """
+        data = {"val": 0, "x": 250, "y": 100, "x_percent": "48.64%", "y_percent": "20.58%"}
+        self.assertTrue(self.call_handler('do_attempt', data)['correct'])
+        self.assertEqual(decode_item_state(self.block.item_state)['0']['zone'], TOP_ZONE_ID)
+
+        data = {"val": 1, "zone": TOP_ZONE_ID, "x": 250, "y": 100, "x_percent": "48.64%", "y_percent": "20.58%"}
+        self.assertFalse(self.call_handler('do_attempt', data)['correct'])
+
+        for data in (
+            {"val": 2, "zone": BOTTOM_ZONE_ID, "x": 250, "y": 100, "x_percent": "48.64%", "y_percent": "20.58%"},
+            {"val": 2, "zone": BOTTOM_ZONE_ID, "x": 250, "y": 400, "x_percent": "48.64%", "y_percent": "20.58%"},
+        ):
+            response = self.call_handler('do_attempt', data, expect_json=False)
+            self.assertEqual(response.status_code, 400)
+        self.assertNotIn('2', decode_item_state(self.block.item_state))
+
+    def test_do_attempt_overlapping_zones(self):
+        """ Items can be dropped on a part of a zone that another zone is displayed on top of """
+        data = copy.deepcopy(self.block.data)
+        # A zone on top of the middle of the middle zone, for which item 1 is correct.
+        data["zones"].append({"uid": "overlap", "title": "Overlap", "x": 200, "y": 240, "width": 100, "height": 80})
+        self.block.data = normalize_data(data)
+
+        attempt = {"val": 1, "x": 250, "y": 280, "x_percent": "48.64%", "y_percent": "57.61%"}
+        self.assertFalse(self.call_handler('do_attempt', attempt)['correct'])
+        attempt["zone"] = MIDDLE_ZONE_ID
+        self.assertTrue(self.call_handler('do_attempt', attempt)['correct'])
+        self.assertEqual(decode_item_state(self.block.item_state)['1']['zone'], MIDDLE_ZONE_ID)
+
+    def test_do_attempt_without_coordinates(self):
+        """ Attempts with only the UID of the zone are accepted, unless disabled in the XBlock settings """
+        data = {"val": 0, "zone": TOP_ZONE_ID, "x_percent": "33%", "y_percent": "11%"}
+        self.assertTrue(self.call_handler('do_attempt', data)['correct'])
+
+        self.call_handler('reset', {})
+        self.apply_patch(
+            'drag_and_drop_v2.drag_and_drop_v2.DragAndDropBlock.get_xblock_settings',
+            return_value={'allow_attempts_without_coordinates': False},
+        )
+        response = self.call_handler('do_attempt', data, expect_json=False)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.block.item_state, {})
+
+    def test_do_attempt_polygon_zone(self):
+        """ Drops inside the bounding box of a polygon zone, but outside of the polygon, miss the zone """
+        data = copy.deepcopy(self.block.data)
+        # A triangle covering the top left half of the top zone.
+        data["zones"][0]["points"] = [[160, 30], [356, 30], [160, 208]]
+        self.block.data = normalize_data(data)
+
+        attempt = {"val": 0, "zone": TOP_ZONE_ID, "x": 170, "y": 40, "x_percent": "33.07%", "y_percent": "8.23%"}
+        self.assertTrue(self.call_handler('do_attempt', attempt)['correct'])
+
+        attempt = {"val": 0, "zone": TOP_ZONE_ID, "x": 350, "y": 200, "x_percent": "68.09%", "y_percent": "41.15%"}
+        response = self.call_handler('do_attempt', attempt, expect_json=False)
+        self.assertEqual(response.status_code, 400)
+
+    def test_do_attempt_invalid_coordinates(self):
+        for data in (
+            {"val": 0, "zone": TOP_ZONE_ID, "x": 1, "y": 1, "x_percent": "0.19%", "y_percent": "0.21%"},
+            {"val": 0, "zone": TOP_ZONE_ID, "x": 250, "y": 100, "x_percent": "33%", "y_percent": "11%"},
+            {"val": 0, "zone": TOP_ZONE_ID, "x": "250", "y": 100, "x_percent": "49%", "y_percent": "20%"},
+            {"val": 0, "zone": TOP_ZONE_ID, "x": 250, "x_percent": "49%", "y_percent": "20%"},
+            {"val": 0, "zone": TOP_ZONE_ID, "x": 250, "y": 100, "x_percent": "left", "y_percent": "20.58%"},
+            {"val": 0, "zone": TOP_ZONE_ID, "x": 250, "y": 100, "x_percent": "48.64%"},
+        ):
+            response = self.call_handler('do_attempt', data, expect_json=False)
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.block.item_state, {})
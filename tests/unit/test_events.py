@@ -0,0 +1,44 @@
+import unittest
+
+from mock import patch
+
+from drag_and_drop_v2.default_data import TOP_ZONE_ID, MIDDLE_ZONE_ID
+from ..utils import make_block, TestCaseMixin
+
+
+class EventsTests(TestCaseMixin, unittest.TestCase):
+    """ Tests for the tracking events published by the client """
+
+    def setUp(self):
+        self.block = make_block()
+        self.patch_workbench()
+
+    def test_publish_events(self):
+        """ publish_events publishes a whole batch of the block's own events, or nothing """
+        with patch.object(self.block.runtime, 'publish') as publish:
+            res = self.call_handler('publish_events', {'events': [
+                {'event_type': 'edx.drag_and_drop_v2.loaded'},
+                {'event_type': 'edx.drag_and_drop_v2.item.picked_up', 'item_id': 1},
+            ]})
+            self.assertEqual(res, {'result': 'success'})
+            self.assertEqual(publish.call_args_list, [
+                ((self.block, 'edx.drag_and_drop_v2.loaded', {}),),
+                ((self.block, 'edx.drag_and_drop_v2.item.picked_up', {'item_id': 1}),),
+            ])
+
+            publish.reset_mock()
+            for data in ({}, {'events': [{'item_id': 1}]}, {'events': [{'event_type': 'grade', 'value': 1}]}):
+                res = self.call_handler('publish_events', data)
+                self.assertEqual(res['result'], 'error')
+            self.assertFalse(publish.called)
+
+    def test_events_sent_with_attempt(self):
+        """ Tracking events sent along with a drop are published before the drop is evaluated """
+        with patch.object(self.block.runtime, 'publish') as publish:
+            self.drop(0, TOP_ZONE_ID, events=[{'event_type': 'edx.drag_and_drop_v2.item.picked_up', 'item_id': 0}])
+            self.assertEqual(
+                [call[0][1] for call in publish.call_args_list],
+                ['edx.drag_and_drop_v2.item.picked_up', 'grade', 'edx.drag_and_drop_v2.item.dropped'],
+            )
+        res = self.drop(1, MIDDLE_ZONE_ID, expect_json=False, events=[{'event_type': 'problem_check'}])
+        self.assertEqual(res.status_code, 400)
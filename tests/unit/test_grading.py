@@ -0,0 +1,99 @@
+import copy
+import unittest
+
+from drag_and_drop_v2.default_data import MIDDLE_ZONE_ID, BOTTOM_ZONE_ID, TOP_ZONE_ID, DEFAULT_DATA
+from drag_and_drop_v2 import metrics
+from drag_and_drop_v2.drag_and_drop_v2 import DragAndDropBlock
+from drag_and_drop_v2.state_encoding import decode_item_state
+from ..utils import make_block, TestCaseMixin
+
+
+class GradingTests(TestCaseMixin, unittest.TestCase):
+    """ Tests for the correctness counters of a block and the publishing of its grade """
+
+    def setUp(self):
+        self.block = make_block()
+        self.patch_workbench()
+
+    def _published_grades(self):
+        published_grades = []
+
+        def mock_publish(_block, event, params):
+            if event == 'grade':
+                published_grades.append(params['value'])
+        self.block.runtime.publish = mock_publish
+        return published_grades
+
+    def test_item_stats_counters(self):
+        """ Correctness counters are kept up to date as items are placed, and recounted when data changes """
+        self.drop(0, TOP_ZONE_ID)
+        self.drop(0, TOP_ZONE_ID)
+        self.drop(1, TOP_ZONE_ID)
+        self.assertEqual(self.block.item_stats['correct'], 1)
+
+        # Make item 0 belong to a different zone; the stored counters are now stale and must be recounted.
+        data = copy.deepcopy(DEFAULT_DATA)
+        data['items'][0]['zones'] = [BOTTOM_ZONE_ID]
+        self.block.data = data
+        item_state = decode_item_state(self.block.item_state)
+        item_state['1'] = {'zone': MIDDLE_ZONE_ID, 'correct': True, 'x_percent': '1%', 'y_percent': '1%'}
+        self.block.item_state = item_state
+        self.assertFalse(self.call_handler('get_user_state')['finished'])
+        self.assertEqual(self.block.item_stats['correct'], 2)
+
+        self.call_handler('reset', {})
+        self.assertEqual(self.block.item_stats['correct'], 0)
+
+    def test_grade_published_on_change(self):
+        """ The grade is only published when its value changes """
+        published_grades = self._published_grades()
+        metrics.reset()
+        self.drop(0, MIDDLE_ZONE_ID)
+        self.drop(0, BOTTOM_ZONE_ID)
+        self.drop(0, TOP_ZONE_ID)
+        self.drop(4, TOP_ZONE_ID)
+        self.assertEqual(published_grades, [0, 0.25])
+        self.assertEqual(metrics.get_counters(), {'grade.published': 2, 'grade.skipped_unchanged': 2})
+
+    def test_grade_publish_interval(self):
+        """ With a publish interval set, grade changes are coalesced until the interval passes or completion """
+        published_grades = self._published_grades()
+        self.apply_patch(
+            'drag_and_drop_v2.drag_and_drop_v2.DragAndDropBlock.get_xblock_settings',
+            return_value={'grade_publish_interval': 60},
+        )
+        mock_time = self.apply_patch('drag_and_drop_v2.drag_and_drop_v2.time.time', return_value=1000)
+        self.drop(0, TOP_ZONE_ID)
+        self.drop(1, MIDDLE_ZONE_ID)
+        self.assertEqual(published_grades, [0.25])
+        mock_time.return_value = 1061
+        self.drop(2, BOTTOM_ZONE_ID)
+        self.assertEqual(published_grades, [0.25, 0.75])
+        self.drop(3, TOP_ZONE_ID)
+        self.assertEqual(published_grades, [0.25, 0.75, 1])
+
+    def test_grade_publish_interval_pending(self):
+        """ A grade change deferred by the publish interval is published once, when the learner comes back """
+        published_grades = self._published_grades()
+        self.apply_patch(
+            'drag_and_drop_v2.drag_and_drop_v2.DragAndDropBlock.get_xblock_settings',
+            return_value={'grade_publish_interval': 60},
+        )
+        self.apply_patch('drag_and_drop_v2.drag_and_drop_v2.time.time', return_value=1000)
+        self.drop(0, TOP_ZONE_ID)
+        self.drop(1, MIDDLE_ZONE_ID)
+        self.assertEqual(published_grades, [0.25])
+        self.assertTrue(self.block.grade_pending)
+        # Neither rendering the problem nor getting the user state publish it, since their changes aren't saved.
+        self.block.student_view({})
+        self.call_handler('get_user_state', method='GET')
+        self.assertEqual(published_grades, [0.25])
+
+        loaded = {"events": [{"event_type": "edx.drag_and_drop_v2.loaded"}]}
+        for _ in range(2):
+            # Each page load uses a new instance of the block, with the fields saved by the previous requests.
+            field_data = self.block._field_data  # pylint: disable=protected-access
+            self.block = DragAndDropBlock(self.block.runtime, field_data, scope_ids=self.block.scope_ids)
+            self.call_handler('publish_events', loaded)
+        self.assertEqual(published_grades, [0.25, 0.5])
+        self.assertFalse(self.block.grade_pending)
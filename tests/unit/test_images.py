@@ -0,0 +1,189 @@
+import copy
+import io
+import struct
+import unittest
+
+import mock
+from mock import patch
+
+from drag_and_drop_v2 import images
+from drag_and_drop_v2.default_data import DEFAULT_DATA
+from drag_and_drop_v2.images import get_image_size, get_package_image_size
+from ..utils import make_block, make_studio_submission, FakeContentStore, TestCaseMixin
+
+
+class ImageSizeTests(unittest.TestCase):
+    """ Tests for reading the size of images from their headers """
+
+    def test_png(self):
+        header = '\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + 'IHDR' + struct.pack('>II', 640, 480) + '\x08\x06'
+        self.assertEqual(get_image_size(header), (640, 480))
+        self.assertEqual(get_package_image_size('public/img/triangle.png'), (514, 486))
+
+    def test_gif(self):
+        self.assertEqual(get_image_size('GIF89a' + struct.pack('<HH', 320, 200) + '\x00' * 10), (320, 200))
+
+    def test_jpeg(self):
+        app0 = '\xff\xe0' + struct.pack('>H', 16) + 'JFIF\x00' + '\x00' * 9
+        sof0 = '\xff\xc0' + struct.pack('>HBHHB', 17, 8, 1080, 1920, 3) + '\x00' * 9
+        self.assertEqual(get_image_size('\xff\xd8' + app0 + sof0), (1920, 1080))
+        # The header was cut before the frame.
+        self.assertIsNone(get_image_size('\xff\xd8' + app0))
+
+    def test_svg(self):
+        svg_sizes = [
+            ('<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="300" height="150px">', (300, 150)),
+            ('<svg viewBox="0 0 400 200">', (400, 200)),
+            ('<svg width="800" viewBox="0,0,400,200">', (800, 400)),
+            ('<svg width="1in" height="2.54cm">', (96, 96)),
+            ('<svg width="100%" height="100%">', None),
+            ('<html><body>Not an image</body></html>', None),
+        ]
+        for header, size in svg_sizes:
+            self.assertEqual(get_image_size(header), size)
+
+    def test_unsupported(self):
+        self.assertIsNone(get_image_size('BM' + '\x00' * 30))
+        self.assertIsNone(get_image_size(''))
+
+
+@unittest.skipIf(images.Image is None, "Pillow is not installed")
+class ImageVariantsTests(unittest.TestCase):
+    """ Tests for the smaller copies of course asset images """
+
+    def setUp(self):
+        self.store = FakeContentStore()
+        patcher = patch.object(images, '_contentstore', (FakeContentStore.StaticContent, lambda: self.store))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_image(self, name, size, image_format):
+        output = io.BytesIO()
+        images.Image.new('RGB', size, (200, 100, 50)).save(output, image_format)
+        self.store.add('course', name, output.getvalue())
+        return output.getvalue()
+
+    def test_make_variants(self):
+        content = self.add_image('photo.jpg', (1000, 500), 'JPEG')
+        variants = images.make_variants(content)
+        self.assertEqual([(width, content_type) for width, content_type, _ in variants],
+                         [(480, 'image/jpeg'), (960, 'image/jpeg')])
+        self.assertEqual(images.get_image_size(variants[0][2]), (480, 240))
+        self.assertEqual(images.make_variants('not an image'), [])
+
+    def test_course_asset_image(self):
+        self.add_image('photo.png', (1000, 500), 'PNG')
+        size, variants = images.get_course_asset_image('course', '/static/photo.png')
+        self.assertEqual(size, (1000, 500))
+        self.assertEqual(len(variants), 2)
+        self.assertRegexpMatches(variants[0][0], r'^/static/photo\.[0-9a-f]{8}\.480w\.png$')
+        self.assertEqual([width for _, width in variants], [480, 960])
+        self.assertEqual(len(self.store.contents), 3)
+        # Existing variants are reused.
+        with patch.object(images, 'make_variants', return_value=[]) as make_variants:
+            self.assertEqual(images.get_course_asset_image('course', '/static/photo.png'), (size, variants))
+        make_variants.assert_called_once_with(mock.ANY, [])
+
+    def test_unchanged_course_asset_image(self):
+        """ Images that haven't changed since they were stored are not read again """
+        self.add_image('photo.jpg', (1000, 500), 'JPEG')
+        stored = images.get_course_asset_image('course', '/static/photo.jpg')
+        with patch.object(FakeContentStore.StaticContent, 'stream_data') as stream_data:
+            self.assertEqual(images.get_course_asset_image('course', '/static/photo.jpg', stored), stored)
+        self.assertFalse(stream_data.called)
+
+    def test_changed_course_asset_image(self):
+        """ New variants are made for the new version of an image, and those of the previous one are kept """
+        self.add_image('photo.jpg', (1000, 500), 'JPEG')
+        stored = images.get_course_asset_image('course', '/static/photo.jpg')
+        self.add_image('photo.jpg', (600, 500), 'JPEG')
+        size, variants = images.get_course_asset_image('course', '/static/photo.jpg', stored)
+        self.assertEqual(size, (600, 500))
+        self.assertEqual([width for _, width in variants], [480])
+        self.assertNotEqual(variants[0][0], stored[1][0][0])
+        self.assertEqual(
+            sorted(content.name for content in self.store.contents.values()),
+            sorted(['photo.jpg'] + [url[len('/static/'):] for url, _ in variants + stored[1]]),
+        )
+
+    def test_variants_not_saved(self):
+        """ The size of an image is still returned if its variants can't be saved """
+        self.add_image('photo.png', (1000, 500), 'PNG')
+        with patch.object(self.store, 'save', side_effect=IOError), patch.object(images, 'log') as log:
+            self.assertEqual(images.get_course_asset_image('course', '/static/photo.png'), ((1000, 500), []))
+        self.assertTrue(log.exception.called)
+
+    def test_no_variants(self):
+        self.add_image('small.png', (400, 300), 'PNG')
+        self.add_image('photo.gif', (1000, 500), 'GIF')
+        self.assertEqual(images.get_course_asset_image('course', '/static/small.png'), ((400, 300), []))
+        self.assertEqual(images.get_course_asset_image('course', '/static/photo.gif'), ((1000, 500), []))
+        self.assertEqual(images.get_course_asset_image('course', '/static/missing.png'), (None, []))
+        self.assertEqual(images.get_course_asset_image('course', 'http://example.com/photo.png'), (None, []))
+
+
+class BlockImageTests(TestCaseMixin, unittest.TestCase):
+    """ Tests for the sizes and variants of the images of a block """
+
+    def setUp(self):
+        self.block = make_block()
+        self.patch_workbench()
+
+    def test_studio_submit_measures_images(self):
+        data = copy.deepcopy(DEFAULT_DATA)
+        data['targetImg'] = "/static/target.png"
+        data['items'][0]['imageURL'] = "/static/item.gif"
+        data['items'][1]['imageURL'] = "http://example.com/item.gif"
+        body = make_studio_submission(data)
+        store = FakeContentStore()
+        store.add('course', 'target.png', '\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x03\x20\x00\x00\x02\x58')
+        store.add('course', 'item.gif', 'GIF89a\x40\x00\x20\x00')
+        self.apply_patch('workbench.runtime.WorkbenchRuntime.course_id', 'course', create=True)
+        with patch.object(images, '_contentstore', (FakeContentStore.StaticContent, lambda: store)):
+            self.assertEqual(self.call_handler('studio_submit', body), {'result': 'success'})
+        self.assertEqual(self.block.data['targetImgNaturalWidth'], 800)
+        self.assertEqual(self.block.data['targetImgNaturalHeight'], 600)
+        self.assertEqual(self.block.data['items'][0]['imgNaturalWidth'], 64)
+        self.assertEqual(self.block.data['items'][0]['imgNaturalHeight'], 32)
+        self.assertNotIn('imgNaturalWidth', self.block.data['items'][1])
+        configuration = self.block.get_configuration()
+        self.assertEqual(configuration['target_img_natural_width'], 800)
+        self.assertEqual(configuration['target_img_natural_height'], 600)
+        self.assertEqual(configuration['items'][0]['imgNaturalWidth'], 64)
+
+        # The sizes are forgotten when the images can't be measured anymore.
+        body['data'] = self.block.data
+        self.assertEqual(self.call_handler('studio_submit', body), {'result': 'success'})
+        self.assertNotIn('targetImgNaturalWidth', self.block.data)
+        self.assertNotIn('imgNaturalWidth', self.block.data['items'][0])
+        self.assertIsNone(self.block.get_configuration()['target_img_natural_width'])
+
+    def test_image_srcset(self):
+        """ The variants of images are sent as srcsets, along with the original at its natural width """
+        data = copy.deepcopy(self.block.data)
+        data.update({
+            'targetImg': "/static/target.png",
+            'targetImgNaturalWidth': 1000,
+            'targetImgNaturalHeight': 800,
+            'targetImgVariants': [["/static/target.1234abcd.480w.png", 480], ["/static/target.1234abcd.960w.png", 960]],
+        })
+        data['items'][0].update({
+            'imageURL': "/static/item.jpg",
+            'imgNaturalWidth': 600,
+            'imgNaturalHeight': 300,
+            'imgVariants': [["/static/item.1234abcd.480w.jpg", 480]],
+        })
+        self.block.data = data
+        configuration = self.block.get_configuration()
+        self.assertEqual(
+            configuration['target_img_srcset'],
+            '/course/test-course/assets/target.1234abcd.480w.png 480w, '
+            '/course/test-course/assets/target.1234abcd.960w.png 960w, '
+            '/course/test-course/assets/target.png 1000w'
+        )
+        self.assertEqual(
+            configuration['items'][0]['expandedImageSrcset'],
+            '/course/test-course/assets/item.1234abcd.480w.jpg 480w, /course/test-course/assets/item.jpg 600w'
+        )
+        self.assertNotIn('imgVariants', configuration['items'][0])
+        self.assertEqual(configuration['items'][1]['expandedImageSrcset'], '')
@@ -0,0 +1,134 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from drag_and_drop_v2 import metrics
+from drag_and_drop_v2.default_data import TOP_ZONE_ID
+from ..utils import make_block, TestCaseMixin
+
+
+class MetricsTests(unittest.TestCase):
+    """ Tests for the metrics sinks """
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_prometheus_text(self):
+        sink = metrics.MemorySink()
+        sink.timing('do_attempt.latency_ms', 3)
+        sink.timing('do_attempt.latency_ms', 30)
+        sink.increment('do_attempt.events.grade')
+        text = metrics.prometheus_text()
+        self.assertIn('# TYPE drag_and_drop_v2_do_attempt_events_grade_total counter\n', text)
+        self.assertIn('drag_and_drop_v2_do_attempt_events_grade_total 1\n', text)
+        self.assertIn('drag_and_drop_v2_do_attempt_latency_ms_bucket{le="2.5"} 0\n', text)
+        self.assertIn('drag_and_drop_v2_do_attempt_latency_ms_bucket{le="5"} 1\n', text)
+        self.assertIn('drag_and_drop_v2_do_attempt_latency_ms_bucket{le="+Inf"} 2\n', text)
+        self.assertIn('drag_and_drop_v2_do_attempt_latency_ms_sum 33\n', text)
+
+    def test_prometheus_sink(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        sink = metrics.PrometheusSink(os.path.join(tmp_dir, 'metrics.prom'), interval=0)
+        sink.histogram('reset.response_bytes', 100)
+        # Each process writes its own file, with its PID as a label.
+        self.assertEqual(os.listdir(tmp_dir), ['metrics.{}.prom'.format(os.getpid())])
+        with open(os.path.join(tmp_dir, os.listdir(tmp_dir)[0])) as dump:
+            text = dump.read()
+        self.assertEqual(text, metrics.prometheus_text(labels=[('pid', os.getpid())]))
+        self.assertIn('drag_and_drop_v2_reset_response_bytes_bucket{{pid="{}",le="256"}} 1\n'.format(os.getpid()), text)
+        self.assertIn('drag_and_drop_v2_reset_response_bytes_count{{pid="{}"}} 1\n'.format(os.getpid()), text)
+
+    def test_sink_cached_per_settings(self):
+        """ The configuration of the sink is only encoded once per settings object """
+        settings = {'metrics': {'sink': 'memory'}}
+        block = Mock()
+        block.get_xblock_settings.return_value = settings
+        sink = metrics.get_sink(block)
+        self.assertIsInstance(sink, metrics.MemorySink)
+        with patch.object(metrics.json, 'dumps') as dumps:
+            self.assertIs(metrics.get_sink(block), sink)
+        self.assertFalse(dumps.called)
+        # Equal settings share the sink.
+        block.get_xblock_settings.return_value = {'metrics': {'sink': 'memory'}}
+        self.assertIs(metrics.get_sink(block), sink)
+
+    def test_count_reuses_sink(self):
+        """ Counts made by an instrumented handler use the sink it looked up """
+        block = Mock()
+        block.get_xblock_settings.return_value = {'metrics': {'sink': 'memory'}}
+
+        @metrics.instrumented
+        def handler(block, _request):
+            metrics.count(block, 'grade.published')
+            metrics.count(block, 'grade.published')
+
+        handler(block, None)
+        self.assertEqual(block.get_xblock_settings.call_count, 1)
+        self.assertEqual(metrics.get_counters(), {'grade.published': 2})
+
+    def test_statsd_sink(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        block = Mock()
+        block.get_xblock_settings.return_value = {
+            'metrics': {'sink': 'statsd', 'port': server.getsockname()[1], 'prefix': 'dnd'},
+        }
+        sink = metrics.get_sink(block)
+        self.assertIsInstance(sink, metrics.StatsdSink)
+        sink.timing('reset.latency_ms', 1.5)
+        sink.histogram('reset.response_bytes', 100)
+        sink.increment('reset.events.grade', 2)
+        self.assertEqual(server.recv(1024), 'dnd.reset.latency_ms:1.500|ms')
+        self.assertEqual(server.recv(1024), 'dnd.reset.response_bytes:100|h')
+        self.assertEqual(server.recv(1024), 'dnd.reset.events.grade:2|c')
+
+
+class BlockInstrumentationTests(TestCaseMixin, unittest.TestCase):
+    """ Tests for the metrics reported by the views and handlers of a block """
+
+    def setUp(self):
+        self.block = make_block()
+        self.patch_workbench()
+        self.block.runtime.publish = Mock()
+
+    def test_grade_metrics_sink(self):
+        """ Grade publishing is counted by the configured metrics sink """
+        with patch.object(metrics, 'get_sink') as get_sink:
+            self.drop(0, TOP_ZONE_ID)
+        get_sink.return_value.increment.assert_any_call('grade.published', 1)
+
+    def test_instrumentation(self):
+        """ With metrics enabled in the settings, views and handlers report to the configured sink """
+        self.apply_patch(
+            'drag_and_drop_v2.drag_and_drop_v2.DragAndDropBlock.get_xblock_settings',
+            return_value={'metrics': {'sink': 'memory'}},
+        )
+        metrics.reset()
+        self.block.student_view({})
+        self.drop(0, TOP_ZONE_ID)
+        self.call_handler('get_user_state', method='GET')
+
+        histograms = metrics.get_histograms()
+        for name in ('student_view', 'do_attempt', 'get_user_state'):
+            self.assertEqual(histograms[name + '.latency_ms']['count'], 1)
+            self.assertGreater(histograms[name + '.response_bytes']['sum'], 0)
+        self.assertGreater(histograms['do_attempt.request_bytes']['sum'], 0)
+        self.assertGreater(histograms['student_view.field_reads']['sum'], 0)
+        self.assertEqual(histograms['get_user_state.field_writes']['sum'], 0)
+        self.assertGreater(histograms['do_attempt.field_writes']['sum'], 0)
+        counters = metrics.get_counters()
+        self.assertEqual(counters['do_attempt.events.grade'], 1)
+        self.assertEqual(counters['do_attempt.events.edx.drag_and_drop_v2.item.dropped'], 1)
+
+    def test_instrumentation_disabled(self):
+        metrics.reset()
+        self.drop(0, TOP_ZONE_ID)
+        self.assertEqual(metrics.get_histograms(), {})
@@ -0,0 +1,134 @@
+import copy
+import unittest
+
+from mock import patch
+
+from drag_and_drop_v2.default_data import DEFAULT_DATA, TOP_ZONE_ID, MIDDLE_ZONE_ID, BOTTOM_ZONE_ID
+from drag_and_drop_v2.problem_index import data_version, get_problem_index, Polygon, ZoneGrid
+from drag_and_drop_v2.schema import normalize_data
+
+
+class ProblemIndexTests(unittest.TestCase):
+    """ Tests for the compiled per-problem lookup index """
+
+    def test_lookups(self):
+        index = get_problem_index(DEFAULT_DATA)
+        self.assertEqual(index.items[1]['displayName'], "Goes to the middle")
+        self.assertEqual(index.item_zones[3], (TOP_ZONE_ID, BOTTOM_ZONE_ID, MIDDLE_ZONE_ID))
+        self.assertEqual(index.item_zone_sets[0], frozenset([TOP_ZONE_ID]))
+        self.assertEqual(index.item_zones[4], ())
+        self.assertEqual(index.zones_by_uid[BOTTOM_ZONE_ID]['x'], 15)
+        self.assertEqual(index.required_items, frozenset(['0', '1', '2', '3']))
+
+    def test_legacy_format(self):
+        data = {
+            "zones": [{"id": "zone-1", "index": 1, "title": "Zone 1"}],
+            "items": [
+                {"id": 0, "zone": "Zone 1"},
+                {"id": 1, "zone": "none"},
+            ],
+        }
+        index = get_problem_index(data)
+        self.assertEqual(index.zones, ({"title": "Zone 1", "uid": "Zone 1"},))
+        self.assertEqual(index.item_zones, {0: ("Zone 1",), 1: ()})
+        self.assertEqual(index.required_items, frozenset(['0']))
+
+    def test_cached_by_content(self):
+        data = copy.deepcopy(DEFAULT_DATA)
+        self.assertIs(get_problem_index(data), get_problem_index(DEFAULT_DATA))
+        data["items"][0]["zones"] = [MIDDLE_ZONE_ID]
+        self.assertNotEqual(data_version(data), data_version(DEFAULT_DATA))
+        self.assertEqual(get_problem_index(data).item_zones[0], (MIDDLE_ZONE_ID,))
+
+    def test_stored_version(self):
+        # Data saved in Studio is normalized, and has its version.
+        normalized = normalize_data(DEFAULT_DATA)
+        data = dict(normalized, dataVersion=data_version(normalized))
+        self.assertEqual(data_version(data), data_version(normalized))
+        self.assertIs(get_problem_index(data), get_problem_index(normalized))
+        # The stored version is trusted if it identifies an index of the same data, without hashing the data again.
+        with patch('drag_and_drop_v2.problem_index.data_version') as mock_data_version:
+            get_problem_index(data)
+        self.assertFalse(mock_data_version.called)
+
+    def test_stale_stored_version(self):
+        """ Data changed without updating its stored version (e.g. in OLX) gets the index of its content """
+        get_problem_index(dict(DEFAULT_DATA, dataVersion=data_version(DEFAULT_DATA)))
+        data = copy.deepcopy(DEFAULT_DATA)
+        data["items"][0]["zones"] = [MIDDLE_ZONE_ID]
+        data["dataVersion"] = data_version(DEFAULT_DATA)
+        index = get_problem_index(data)
+        self.assertEqual(index.item_zones[0], (MIDDLE_ZONE_ID,))
+        self.assertEqual(index.version, data_version(data))
+        self.assertNotEqual(index.version, data["dataVersion"])
+        self.assertEqual(get_problem_index(dict(data, dataVersion=["not", "a", "version"])).version, index.version)
+
+    def test_zone_grid(self):
+        zones = [
+            {"uid": "a", "x": 0, "y": 0, "width": 100, "height": 100},
+            {"uid": "b", "x": 50, "y": 50, "width": 100, "height": 100},
+            {"uid": "c", "x": "300", "y": "0", "width": "10", "height": "10"},
+            {"uid": "no-position"},
+        ]
+        grid = ZoneGrid(zones)
+        self.assertEqual(grid.find(10, 10)["uid"], "a")
+        self.assertEqual(grid.find(75, 75)["uid"], "b")  # Zones defined later are on top
+        self.assertEqual(grid.find(150, 150)["uid"], "b")
+        self.assertEqual(grid.find(305, 5)["uid"], "c")
+        self.assertIsNone(grid.find(200, 5))
+        self.assertIsNone(grid.find(-1, 5))
+        self.assertIsNone(ZoneGrid([]).find(0, 0))
+        # Zones contain the points of their own shape, even where other zones are on top of them.
+        self.assertTrue(grid.contains("a", 75, 75))
+        self.assertTrue(grid.contains("b", 75, 75))
+        self.assertFalse(grid.contains("a", 150, 150))
+        self.assertFalse(grid.contains("no-position", 0, 0))
+        self.assertFalse(grid.contains("no-such-zone", 0, 0))
+
+    def test_find_zone(self):
+        index = get_problem_index(DEFAULT_DATA)
+        self.assertEqual(index.find_zone(None, 250, 100)["uid"], TOP_ZONE_ID)
+        self.assertEqual(index.find_zone(TOP_ZONE_ID, 250, 100)["uid"], TOP_ZONE_ID)
+        self.assertIsNone(index.find_zone(BOTTOM_ZONE_ID, 250, 100))
+        self.assertIsNone(index.find_zone(None, 5, 5))
+
+    def test_zone_grid_many_zones(self):
+        zones = [
+            {"uid": str(i), "x": (i % 30) * 10, "y": (i // 30) * 10, "width": 10, "height": 10}
+            for i in range(900)
+        ]
+        grid = ZoneGrid(zones)
+        for i in range(0, 900, 7):
+            self.assertEqual(grid.find((i % 30) * 10 + 5, (i // 30) * 10 + 5)["uid"], str(i))
+        self.assertLessEqual(max(len(cell) for cell in grid.cells.values()), 4)
+
+    def test_polygon(self):
+        # A "U" shape, which is concave and has horizontal edges.
+        polygon = Polygon([[0, 0], [10, 0], [10, 30], [20, 30], [20, 0], [30, 0], [30, 40], [0, 40]])
+        self.assertTrue(polygon.contains(5, 5))
+        self.assertTrue(polygon.contains(25, 10))
+        self.assertTrue(polygon.contains(15, 35))
+        self.assertTrue(polygon.contains(0, 0))
+        self.assertFalse(polygon.contains(15, 10))
+        self.assertFalse(polygon.contains(35, 10))
+        self.assertFalse(polygon.contains(5, 41))
+        self.assertFalse(polygon.contains(5, -1))
+
+    def test_self_intersecting_polygon(self):
+        # A bow tie, whose edges cross at (5, 5).
+        polygon = Polygon([[0, 0], [10, 10], [10, 0], [0, 10]])
+        self.assertTrue(polygon.contains(1, 5))
+        self.assertTrue(polygon.contains(9, 5))
+        self.assertFalse(polygon.contains(5, 1))
+        self.assertFalse(polygon.contains(5, 9))
+
+    def test_zone_grid_polygons(self):
+        zones = [
+            {"uid": "rect", "x": 0, "y": 0, "width": 100, "height": 100},
+            # A triangle over the rectangle, defined by its points and its bounding box.
+            {"uid": "triangle", "points": [[0, 0], [100, 0], [0, 100]], "x": 0, "y": 0, "width": 100, "height": 100},
+        ]
+        grid = ZoneGrid(zones)
+        self.assertEqual(grid.find(10, 10)["uid"], "triangle")
+        self.assertEqual(grid.find(90, 90)["uid"], "rect")
+        self.assertIsNone(ZoneGrid(zones[1:]).find(90, 90))
@@ -0,0 +1,79 @@
+import copy
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from drag_and_drop_v2.default_data import DEFAULT_DATA, TOP_ZONE_ID, MIDDLE_ZONE_ID, BOTTOM_ZONE_ID
+from drag_and_drop_v2.problem_index import get_problem_index
+from drag_and_drop_v2.rescoring import main, read_sqlite, rescore_rows, rescore_state
+from drag_and_drop_v2.state_encoding import decode_item_state, encode_item_state
+
+
+def placed(zone):
+    return {'zone': zone, 'correct': True, 'x_percent': '10%', 'y_percent': '20%'}
+
+
+class RescoringTests(unittest.TestCase):
+    """ Tests for the offline rescoring tool """
+
+    def setUp(self):
+        # Item 0 now belongs to the bottom zone instead of the top zone.
+        self.data = copy.deepcopy(DEFAULT_DATA)
+        self.data['items'][0]['zones'] = [BOTTOM_ZONE_ID]
+        self.state = {
+            'item_state': encode_item_state({'0': placed(TOP_ZONE_ID), '1': placed(MIDDLE_ZONE_ID)}),
+            'completed': False,
+            'last_published_grade': 0.5,
+        }
+
+    def test_rescore_state(self):
+        updates, grade = rescore_state(get_problem_index(self.data), 1, self.state)
+        self.assertEqual(grade, 0.25)
+        self.assertEqual(decode_item_state(updates['item_state']), {'1': placed(MIDDLE_ZONE_ID)})
+        self.assertEqual(updates['last_published_grade'], 0.25)
+        self.assertEqual(updates['item_stats']['correct'], 1)
+        self.assertNotIn('completed', updates)
+
+    def test_unchanged_state(self):
+        self.assertEqual(rescore_state(get_problem_index(DEFAULT_DATA), 1, self.state), ({}, None))
+        self.assertEqual(rescore_state(get_problem_index(self.data), 1, {}), ({}, None))
+
+    def test_rescore_rows(self):
+        rows = [
+            (1, 'block', json.dumps(self.state)),
+            (2, 'block', json.dumps({})),
+            (3, 'block', self.state),
+        ]
+        for processes in (1, 2):
+            records = list(rescore_rows(self.data, 4, rows, processes=processes, chunk_size=2))
+            self.assertEqual([record['student_id'] for record in records], [1, 3])
+            self.assertEqual(records[0]['grade'], {'value': 1.0, 'max_value': 4})
+
+    def test_command_line(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        data_path = os.path.join(tmp_dir, 'data.json')
+        db_path = os.path.join(tmp_dir, 'dump.db')
+        output_path = os.path.join(tmp_dir, 'output.jsonl')
+        with open(data_path, 'w') as data_file:
+            json.dump(self.data, data_file)
+        connection = sqlite3.connect(db_path)
+        connection.execute('CREATE TABLE courseware_studentmodule (student_id, module_id, state)')
+        connection.executemany('INSERT INTO courseware_studentmodule VALUES (?, ?, ?)', [
+            (1, 'block', json.dumps(self.state)),
+            (2, 'other-block', json.dumps(self.state)),
+        ])
+        connection.commit()
+        connection.close()
+
+        self.assertEqual(len(list(read_sqlite(db_path))), 2)
+        main(['--data', data_path, '--sqlite', '--module-id', 'block', '--processes', '1',
+              '--output', output_path, db_path])
+        with open(output_path) as output:
+            records = [json.loads(line) for line in output]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['student_id'], 1)
+        self.assertEqual(records[0]['grade'], {'value': 0.25, 'max_value': 1})
@@ -0,0 +1,68 @@
+import unittest
+
+from drag_and_drop_v2.default_data import DEFAULT_DATA
+from drag_and_drop_v2.schema import SCHEMA_VERSION, is_normalized, normalize_data, validate_data
+
+
+class SchemaTests(unittest.TestCase):
+    """ Tests for normalizing and validating problem data """
+
+    def test_normalize_legacy_data(self):
+        data = {
+            "feedback": {"start": "Start"},
+            "zones": [{"id": "zone-1", "index": 1, "title": "Zone 1", "x": "10", "y": 20}],
+            "items": [
+                {"id": 0, "zone": "Zone 1", "backgroundImage": "/static/item.png"},
+                {"id": 1, "zone": "none", "feedback": {"incorrect": "No"}},
+            ],
+        }
+        normalized = normalize_data(data)
+        self.assertFalse(is_normalized(data))
+        self.assertTrue(is_normalized(normalized))
+        self.assertEqual(normalized, {
+            "schemaVersion": SCHEMA_VERSION,
+            "feedback": {"start": "Start", "finish": ""},
+            "zones": [{"uid": "Zone 1", "title": "Zone 1", "x": "10", "y": 20}],
+            "items": [
+                {
+                    "id": 0, "zones": ["Zone 1"], "imageURL": "/static/item.png",
+                    "feedback": {"correct": "", "incorrect": ""},
+                },
+                {"id": 1, "zones": [], "imageURL": "", "feedback": {"correct": "", "incorrect": "No"}},
+            ],
+        })
+        validate_data(normalized)
+        self.assertEqual(normalize_data(normalized), normalized)
+
+    def test_normalize_polygon_zone(self):
+        data = {"zones": [{"uid": "a", "points": [[10, 20], [110, 40], ["60", 120]]}]}
+        zone = normalize_data(data)["zones"][0]
+        self.assertEqual((zone["x"], zone["y"], zone["width"], zone["height"]), (10, 20, 100, 100))
+        validate_data(normalize_data(data))
+
+    def test_default_data_is_valid(self):
+        self.assertIsNone(validate_data(normalize_data(DEFAULT_DATA)))
+
+    def test_invalid_data(self):
+        invalid_data = [
+            {"feedback": {"start": None}},
+            {"zones": [{"uid": "a"}, {"uid": "a"}]},
+            {"zones": [{"uid": "a", "x": "left"}]},
+            {"zones": [{"uid": "a", "points": [[0, 0], [10, 10]]}]},
+            {"zones": [{"uid": "a", "points": [[0, 0], [10, 10], [0, "bottom"]]}]},
+            {"items": [{"id": "0"}]},
+            {"items": [{"id": 0}, {"id": 0}]},
+            {"items": [{"id": 0, "zones": ["missing"]}]},
+            # Malformed containers
+            [],
+            {"feedback": "Start"},
+            {"zones": {"uid": "a"}},
+            {"zones": ["a"]},
+            {"items": [0]},
+            {"items": [{"id": 0, "zones": "a"}]},
+            {"items": [{"id": 0, "zones": [["a"]]}]},
+            {"items": [{"id": 0, "feedback": "Yes"}]},
+        ]
+        for data in invalid_data:
+            with self.assertRaises(ValueError):
+                validate_data(normalize_data(data))
@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from drag_and_drop_v2.state_encoding import decode_item_state, encode_item_state, item_count
+
+
+class StateEncodingTests(unittest.TestCase):
+    """ Tests for the compact encoding of the item_state user field """
+
+    def test_round_trip(self):
+        state = {
+            '0': {'zone': 'zone-1', 'correct': True, 'x_percent': '33%', 'y_percent': '11.5%'},
+            '1': {'zone': 'zone-1', 'correct': False, 'x_percent': 67.25, 'y_percent': 80},
+            '2': {'zone': 'zone-2', 'correct': True, 'x_percent': '99%', 'y_percent': '95%'},
+        }
+        encoded = encode_item_state(state)
+        self.assertEqual(encoded['v'], 1)
+        self.assertEqual(sorted(encoded['z']), ['zone-1', 'zone-2'])
+        self.assertEqual(item_count(encoded), 3)
+        self.assertEqual(decode_item_state(json.loads(json.dumps(encoded))), state)
+        self.assertLess(len(json.dumps(encoded)), len(json.dumps(state)))
+
+    def test_round_trip_precision(self):
+        """ Coordinates are rounded to 0.01%, whatever their number of digits """
+        state = {
+            '0': {'zone': 'zone-1', 'correct': True, 'x_percent': '12345.67%', 'y_percent': '0.07%'},
+            '1': {'zone': 'zone-1', 'correct': True, 'x_percent': 1234567.89, 'y_percent': 0.07},
+            '2': {'zone': 'zone-1', 'correct': True, 'x_percent': '33.333%', 'y_percent': '-0.016%'},
+            '3': {'zone': 'zone-1', 'correct': True, 'x_percent': 48.6381322957, 'y_percent': 20.576},
+        }
+        decoded = decode_item_state(json.loads(json.dumps(encode_item_state(state))))
+        self.assertEqual(decoded['0'], state['0'])
+        self.assertEqual(decoded['1'], state['1'])
+        self.assertEqual((decoded['2']['x_percent'], decoded['2']['y_percent']), ('33.33%', '-0.02%'))
+        self.assertEqual((decoded['3']['x_percent'], decoded['3']['y_percent']), (48.64, 20.58))
+
+    def test_empty(self):
+        self.assertEqual(encode_item_state({}), {})
+        self.assertEqual(decode_item_state({}), {})
+        self.assertEqual(item_count({}), 0)
+
+    def test_legacy_formats(self):
+        legacy = {
+            '0': {'zone': 'zone-1', 'correct': True, 'x_percent': '33%', 'y_percent': '11%'},
+            '1': {'correct': True, 'x_percent': '10%', 'y_percent': '20%'},
+            '2': {'top': 10, 'left': 20, 'absolute': True},
+            '3': [30, 40],
+        }
+        self.assertEqual(item_count(legacy), 4)
+        decoded = decode_item_state(legacy)
+        self.assertEqual(decoded['3'], {'top': 30, 'left': 40})
+        self.assertEqual(decoded['1'], legacy['1'])
+
+        encoded = encode_item_state(decoded)
+        self.assertEqual(encoded['i']['1'], [-1, 3, 1000, 2000])
+        self.assertEqual(encoded['i']['2'], legacy['2'])
+        self.assertEqual(decode_item_state(encoded), decoded)
@@ -0,0 +1,84 @@
+import copy
+import json
+import unittest
+
+from mock import patch
+
+from drag_and_drop_v2.default_data import TOP_ZONE_ID, DEFAULT_DATA
+from drag_and_drop_v2.drag_and_drop_v2 import DragAndDropBlock
+from ..utils import make_block, make_request, TestCaseMixin
+
+
+class StudentViewTests(TestCaseMixin, unittest.TestCase):
+    """ Tests for the caching of the configuration and the initial state of the student view """
+
+    def setUp(self):
+        self.block = make_block()
+        self.patch_workbench()
+
+    def test_configuration_cached(self):
+        """ The configuration is computed once and shared until the inputs it depends on change """
+        self.block.data = dict(self.block.data, targetImg="/static/cached.png")
+        # pylint: disable=protected-access
+        with patch.object(DragAndDropBlock, '_build_configuration', autospec=True,
+                          side_effect=DragAndDropBlock._build_configuration) as build:
+            config = self.block.get_configuration()
+            self.assertEqual(self.block.get_configuration(), config)
+            self.assertEqual(build.call_count, 1)
+            self.block.display_name = "Another title"
+            self.assertEqual(self.block.get_configuration()["title"], "Another title")
+            self.assertEqual(build.call_count, 2)
+        # Modifying the returned configuration doesn't affect the cached copy:
+        config.pop("items")
+        self.assertIn("items", self.block.get_configuration())
+
+    def test_expand_static_urls_bulk(self):
+        """ Several URLs are expanded with a single runtime call, and the results are memoized """
+        data = copy.deepcopy(DEFAULT_DATA)
+        data['targetImg'] = "/static/bulk1.png"
+        data['items'][0]['imageURL'] = "http://example.com/bulk2.png"
+        data['items'][1]['imageURL'] = "/static/bulk1.png"
+        self.block.data = data
+        replace_urls = self.block.runtime.replace_urls
+        with patch.object(self.block.runtime, 'replace_urls', side_effect=replace_urls) as mock_replace:
+            configuration = self.block.get_configuration()
+            self.assertEqual(configuration['target_img_expanded_url'], "/course/test-course/assets/bulk1.png")
+            self.assertEqual(configuration['items'][0]['expandedImageURL'], "http://example.com/bulk2.png")
+            self.assertEqual(configuration['items'][1]['expandedImageURL'], "/course/test-course/assets/bulk1.png")
+            self.assertEqual(mock_replace.call_count, 1)
+            res = self.call_handler('expand_static_url', '/static/bulk1.png')
+            self.assertEqual(res, {'url': "/course/test-course/assets/bulk1.png"})
+            self.assertEqual(mock_replace.call_count, 1)
+
+    def test_student_view_initial_state(self):
+        """ The learner's state is embedded in the student_view, with a token identifying it """
+        fragment = self.block.student_view({})
+        self.assertEqual(fragment.json_init_args['initial_state'], self.call_handler('get_user_state'))
+        token = fragment.json_init_args['initial_state_token']
+
+        self.drop(0, TOP_ZONE_ID)
+        fragment = self.block.student_view({})
+        self.assertEqual(fragment.json_init_args['initial_state'], self.call_handler('get_user_state'))
+        self.assertNotEqual(fragment.json_init_args['initial_state_token'], token)
+
+    def test_get_user_state_etag(self):
+        """ get_user_state supports conditional requests """
+        response = self.call_handler('get_user_state', method='GET', expect_json=False)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        request = make_request(None, method='GET')
+        request.headers['If-None-Match'] = etag
+        # The user state isn't built when the client's copy is current.
+        with patch.object(DragAndDropBlock, '_get_user_state') as get_user_state:
+            response = self.block.handle('get_user_state', request)
+        self.assertFalse(get_user_state.called)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.body, '')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        self.drop(0, TOP_ZONE_ID)
+        response = self.block.handle('get_user_state', request)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(json.loads(response.body)['items'].keys(), ['0'])
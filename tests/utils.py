@@ -1,3 +1,4 @@
+import hashlib
 import json
 import re
 
@@ -8,6 +9,7 @@ from xblock.fields import ScopeIds
 from xblock.runtime import KvsFieldData, DictKeyValueStore
 
 import drag_and_drop_v2
+from drag_and_drop_v2.problem_index import get_problem_index
 
 
 def make_request(data, method='POST'):
@@ -31,6 +33,56 @@ def make_block():
     return drag_and_drop_v2.DragAndDropBlock(runtime, field_data, scope_ids=scope_ids)
 
 
+def make_studio_submission(data, **settings):
+    """ Make the body of a studio_submit request saving the problem `data`, with default settings """
+    submission = {
+        'display_name': "Drag and Drop",
+        'mode': drag_and_drop_v2.DragAndDropBlock.STANDARD_MODE,
+        'max_attempts': None,
+        'show_title': True,
+        'problem_text': "",
+        'show_problem_header': True,
+        'item_background_color': '',
+        'item_text_color': '',
+        'weight': '1',
+        'data': data,
+    }
+    submission.update(settings)
+    return submission
+
+
+class FakeContentStore(object):
+    """ An in-memory stand-in for the edx-platform contentstore """
+
+    class StaticContent(object):
+        def __init__(self, location, name, content_type, data):
+            self.location, self.name, self.content_type, self.data = location, name, content_type, data
+            self.content_digest = hashlib.md5(data).hexdigest()
+
+        def stream_data(self):
+            yield self.data
+
+        @staticmethod
+        def compute_location(course_key, path):
+            return (course_key, path.replace('/', '_'))
+
+    def __init__(self):
+        self.contents = {}
+
+    def find(self, location, throw_on_not_found=True, as_stream=False):  # pylint: disable=unused-argument
+        if location not in self.contents and throw_on_not_found:
+            raise KeyError(location)
+        return self.contents.get(location)
+
+    def save(self, content):
+        self.contents[content.location] = content
+
+    def add(self, course_key, name, data):
+        """ Adds a course asset """
+        location = self.StaticContent.compute_location(course_key, name)
+        self.save(self.StaticContent(location, name, 'application/octet-stream', data))
+
+
 class TestCaseMixin(object):
     """ Helpful mixins for unittest TestCase subclasses """
     maxDiff = None
@@ -52,6 +104,29 @@ class TestCaseMixin(object):
         self.addCleanup(new_patch.stop)
         return mock
 
+    def drop_attempt(self, item_id, zone_uid, **extra):
+        """
+        Returns the do_attempt request body that drops item `item_id` on the center of the zone
+        `zone_uid`, like the client does for items placed with the keyboard. The item is placed there
+        too if the size of the background image is known, at the 0.01% resolution positions are
+        stored at. Any `extra` keys are added to the body.
+        """
+        attempt = {"val": item_id, "zone": zone_uid, "x_percent": "50%", "y_percent": "50%"}
+        zone = get_problem_index(self.block.data).zones_by_uid.get(zone_uid)
+        if zone:
+            attempt['x'] = float(zone['x']) + float(zone['width']) / 2
+            attempt['y'] = float(zone['y']) + float(zone['height']) / 2
+            width, height = self.block._target_img_natural_size(self.block.data)  # pylint: disable=protected-access
+            if width and height:
+                attempt['x_percent'] = '{!r}%'.format(round(attempt['x'] * 100 / width, 2)).replace('.0%', '%')
+                attempt['y_percent'] = '{!r}%'.format(round(attempt['y'] * 100 / height, 2)).replace('.0%', '%')
+        attempt.update(extra)
+        return attempt
+
+    def drop(self, item_id, zone_uid, expect_json=True, **extra):
+        """ Drops item `item_id` on the center of the zone `zone_uid` with the do_attempt handler """
+        return self.call_handler('do_attempt', self.drop_attempt(item_id, zone_uid, **extra), expect_json=expect_json)
+
     def call_handler(self, handler_name, data=None, expect_json=True, method='POST'):
         response = self.block.handle(handler_name, make_request(data, method=method))
         if expect_json: